@@ -19,6 +19,14 @@ def test_irecord():
     assert len(ir.filter("SH501018")) == 8
 
 
+def test_irecord_filter():
+    for code in ir.status.code.unique():
+        pd.testing.assert_frame_equal(
+            ir.filter(code), ir.status[ir.status["code"] == code]
+        )
+    assert len(ir.filter("SH000000")) == 0
+
+
 def test_itrade():
     t = xa.itrade("SH512880", ir)
     assert round(t.xirrrate("20200313"), 2) == 12.49
@@ -85,6 +85,71 @@ def test_index():
     zzhb.v_techindex(col=["TRIX10"])
 
 
+def test_drawdown_series():
+    start, end, mdd = zzhb.max_drawdown("2019-01-01")
+    underwater, top = zzhb.drawdown_series("2019-01-01", top=3)
+    assert len(top) == 3
+    assert top.iloc[0]["drawdown"] == mdd
+    assert top.iloc[0]["valley"] == end
+    assert (underwater["drawdown"] <= 0).all()
+    assert underwater["drawdown"].min() == mdd
+
+
+def test_indicators():
+    df = zzhb.indicators("ma", ("macd", {"fast_window": 6}), "rsi", "psy")
+    assert "MACD_OSC_6_26" not in zzhb.price.columns
+    zzhb.ma()
+    zzhb.rsi()
+    zzhb.psy()
+    for col in ["MA5", "RSI14", "PSY12", "PSYMA12"]:
+        assert df[col].equals(zzhb.price[col])
+    assert (df["date"] == zzhb.price["date"]).all()
+
+
+def test_streaming():
+    zzhb.rsi()
+    zzhb.macd()
+    zzhb.boll()
+    last = zzhb.price.iloc[-1]
+    r = xa.StreamingRSI.from_price(zzhb.price.iloc[:-1])
+    assert r.update(last["netvalue"])["RSI14"] == last["RSI14"]
+    m = zzhb.streaming("macd")
+    assert m.value["MACD_OSC_12_26"] == last["MACD_OSC_12_26"]
+    b = zzhb.streaming("boll")
+    assert round(b.value["BOLL_UPPER"], 8) == round(last["BOLL_UPPER"], 8)
+    with pytest.raises(ValueError):
+        zzhb.streaming("kdj")
+
+
+def test_indicator_panel():
+    nav = pd.merge(
+        zzhb.price[["date", "netvalue"]].rename(columns={"netvalue": "zzhb"}),
+        hs300.price[["date", "netvalue"]].rename(columns={"netvalue": "hs300"}),
+        on="date",
+        how="outer",
+    )
+    ind = xa.IndicatorPanel(nav[["date", "zzhb"]].dropna()).indicators("ma")
+    zzhb.ma()
+    assert (ind["MA5"]["zzhb"].values == zzhb.price["MA5"].values)[4:].all()
+    panel = xa.IndicatorPanel(nav)
+    cs = panel.rank("sharpe", "rsi", date="2020-01-01")
+    assert list(cs["rank"]) == [1, 2]
+    assert cs["sharpe"].iloc[0] >= cs["sharpe"].iloc[1]
+    assert "RSI14" in cs.columns
+    # 净值起点不同时，风险指标从各自首个净值开始计算
+    assert round(cs.loc["zzhb", "max_drawdown"], 6) == round(
+        min(zzhb.max_drawdown("2020-01-01")[2], 0), 6
+    )
+    # 净值提前结束时，之后不再计入 0 收益
+    nav = zzhb.price[["date", "netvalue"]].rename(columns={"netvalue": "full"})
+    end = nav["date"].iloc[-51]
+    nav["zzhb"] = nav["full"].where(nav["date"] <= end)
+    m = xa.IndicatorPanel(nav).metrics()
+    assert round(m.loc["zzhb", "volatility"], 8) == round(
+        zzhb.algorithm_volatility(end), 8
+    )
+
+
 def test_fund():
     assert hs300.round_label == 1
     assert hs300.name == "景顺长城沪深300指数增强"  ## "景顺长城沪深300增强", 蜜汁改名。。。
@@ -119,6 +184,63 @@ def test_fund():
     assert dax.feeinfo == ["小于7天", "1.50%", "大于等于7天", "0.00%"]
 
 
+def test_cash_cache():
+    ca2 = xa.cashinfo(interest=0.0002, start="2015-01-01")
+    assert ca2.price is not ca.price
+    assert ca2.price.equals(ca.price)
+
+
+def test_price_row_lookup():
+    assert ca._row_after("2018-02-17")[0] == pd.Timestamp("2018-02-22")
+    assert ca._row_before("2018-02-17")[0] == pd.Timestamp("2018-02-14")
+    assert ca._row_before("2010-01-01") is None
+    assert (
+        ca._row_after("2018-01-02")[1]
+        == ca.price[ca.price["date"] == "2018-01-02"].iloc[0].netvalue
+    )
+
+
+def test_fee_cache():
+    from xalpha.info import _fee_load
+
+    assert _fee_load(hs300.code) == (hs300.feeinfo, hs300.segment)
+    f = xa.fundinfo("000311")  # 赎回费信息直接来自缓存
+    assert f.segment == hs300.segment
+
+
+def test_get_fund_holdings_many():
+    dfs = xa.get_fund_holdings_many(
+        ["000827", ("000827", 2019, 2)], year=2019, season=4
+    )
+    assert dfs[0].iloc[0]["ratio"] > 0
+    assert dfs[1] is xa.get_fund_holdings("000827", 2019, 2)
+
+
+def test_js_vars():
+    from xalpha.info import _js_vars, _js_loads
+
+    jsvars = _js_vars(hs300._page.text)
+    assert _js_loads(jsvars["fS_name"]) == hs300.name
+    l = _js_loads(jsvars["Data_netWorthTrend"])
+    assert len(l) >= len(hs300.price)
+    assert isinstance(l[0]["x"], int)
+
+
+def test_fund_info_pool():
+    pool = xa.FundInfoPool(priceonly=True)
+    objs = pool.get_many(["000311", ("000311", 0, 1), "001211"])
+    assert isinstance(objs[2], xa.mfundinfo)
+    assert objs[1].dividend_label == 1 and objs[0].dividend_label == 0
+    assert objs[0].round_label == 1  # 000311 在 droplist 中
+    assert len(objs[0].price) == len(objs[1].price)
+    assert pool.get("000311") is objs[0]
+    assert pool.get("F000311") is objs[0]
+    f = pool.new("F000311")
+    assert f is not objs[0] and f.round_label == 1
+    f.price["extra"] = 1
+    assert "extra" not in objs[0].price.columns
+
+
 def test_mfundinfo():
     zogqb.bcmkset(xa.cashinfo())
     assert round(zogqb.total_annualized_returns("2018-08-01"), 3) == 0.036
@@ -35,3 +35,28 @@ def test_trans():
     assert remain.trans(rem, 1.2, "2020-01-01")[2][1] == 12.72
     assert rem[1][1] == 30
     assert len(remain.trans([], 0, "2018-01-01")) == 0
+
+
+def test_lots():
+    lots = remain.Lots(rem)
+    assert lots == rem
+    lots2 = remain.buy(lots, 2.5, pd.Timestamp("2017-02-21"))
+    assert lots2[2][1] == 13.1 and lots[2][1] == 10.6
+    sold, lots3 = remain.sell(lots2, 25, pd.Timestamp("2017-02-22"))
+    assert sold == remain.sell(rem, 25, pd.Timestamp("2017-02-22"))[0]
+    assert lots3 == remain.sell(remain.buy(rem, 2.5, "2017-02-21"), 25, "2017-02-22")[1]
+    assert lots3._store is lots2._store
+    lots4 = remain.buy(lots3, 3, "2017-02-23")
+    assert lots4[-1][1] == 3 and len(lots3) == 2
+    assert lots4.shares_before("2017-02-21") == 38.1
+    assert remain.trans(lots, 1.2, "2020-01-01")[2][1] == 12.72
+    with pytest.raises(Exception) as excinfo:
+        remain.buy(lots, 2.5, pd.Timestamp("2017-02-20"))
+    assert str(excinfo.value) == _errmsg
+
+
+def test_pack():
+    lots = remain.buy(remain.Lots(rem), 5, "2017-02-25")
+    rems = [lots, remain.sell(lots, 30, "2017-02-26")[1], rem]
+    assert remain.unpack(remain.pack(rems)) == rems
+    assert len(remain.pack(rems)["stores"]) == 2
@@ -1,4 +1,5 @@
 import sys
+import json
 
 sys.path.insert(0, "../")
 import xalpha as xa
@@ -26,6 +27,44 @@ def test_trade():
     cm_t.v_tradevolume(freq="M")
 
 
+def test_trade_engine():
+    for code in statb.columns[1:]:
+        try:
+            f = xa.fundinfo(code)
+        except xa.exceptions.FundTypeError:
+            f = xa.mfundinfo(code)
+        t1 = xa.trade(f, statb, engine="legacy")
+        t2 = xa.trade(f, statb, engine="event")
+        pd.testing.assert_frame_equal(t1.cftable, t2.cftable, check_exact=True)
+        assert list(t1.remtable["rem"]) == list(t2.remtable["rem"])
+
+
+def test_dailyreport_series():
+    sr = cm_t.dailyreport_series("2018-08-01")
+    assert sr.iloc[0]["date"] == cm_t.cftable.iloc[0]["date"]
+    for d in ["2017-11-20", "2018-03-05", "2018-07-31"]:
+        row = sr[sr["date"] <= d].iloc[-1]
+        assert row["value"] == cm_t.briefdailyreport(d)["currentvalue"]
+        assert row["unitcost"] == cm_t.unitcost(d)
+        assert row["peak"] == cm_t.dailyreport(d).iloc[0]["历史最大占用"]
+
+
+def test_bottleneck_series():
+    from xalpha.trade import bottleneck, bottleneck_series
+
+    s = bottleneck_series(cm_t.cftable)
+    for d in s.index:
+        assert s[d] == bottleneck(cm_t.cftable[cm_t.cftable["date"] <= d])
+    assert s.iloc[-1] == bottleneck(cm_t.cftable)
+
+
+def test_checkpoint():
+    ck = json.loads(json.dumps(cm_t.checkpoint()))
+    t = xa.trade.from_checkpoint(cm, statb, ck)
+    pd.testing.assert_frame_equal(t.cftable, cm_t.cftable, check_exact=True)
+    assert list(t.remtable["rem"]) == list(cm_t.remtable["rem"])
+
+
 def test_customize_fee():
     df = pd.DataFrame(
         {"date": ["2020-05-28", "2020-06-01"], "519732": [500.005, -0.505]}
@@ -74,6 +113,61 @@ def test_mul_properties():
     assert round(hl_m2.fundtradeobj[2].cftable.iloc[1]["share"], 2) == -926.0
 
 
+def test_mul_lookthrough():
+    hl_m = xa.mul(status=statnb, **ioconf)
+    lt = hl_m.get_lookthrough(date="20190801")
+    assert round(lt["portfolio"]["stock"], 2) == 299.85
+    assert list(lt["stock"].columns) == ["name", "code", "value", "ratio"]
+    assert round(lt["stock"]["ratio"].sum(), 2) == 1.0
+    assert lt["industry"] == hl_m.get_industry(date="20190801")
+
+
+def test_mul_history():
+    hl_m = xa.mul(status=statnb, **ioconf)
+    h = hl_m.history("2020-03-06")
+    f = hl_m.fundtradeobj[2]
+    row = h[(h["date"] == "2020-03-06") & (h["code"] == f.code)].iloc[0]
+    assert row["value"] == f.briefdailyreport("2020-03-06").get("currentvalue", 0)
+    rep = hl_m.history_report(
+        "2020-03-06", freq="M", category={f.code: "基金" for f in hl_m.fundtradeobj}
+    )
+    assert round(rep.iloc[-1]["xirr"], 6) == round(hl_m.xirrrate("2020-03-06"), 6)
+
+
+def test_combsummary_series():
+    hl_m = xa.mul(status=statnb, **ioconf)
+    dates = ["2019-08-01", "2020-03-06"]
+    ser = hl_m.combsummary_series(dates)
+    assert len(ser) == len(dates) * (len(hl_m.fundtradeobj) + 1)
+    for d in dates:
+        s = ser[ser["date"] == d].set_index("基金代码")
+        c = hl_m.combsummary(d).set_index("基金代码")
+        for code in c.index:
+            assert round(s.loc[code, "基金现值"], 2) == round(c.loc[code, "基金现值"], 2)
+            assert round(s.loc[code, "基金收益总额"], 2) == round(c.loc[code, "基金收益总额"], 2)
+
+
+def test_mergecftb():
+    hl_m = xa.mul(status=statnb, **ioconf)
+    # 逐日按基金顺序依次相加的原实现
+    dtlist = []
+    for fund in hl_m.fundtradeobj:
+        dtlist.extend(zip(fund.cftable["date"], fund.cftable["cash"]))
+    dates = sorted(set(item[0] for item in dtlist))
+    cash = [sum([item[1] for item in dtlist if item[0] == date]) for date in dates]
+    df = pd.DataFrame(data={"date": dates, "cash": cash})
+    df = df[df["cash"] != 0].reset_index(drop=True)
+    pd.testing.assert_frame_equal(hl_m.totcftable, df, check_exact=True)
+
+
+def test_mul_max_workers():
+    hl_s = xa.mul(status=statnb, max_workers=1, **ioconf)
+    hl_p = xa.mul(status=statnb, max_workers=4, **ioconf)
+    assert [f.code for f in hl_s.fundtradeobj] == [f.code for f in hl_p.fundtradeobj]
+    for fs, fp in zip(hl_s.fundtradeobj, hl_p.fundtradeobj):
+        assert fs.cftable.equals(fp.cftable)
+
+
 def test_mulfix():
     tot = xa.mulfix(status=statb, totmoney=5000)
     tot.v_positions()
@@ -84,6 +178,14 @@ def test_mulfix():
     assert round(eva.correlation_table(end="2018-07-30").iloc[2, 4], 3) == 0.095
 
 
+def test_unitvalue_series():
+    tot = xa.mulfix(status=statb, totmoney=5000)
+    nav = tot.unitvalue_series("2018-06-01")
+    nav = tot.unitvalue_series("2018-08-04")  # incremental
+    for d in ["2017-03-01", "2018-06-01", "2018-08-04"]:
+        assert nav[nav["date"] == d].iloc[0]["netvalue"] == tot.unitvalue(d)
+
+
 def test_policy_buyandhold():
     allin = xa.policy.buyandhold(cm, "2015-06-01")
     cm_t2 = xa.trade(cm, allin.status)
@@ -4,6 +4,7 @@ import pytest
 
 sys.path.insert(0, "../")
 import xalpha as xa
+import pandas as pd
 
 xa.set_backend(backend="memory", prefix="pytest-")
 
@@ -260,3 +261,58 @@ def test_get_ycharts():
 def test_get_bond_rates():
     df = xa.get_daily("B-AA+.3", end="2020-05-17")
     assert df.iloc[-1]["close"] == 2.7743
+
+
+def test_fetch_stats():
+    xa.fetch_stats.reset()
+
+    def _fake_daily(code, start=None, end=None, **kws):
+        return pd.DataFrame({"date": pd.date_range(start, end), "close": 1.0})
+
+    f = xa.universal.cachedio(backend="memory", prefix="pytest-stats-")(_fake_daily)
+    f("fake", start="20200101", end="20200110")
+    f("fake", start="20200102", end="20200108")
+    f("fake", start="20191220", end="20200108")
+    assert xa.fetch_stats.get("cachedio.full_fetch") == 1
+    assert xa.fetch_stats.get("cachedio.memory_hit") == 2
+    assert xa.fetch_stats.get("cachedio.forward_extend") == 1
+    xa.fetch_stats.record_request("example.com", latency=0.5, retries=1, nbytes=100)
+    assert xa.fetch_stats.hosts_table().iloc[0]["bytes"] == 100
+    assert 'xalpha_http_bytes_total{host="example.com"} 100' in (
+        xa.fetch_stats.to_prometheus()
+    )
+
+
+def test_concurrent_map():
+    from xalpha.cons import concurrent_map
+
+    assert concurrent_map(lambda x: x ** 2, range(10), max_workers=4) == [
+        x ** 2 for x in range(10)
+    ]
+    assert concurrent_map(lambda x: x, [], max_workers=4) == []
+
+
+def test_xirr_batch():
+    import datetime as dt
+    import numpy as np
+    from xalpha.cons import xirr, xirr_batch
+
+    cf = [
+        (dt.datetime(2018, 1, 1), -1000),
+        (dt.datetime(2018, 7, 1), -500),
+        (dt.datetime(2019, 1, 1), 1650),
+    ]
+    r = xirr(cf)
+    assert round(r, 4) == 0.1205
+    rs = xirr_batch([cf, cf[:1] + [(dt.datetime(2019, 1, 1), 1100)], [], cf[:1]])
+    assert abs(rs[0] - r) < 1e-8 and round(rs[1], 4) == 0.1
+    assert np.isnan(rs[2]) and np.isnan(rs[3])
+
+
+def test_myround_array():
+    from xalpha.cons import myround, myround_array
+
+    l = [2.675, 1.005, -0.005, 0.125, 1.13, 12345.6789, -2.345, 0.0]
+    assert list(myround_array(l)) == [myround(v) for v in l]
+    assert list(myround_array(l, 2)) == [myround(v, 2) for v in l]
+    assert myround(2.675) == 2.68 and myround(1.13, 2) == 1.13
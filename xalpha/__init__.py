@@ -7,6 +7,19 @@ import xalpha.remain
 import xalpha.misc
 import xalpha.exceptions
 from xalpha.evaluate import evaluate
+from xalpha.indicator import (
+    IndicatorEngine,
+    IndicatorPanel,
+    StreamingIndicator,
+    StreamingMA,
+    StreamingMD,
+    StreamingEMA,
+    StreamingMACD,
+    StreamingBOLL,
+    StreamingRSI,
+    StreamingMTM,
+    StreamingROC,
+)
 from xalpha.info import (
     fundinfo,
     indexinfo,
@@ -17,7 +30,9 @@ from xalpha.info import (
     CashInfo,
     MFundInfo,
     FundReport,
+    FundInfoPool,
     get_fund_holdings,
+    get_fund_holdings_many,
 )
 from xalpha.multiple import mul, mulfix, imul, Mul, MulFix, IMul
 from xalpha.realtime import rfundinfo, review  # deprecated
@@ -33,6 +48,7 @@ from xalpha.universal import (
     VInfo,
 )
 from xalpha.provider import show_providers, set_proxy
+from xalpha.cons import fetch_stats
 from xalpha.toolbox import (
     PEBHistory,
     IndexPEBHistory,
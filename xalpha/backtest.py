@@ -5,7 +5,7 @@ modules for dynamical backtesting framework
 
 import pandas as pd
 
-from xalpha.info import fundinfo, mfundinfo
+from xalpha.info import fundinfo, mfundinfo, FundInfoPool
 from xalpha.trade import trade
 from xalpha.multiple import mul, mulfix
 from xalpha.cons import yesterdayobj
@@ -35,6 +35,7 @@ class BTE:
         self.g = GlobalRegister()
         self.trades = {}  # codes: infoobj
         self.infos = {}  # codes: infoobj
+        self.pool = FundInfoPool()  # 基金 info 对象的并发构建与复用
         self.lastdates = {}  # codes: date
         if end is None:
             end = yesterdayobj()
@@ -115,6 +116,20 @@ class BTE:
             self.infos[code].round_lable = round_label
             self.infos[code].dividend_lable = dividend_label
 
+    def prefetch(self, *codes):
+        """
+        concurrently prepare info objects of many codes in advance, typically called in ``prepare``
+
+        :param codes: F123456 or M123456, codes of funds
+        :return: None
+        """
+        codes = [
+            c for c in codes if c not in self.infos and (c[0] == "F" or c[0] == "M")
+        ]
+        self.pool.fetch(codes)
+        for code in codes:
+            self.infos[code] = self.pool.new(code)
+
     def get_info(self, code):
         """
         get the correct new info object based on Fcode
@@ -124,13 +139,9 @@ class BTE:
         """
         if code in self.infos:
             return self.infos[code]
-        if code.startswith("F"):
-            try:
-                return fundinfo(code[1:])
-            except FundTypeError:
-                return mfundinfo(code[1:])
-        elif code.startswith("M"):
-            return mfundinfo(code[1:])
+        if code.startswith("F") or code.startswith("M"):
+            # fundinfo 不认可的代码由 pool 回退到 mfundinfo，返回的对象不与其他调用共享
+            return self.pool.new(code)
         else:
             return vinfo(
                 code, start=(self.start - pd.Timedelta(days=180)).strftime("%Y-%m-%d")
@@ -6,13 +6,19 @@ basic constants and utility functions
 import datetime as dt
 import os
 import time
+import json
+import math
 import logging
 import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
+from urllib.parse import urlparse
 import requests
 from functools import wraps
 from simplejson.errors import JSONDecodeError
 
+import numpy as np
 import pandas as pd
 from pyecharts.options import (
     AxisOpts,
@@ -333,9 +339,95 @@ def xnpv(rate, cashflows):
     return sum([cf / (1 + rate) ** ((t - t0).days / 365.0) for (t, cf) in chron_order])
 
 
+def _xirr_arrays(cashflows):
+    """
+    convert cashflows into numpy arrays of year offsets from the first date and amounts, in time order
+
+    :param cashflows: a list, in which each element is a tuple of the form (date, amount)
+    :returns: Tuple[np.ndarray, np.ndarray]
+    """
+    if len(cashflows) == 0:
+        return np.zeros(0), np.zeros(0)
+    chron_order = sorted(cashflows, key=lambda x: x[0])
+    t0 = chron_order[0][0]
+    t = np.array([(d - t0).days for d, _ in chron_order], dtype=float) / 365.0
+    amounts = np.array([cf for _, cf in chron_order], dtype=float)
+    return t, amounts
+
+
+def _xirr_bracket(t, amounts, guess=0.1):
+    """
+    bracketed fallback of xirr, the sign change of npv nearest to guess is refined by brentq
+    """
+
+    def f(r):
+        return np.sum(amounts * (1.0 + r) ** -t)
+
+    grid = np.unique(
+        np.r_[
+            guess,
+            -0.9999,
+            -0.999,
+            -0.99,
+            -0.9,
+            -0.7,
+            -0.5,
+            -0.3,
+            -0.1,
+            0.0,
+            0.1,
+            0.3,
+            0.5,
+            1.0,
+            2.0,
+            5.0,
+            10.0,
+            100.0,
+            1e3,
+            1e4,
+        ]
+    )
+    grid = grid[grid > -1]
+    with np.errstate(all="ignore"):
+        values = np.array([f(r) for r in grid])
+    ok = np.isfinite(values)
+    grid, values = grid[ok], values[ok]
+    brackets = np.nonzero(np.sign(values[:-1]) * np.sign(values[1:]) <= 0)[0]
+    if len(brackets) == 0:
+        raise RuntimeError("Failed to find the root of xirr")
+    i = brackets[np.argmin(np.abs(grid[brackets] - guess))]
+    if values[i] == 0:
+        return float(grid[i])
+    with np.errstate(all="ignore"):
+        return float(optimize.brentq(f, grid[i], grid[i + 1], xtol=1e-12))
+
+
+def _xirr_solve(t, amounts, guess=0.1, tol=1.48e-8, maxiter=50):
+    """
+    Newton's method with analytic derivative, npv and its derivative share the discount factors
+    """
+    r = float(guess)
+    with np.errstate(all="ignore"):
+        for _ in range(maxiter):
+            discount = (1.0 + r) ** -t
+            f = np.dot(amounts, discount)
+            fprime = -np.dot(t * amounts, discount) / (1.0 + r)
+            if fprime == 0 or not np.isfinite(f) or not np.isfinite(fprime):
+                break
+            step = f / fprime
+            r -= step
+            if not r > -1:
+                break
+            if abs(step) <= tol:
+                return float(r)
+    return _xirr_bracket(t, amounts, guess)
+
+
 def xirr(cashflows, guess=0.1):
     """
     calculate the Internal Rate of Return of a series of cashflows at irregular intervals.
+    Newton's method with analytic derivative is used on numpy arrays,
+    and a bracketed root finding is used as fallback if Newton's method fails.
 
     :param cashflows: a list, in which each element is a tuple of the form (date, amount),
         where date is a datetime object and amount is an integer or floating number.
@@ -344,18 +436,67 @@ def xirr(cashflows, guess=0.1):
     :param guess: floating number, a guess at the xirr rate solution to be used
         as a starting point for the numerical solution
     :returns: the IRR as a single floating number
+    :raises RuntimeError: if no root can be found
     """
-    return optimize.newton(lambda r: xnpv(r, cashflows), guess)
+    t, amounts = _xirr_arrays(cashflows)
+    return _xirr_solve(t, amounts, guess)
 
 
-def myround(num, label=1):
+def xirr_batch(cashflows_list, guess=0.1):
     """
-    correct implementation of round with round half up, round to 2 decimals
+    calculate the Internal Rate of Return of many series of cashflows in one call,
+    eg. for many funds or for many end dates of one portfolio.
+    Newton's method runs on all series at once as a 2D array, the unconverged ones fall back to :func:`xirr`.
 
-    :param num: the floating number, to be rounded
-    :param label: integer 1 or 2, 1 for round half up while 2 for always round down
-    :returns: the float number after rounding, with two decimals
+    :param cashflows_list: list of cashflows, each in the form required by :func:`xirr`
+    :param guess: floating number or array like with the same length as cashflows_list
+    :returns: np.ndarray of the IRRs, nan for the series without solution
     """
+    arrays = [_xirr_arrays(cf) for cf in cashflows_list]
+    m = len(arrays)
+    guess = np.broadcast_to(np.asarray(guess, dtype=float), (m,)).copy()
+    if m == 0:
+        return np.zeros(0)
+    n = max(len(a[0]) for a in arrays)
+    t = np.zeros((m, n))
+    amounts = np.zeros((m, n))
+    for i, (ti, ai) in enumerate(arrays):
+        t[i, : len(ti)] = ti
+        amounts[i, : len(ai)] = ai
+
+    res = guess.copy()
+    converged = np.zeros(m, dtype=bool)
+    active = np.ones(m, dtype=bool)
+    with np.errstate(all="ignore"):
+        for _ in range(50):
+            rr = res[active]
+            discount = (1.0 + rr[:, None]) ** -t[active]
+            f = np.sum(amounts[active] * discount, axis=1)
+            fprime = -np.sum(t[active] * amounts[active] * discount, axis=1) / (
+                1.0 + rr
+            )
+            step = f / fprime
+            rr = rr - step
+            res[active] = rr
+            idx = np.nonzero(active)[0]
+            bad = ~np.isfinite(rr) | ~(rr > -1)
+            done = ~bad & (np.abs(step) <= 1.48e-8)
+            converged[idx[done]] = True
+            active[idx[done | bad]] = False
+            if not active.any():
+                break
+    for i in np.nonzero(~converged)[0]:
+        if len(arrays[i][0]) == 0:
+            res[i] = np.nan
+            continue
+        try:
+            res[i] = _xirr_solve(arrays[i][0], arrays[i][1], guess[i])
+        except RuntimeError:
+            res[i] = np.nan
+    return res
+
+
+def _myround_decimal(num, label=1):
     if label == 1:
         res = float(
             Decimal(str(num)).quantize(Decimal("0.01"), rounding="ROUND_HALF_UP")
@@ -367,6 +508,66 @@ def myround(num, label=1):
     return res
 
 
+# 100*x 的浮点误差远小于该相对阈值，离舍入边界更远时浮点运算结果与 Decimal 一致
+_round_tol = 1e-15
+
+
+def myround(num, label=1):
+    """
+    correct implementation of round with round half up, round to 2 decimals.
+    The result is the same as rounding the shortest decimal representation of num, float arithmetic is used
+    unless num is too close to the rounding boundary where Decimal is used instead.
+
+    :param num: the floating number, to be rounded
+    :param label: integer 1 or 2, 1 for round half up while 2 for always round down
+    :returns: the float number after rounding, with two decimals
+    """
+    if isinstance(num, (float, int)) and not isinstance(num, bool):
+        ay = abs(num) * 100.0
+        if ay < 1e13:
+            if label == 1:
+                n = math.floor(ay + 0.5)
+                near = abs(ay - math.floor(ay) - 0.5)
+            elif label == 2:
+                n = math.floor(ay)
+                near = min(ay - n, n + 1 - ay)
+            else:
+                near = 0
+            if near > ay * _round_tol:
+                return math.copysign(n / 100, num)
+    return _myround_decimal(num, label)
+
+
+def myround_array(arr, label=1):
+    """
+    vectorized :func:`myround`, with exactly the same results element-wise
+
+    :param arr: array like of numbers
+    :param label: integer 1 or 2, 1 for round half up while 2 for always round down
+    :returns: np.ndarray of float
+    """
+    orig = np.asarray(arr)
+    x = orig.astype(float)
+    ay = np.abs(x) * 100.0
+    with np.errstate(invalid="ignore"):
+        if label == 1:
+            n = np.floor(ay + 0.5)
+            near = np.abs(ay - np.floor(ay) - 0.5)
+        elif label == 2:
+            n = np.floor(ay)
+            near = np.minimum(ay - n, n + 1 - ay)
+        else:
+            n = ay
+            near = np.zeros_like(ay)
+        res = np.copysign(n / 100, x)
+        slow = ~((near > ay * _round_tol) & (ay < 1e13))
+    if orig.dtype.kind not in "fiu":
+        slow[:] = True
+    for i in np.flatnonzero(slow):
+        res.flat[i] = _myround_decimal(orig.flat[i], label)
+    return res
+
+
 def convert_date(date):
     """
     convert date into datetime object
@@ -439,6 +640,192 @@ def _float(n):
     return float(n)
 
 
+class FetchStats:
+    """
+    进程内的抓取与缓存统计，线程安全。包括三类数据：
+
+    1. counters: 计数器，如 ``cachedio`` 层的 ``cachedio.memory_hit``, ``cachedio.disk_hit``,
+       ``cachedio.forward_extend`` （向前延拓，补齐更早数据）, ``cachedio.backward_extend`` （向后延拓，补齐更新数据）
+       和 ``cachedio.full_fetch`` （完全重新爬取）。
+
+    2. timers: 计时器，如 ``get_daily.xueqiu``, 记录 ``_get_daily`` 各数据源的调用次数，总耗时和最大耗时。
+
+    3. hosts: ``reconnect`` 层按 host 统计的请求数，重试数，失败数，下载字节数和请求耗时。
+
+    全局实例为 ``xa.fetch_stats``，一般无需自行实例化。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        clear all the stats recorded so far
+        """
+        with self._lock:
+            self.counters = {}
+            self.timers = {}
+            self.hosts = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            t = self.timers.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+            t["count"] += 1
+            t["total"] += seconds
+            t["max"] = max(t["max"], seconds)
+
+    def record_request(self, host, latency=0.0, retries=0, nbytes=0, failed=False):
+        """
+        record one http request issued by :func:`reconnect` wrapped functions
+
+        :param host: str, netloc of the url
+        :param latency: float, seconds spent on the successful attempt
+        :param retries: int, number of failed attempts before this record
+        :param nbytes: int, size of the response body
+        :param failed: bool, whether the request finally fails after all the tries
+        """
+        with self._lock:
+            h = self.hosts.setdefault(
+                host,
+                {
+                    "requests": 0,
+                    "retries": 0,
+                    "failures": 0,
+                    "bytes": 0,
+                    "latency": 0.0,
+                    "max_latency": 0.0,
+                },
+            )
+            h["requests"] += 1
+            h["retries"] += retries
+            h["bytes"] += nbytes
+            if failed:
+                h["failures"] += 1
+            else:
+                h["latency"] += latency
+                h["max_latency"] = max(h["max_latency"], latency)
+
+    def get(self, name, default=0):
+        """
+        query single counter or timer by name
+
+        :param name: str, eg. "cachedio.memory_hit" or "get_daily.ttjj"
+        :return: int for counter, dict with keys count, total and max for timer
+        """
+        with self._lock:
+            if name in self.counters:
+                return self.counters[name]
+            if name in self.timers:
+                return dict(self.timers[name])
+            return default
+
+    def summary(self):
+        """
+        :return: Dict[str, Dict]. snapshot of counters, timers and hosts
+        """
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "timers": {k: dict(v) for k, v in self.timers.items()},
+                "hosts": {k: dict(v) for k, v in self.hosts.items()},
+            }
+
+    def hosts_table(self):
+        """
+        :return: pd.DataFrame. 每行为一个 host，按总耗时从大到小排列，可用于定位慢数据源
+        """
+        hosts = self.summary()["hosts"]
+        df = pd.DataFrame(
+            [dict(host=k, **v) for k, v in hosts.items()],
+            columns=[
+                "host",
+                "requests",
+                "retries",
+                "failures",
+                "bytes",
+                "latency",
+                "max_latency",
+            ],
+        )
+        df["avg_latency"] = df["latency"] / (df["requests"] - df["failures"]).clip(
+            lower=1
+        )
+        return df.sort_values(by="latency", ascending=False).reset_index(drop=True)
+
+    def to_json(self, **kws):
+        return json.dumps(self.summary(), **kws)
+
+    def to_prometheus(self, prefix="xalpha"):
+        """
+        export the stats in prometheus text exposition format
+
+        :param prefix: str, prefix for all metric names
+        :return: str
+        """
+
+        def _label(v):
+            return str(v).replace("\\", "\\\\").replace('"', '\\"')
+
+        s = self.summary()
+        lines = ["# TYPE %s_events_total counter" % prefix]
+        for k, v in sorted(s["counters"].items()):
+            lines.append('%s_events_total{name="%s"} %s' % (prefix, _label(k), v))
+        lines.append("# TYPE %s_duration_seconds summary" % prefix)
+        for k, v in sorted(s["timers"].items()):
+            lines.append(
+                '%s_duration_seconds_count{name="%s"} %s'
+                % (prefix, _label(k), v["count"])
+            )
+            lines.append(
+                '%s_duration_seconds_sum{name="%s"} %s'
+                % (prefix, _label(k), v["total"])
+            )
+        lines.append("# TYPE %s_duration_seconds_max gauge" % prefix)
+        for k, v in sorted(s["timers"].items()):
+            lines.append(
+                '%s_duration_seconds_max{name="%s"} %s' % (prefix, _label(k), v["max"])
+            )
+        for field, mtype in [
+            ("requests", "counter"),
+            ("retries", "counter"),
+            ("failures", "counter"),
+            ("bytes", "counter"),
+            ("latency", "counter"),
+        ]:
+            metric = "%s_http_%s" % (prefix, field)
+            if field == "latency":
+                metric += "_seconds"
+            metric += "_total"
+            lines.append("# TYPE %s %s" % (metric, mtype))
+            for k, v in sorted(s["hosts"].items()):
+                lines.append('%s{host="%s"} %s' % (metric, _label(k), v[field]))
+        return "\n".join(lines) + "\n"
+
+    def export(self, path, form="prometheus"):
+        """
+        dump the stats into file, eg. for node exporter textfile collector
+
+        :param path: str, file path
+        :param form: str, "prometheus" or "json"
+        """
+        if form == "prometheus":
+            content = self.to_prometheus()
+        elif form == "json":
+            content = self.to_json()
+        else:
+            raise ValueError("no %s option for stats export" % form)
+        with open(path, "w") as f:
+            f.write(content)
+
+
+fetch_stats = FetchStats()
+
+
 def reconnect(tries=5, timeout=12):
     def robustify(f):
         @wraps(f)
@@ -459,13 +846,22 @@ def reconnect(tries=5, timeout=12):
             ):
                 headers["user-agent"] = "Mozilla/5.0"
             kws["headers"] = headers
+            host = urlparse(url).netloc or "unknown"
             for count in range(tries):
                 try:
                     logger.debug(
                         "Fetching url: %s . Inside function `%s`"
                         % (url, inspect.stack()[1].function)
                     )
+                    t0 = time.perf_counter()
                     r = f(*args, **kws)
+                    content = getattr(r, "content", None)
+                    fetch_stats.record_request(
+                        host,
+                        latency=time.perf_counter() - t0,
+                        retries=count,
+                        nbytes=len(content) if isinstance(content, bytes) else 0,
+                    )
                     return r
                 except connection_errors as e:
                     logger.warning("Fails at fetching url: %s. Try again." % url)
@@ -475,6 +871,7 @@ def reconnect(tries=5, timeout=12):
                             % (url, tries)
                         )
                         logger.error("Fails due to %s" % e.args[0])
+                        fetch_stats.record_request(host, retries=count, failed=True)
                         raise e
                     time.sleep(0.5 * count)
 
@@ -573,3 +970,20 @@ holdings["501018rt"] = {
     "commodities/brent-oil": {"weight": 49, "time": -1},
     "commodities/crude-oil": {"weight": 45, "time": 4},
 }
+
+
+def concurrent_map(func, items, max_workers=8):
+    """
+    apply func on each of items with a thread pool, the order of the results is the same as items.
+    io bound helper for fetching many pages or many funds together.
+
+    :param func: callable with one argument
+    :param items: iterable of the arguments
+    :param max_workers: int, the size of the thread pool, 1 or None for serial execution in current thread
+    :returns: list of results
+    """
+    items = list(items)
+    if not max_workers or max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(func, items))
@@ -3,24 +3,560 @@
 module for implementation of indicator class, which is designed as MinIn for systems with netvalues
 """
 
+from collections import deque
+
+import numpy as np
 import pandas as pd
 from pyecharts import options as opts
 from pyecharts.charts import Kline, Line, Bar, Grid
 from pyecharts.commons.utils import JsCode
 
-from xalpha.cons import line_opts, opendate, yesterdayobj
+from xalpha.cons import concurrent_map, line_opts, opendate, yesterdayobj
+
+
+class IndicatorEngine:
+    """
+    batch calculator of technical indicators over a numpy array of prices.
+    Intermediate lines such as moving averages and ema lines are computed once and shared by all indicators asked,
+    and nothing is written back to any price table.
+    The array can be 1D for one instrument, or 2D of dates × instruments where indicators are computed column-wise.
+    Each indicator method returns a dict of column name to array, the names are the same as the columns
+    added by the corresponding method of :class:`indicator`.
+
+    :param values: array like of prices in time order
+    """
+
+    def __init__(self, values):
+        self.values = np.asarray(values, dtype=float)
+        self._cache = {}
+
+    def _2d(self, x):
+        return x.reshape(len(x), -1)
+
+    def _1d(self, x):
+        if self.values.ndim == 1:
+            return x[:, 0]
+        return x
+
+    def _rolling(self, how, window, x=None):
+        """
+        rolling mean, std, min, max or sum with full window, the same as pandas, of values or given array
+        """
+        if x is None:
+            key = (how, window)
+            if key not in self._cache:
+                self._cache[key] = self._rolling(how, window, self.values)
+            return self._cache[key]
+        df = pd.DataFrame(self._2d(x)).rolling(window=window)
+        return self._1d(getattr(df, how)().values)
+
+    def _ewm(self, span, x=None):
+        """
+        ewm mean with alpha=2/(1+span), the same as pandas, of values or given array
+        """
+        if x is None:
+            key = ("ewm", span)
+            if key not in self._cache:
+                self._cache[key] = self._ewm(span, self.values)
+            return self._cache[key]
+        return self._1d(pd.DataFrame(self._2d(x)).ewm(span=span).mean().values)
+
+    def _diff(self, window, x=None):
+        if x is None:
+            x = self.values
+        d = np.full(x.shape, np.nan)
+        d[window:] = x[window:] - x[:-window]
+        return d
+
+    def _shift(self, window, x=None):
+        if x is None:
+            x = self.values
+        d = np.full(x.shape, np.nan)
+        d[window:] = x[:-window]
+        return d
+
+    def ma(self, window=5):
+        return {"MA" + str(window): self._rolling("mean", window)}
+
+    def md(self, window=5):
+        return {"MD" + str(window): self._rolling("std", window)}
+
+    def ema(self, window=5):
+        return {"EMA" + str(window): self._ewm(window)}
+
+    def macd(self, fast_window=12, slow_window=26, signal_window=9):
+        # 短期ema和长期ema的差
+        diff = self._ewm(fast_window) - self._ewm(slow_window)
+        # 该差的再次 ema 平均
+        dem = self._ewm(signal_window, diff)
+        suffix = str(fast_window) + "_" + str(slow_window)
+        return {
+            "MACD_DIFF_" + suffix: diff,
+            "MACD_DEM_" + suffix: dem,
+            # ema平均过的差和原来差的差
+            "MACD_OSC_" + suffix: diff - dem,
+        }
+
+    def mtm(self, window=10):
+        return {"MTM" + str(window): self._diff(window)}
+
+    def roc(self, window=10):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {"ROC" + str(window): self._diff(window) / self._shift(window)}
+
+    def boll(self, window=10, deviation=2):
+        d = self.ma(window)
+        d.update(self.md(window))
+        ma = d["MA" + str(window)]
+        md = d["MD" + str(window)]
+        d["BOLL_UPPER"] = ma + deviation * md
+        d["BOLL_LOWER"] = ma - deviation * md
+        return d
+
+    def bias(self, window=10):
+        d = self.ma(window)
+        ma = d["MA" + str(window)]
+        d["BIAS" + str(window)] = (self.values - ma) / ma
+        return d
+
+    def rsi(self, window=14):
+        move = self._diff(1)
+        listed = np.maximum.accumulate(~np.isnan(self.values), axis=0)
+        # 首个净值处的变动记为 0，之前（尚未上市）保持 nan
+        first = listed.copy()
+        first[1:] &= ~listed[:-1]
+        move[first] = 0
+        up = np.where(move > 0, move, 0)
+        down = np.where(move > 0, 0, -move)
+        up[~listed] = np.nan
+        pos = self._ewm(window, up)
+        neg = self._ewm(window, down)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return {"RSI" + str(window): pos / (pos + neg)}
+
+    def kdj(self, rsv_window=9, k_window=3, d_window=3):
+        low = self._rolling("min", rsv_window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsv = (self.values - low) / (self._rolling("max", rsv_window) - low)
+        k = self._rolling("mean", k_window, rsv)
+        d = self._rolling("mean", d_window, k)
+        return {"KDJ_K": k, "KDJ_D": d, "KDJ_J": 3 * k - 2 * d}
+
+    def wnr(self, window=14):
+        low = self._rolling("min", window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wnr = (self.values - low) / (self._rolling("max", window) - low)
+        return {"WNR" + str(window): wnr}
+
+    def dma(self, fast_window=10, slow_window=50, ama_window=10):
+        dma = self._rolling("mean", fast_window) - self._rolling("mean", slow_window)
+        return {"DMA": dma, "AMA": self._rolling("mean", ama_window, dma)}
+
+    def bbi(self):
+        bbi = self._rolling("mean", 3)
+        bbi = bbi + self._rolling("mean", 6)
+        bbi = bbi + self._rolling("mean", 12)
+        bbi = bbi + self._rolling("mean", 24)
+        return {"BBI": bbi / 4}
+
+    def trix(self, window=10, ma_window=10):
+        tr = self._ewm(window)
+        tr = self._ewm(window, tr)
+        tr = self._ewm(window, tr)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            trix = self._diff(1, tr) / self._shift(1, tr)
+        return {
+            "TRIX" + str(window): trix,
+            "TRMA" + str(window): self._rolling("mean", ma_window, trix),
+        }
+
+    def psy(self, count_window=12, ma_window=6):
+        move = self._diff(1)
+        # 上涨记 1，否则记 0，窗口内有缺失值时结果为 nan
+        up = np.where(np.isnan(move), np.nan, move > 0)
+        psy = self._rolling("sum", count_window, up) / count_window
+        return {
+            "PSY" + str(count_window): psy,
+            "PSYMA" + str(count_window): self._rolling("mean", ma_window, psy),
+        }
+
+
+class IndicatorPanel:
+    """
+    cross-sectional panel of technical indicators and risk metrics over many instruments,
+    all computed column-wise on a dates × instruments netvalue matrix instead of one info object at a time.
+    The risk metrics follow the definitions of the corresponding methods in :class:`indicator`,
+    each instrument is measured from its first netvalue. Missing netvalues between the first and the last one
+    of an instrument are forward filled.
+
+    :param nav: pd.DataFrame, index of dates (or with date column) and one column of netvalues per instrument
+    :param riskfree: float, annual rate in the unit of 100%, used in sharpe
+    """
+
+    def __init__(self, nav, riskfree=0.0371724):
+        if "date" in nav.columns:
+            nav = nav.set_index("date")
+        nav = nav.sort_index()
+        nav.index = pd.to_datetime(nav.index)
+        self.nav = nav.ffill().where(nav.bfill().notna()).astype(float)
+        self.riskfree = riskfree
+        self.engine = IndicatorEngine(self.nav.values)
+
+    @classmethod
+    def from_daily(cls, codes, start=None, end=None, col="close", max_workers=8, **kws):
+        """
+        build the panel from :func:`xalpha.universal.get_daily` of each code, fetched concurrently
+        and cached by the backend of ``xa.set_backend``
+
+        :param codes: list of str, codes accepted by get_daily, eg. ["F501018", "SH510300"]
+        :param start: str. "20200101", "2020/01/01", "2020-01-01" are all legal.
+        :param end: str. format is the same as start
+        :param col: str, column in the daily data used as netvalue
+        :param max_workers: int, 并发请求数
+        :param kws: other parameters passed to IndicatorPanel
+        :returns: IndicatorPanel
+        """
+        import xalpha.universal as xu
+
+        dfs = concurrent_map(
+            lambda code: xu.get_daily(code, start=start, end=end),
+            codes,
+            max_workers=max_workers,
+        )
+        nav = pd.DataFrame({c: df.set_index("date")[col] for c, df in zip(codes, dfs)})
+        return cls(nav, **kws)
+
+    def indicators(self, *specs):
+        """
+        compute technical indicators for all instruments
+
+        :param specs: name of the indicator method such as "ma", "macd" and "rsi", or tuple of the name and
+            a dict of its parameters, the same as :meth:`indicator.indicators`
+        :returns: Dict[str, pd.DataFrame], 指标名（与 indicator 中列名相同）到 dates × instruments 表的映射
+        """
+        d = {}
+        for spec in specs:
+            if isinstance(spec, str):
+                spec = (spec, {})
+            for k, v in getattr(self.engine, spec[0])(**spec[1]).items():
+                d[k] = pd.DataFrame(v, index=self.nav.index, columns=self.nav.columns)
+        return d
+
+    def metrics(self, date=None):
+        """
+        risk metrics of all instruments with netvalues up to date
+
+        :param date: date obj or string, default the last date of the panel
+        :returns: pd.DataFrame, index of instruments, columns are total_return, annualized_returns,
+            volatility, sharpe and max_drawdown (回撤幅度，单位 1，不大于 0)
+        """
+        nav = self.nav if date is None else self.nav[self.nav.index <= date]
+        valid = nav.notna()
+        first = nav.bfill().iloc[0]
+        last = nav.ffill().iloc[-1]
+        start = valid.idxmax().where(valid.any())
+        end = valid[::-1].idxmax().where(valid.any())
+        totreturn = (last - first) / first
+        days = (end - start).dt.days
+        annualized = (1 + totreturn) ** (365 / days.where(days > 0)) - 1
+        volatility = nav.pct_change(fill_method=None).std() * 15.8144
+        peak = nav.cummax()
+        return pd.DataFrame(
+            {
+                "total_return": totreturn,
+                "annualized_returns": annualized,
+                "volatility": volatility,
+                "sharpe": (annualized - self.riskfree) / volatility,
+                "max_drawdown": ((nav - peak) / peak).min(),
+            }
+        )
+
+    def cross_section(self, *specs, date=None):
+        """
+        risk metrics together with the values of technical indicators on date for all instruments
+
+        :param specs: indicators to include, the same as :meth:`indicators`
+        :param date: date obj or string, default the last date of the panel
+        :returns: pd.DataFrame, index of instruments
+        """
+        df = self.metrics(date)
+        i = (
+            len(self.nav)
+            if date is None
+            else self.nav.index.searchsorted(pd.Timestamp(date), side="right")
+        )
+        if i == 0:
+            raise ValueError("no netvalue on or before %s" % date)
+        for k, v in self.indicators(*specs).items():
+            df[k] = v.iloc[i - 1]
+        return df
+
+    def rank(self, by="sharpe", *specs, date=None, ascending=False, top=None):
+        """
+        instruments ranked by one column of the cross section, 用于全市场筛选
+
+        :param by: str, column of :meth:`cross_section` to rank by, eg. "sharpe", "max_drawdown" or "RSI14"
+        :param specs: indicators to include, the same as :meth:`indicators`
+        :param date: date obj or string, default the last date of the panel
+        :param ascending: bool, default False, the largest ranks first
+        :param top: Optional[int], only keep the first top instruments
+        :returns: pd.DataFrame, cross section with rank column, sorted by rank and nan at last
+        """
+        df = self.cross_section(*specs, date=date)
+        df["rank"] = df[by].rank(ascending=ascending, method="min")
+        df = df.sort_values(
+            by, ascending=ascending, kind="mergesort", na_position="last"
+        )
+        if top is not None:
+            df = df.iloc[:top]
+        return df
+
+
+class _StreamingEWM:
+    """
+    ewm mean updated one value by one value, the same recursion as pandas ``ewm(span=span).mean()``
+    """
+
+    __slots__ = ("factor", "weighted", "oldweight")
+
+    def __init__(self, span):
+        self.factor = 1.0 - 2 / (1 + span)
+        self.weighted = np.nan
+        self.oldweight = 1.0
 
+    def update(self, x):
+        if self.weighted == self.weighted:
+            self.oldweight *= self.factor
+            if x == x:
+                if self.weighted != x:
+                    self.weighted = (self.oldweight * self.weighted + x) / (
+                        self.oldweight + 1.0
+                    )
+                self.oldweight += 1.0
+        elif x == x:
+            self.weighted = x
+        return self.weighted
 
-def _upcount(ls):
+
+class _StreamingRolling:
+    """
+    mean and std of the latest window values updated by adding the new value and removing the oldest one,
+    nan unless window values are all present, the same as pandas ``rolling(window)``
+    """
+
+    __slots__ = ("window", "values", "nobs", "mean", "ssqdm", "same")
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.same = 0  # 末尾连续相同值的个数
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) > self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                if self.nobs:
+                    delta = old - self.mean
+                    self.mean -= delta / self.nobs
+                    self.ssqdm -= (self.nobs + 1) * delta * delta / self.nobs
+                else:
+                    self.mean = self.ssqdm = 0.0
+        if x == x:
+            self.nobs += 1
+            delta = x - self.mean
+            self.mean += delta / self.nobs
+            self.ssqdm += (self.nobs - 1) * delta * delta / self.nobs
+            if len(self.values) > 1 and x == self.values[-2]:
+                self.same += 1
+            else:
+                self.same = 1
+        else:
+            self.same = 0
+
+    def getmean(self):
+        if self.nobs < self.window:
+            return np.nan
+        if self.same >= self.window:
+            return self.values[-1]
+        return self.mean
+
+    def getstd(self):
+        if self.nobs < self.window or self.window == 1:
+            return np.nan
+        if self.same >= self.window:
+            return 0.0
+        return max(self.ssqdm / (self.nobs - 1), 0.0) ** 0.5
+
+
+class StreamingIndicator:
     """
-    count the ratio of upmove days by given a list
+    base class of stateful indicators, which advance in O(1) with each new netvalue by ``update``,
+    for realtime signals where one price is appended to the history at a time.
+    The outputs are the same as the corresponding methods of :class:`indicator` on the whole history,
+    lines from ewm are identical and lines from rolling windows agree up to floating point rounding.
+    Initialize from the price table of an info object by :meth:`from_price` or ``infoobj.streaming(name)``.
     """
-    count = 0
-    for i in range(len(ls) - 1):
-        # somehow after pandas 0.23(22?), the input is a series(dataframe?) and old list supporting syntax are illegal
-        if ls.iloc[i + 1] > ls.iloc[i]:
-            count += 1
-    return count / (len(ls) - 1)
+
+    def __init__(self):
+        self.value = {}
+
+    @classmethod
+    def from_price(cls, price, col="netvalue", **kws):
+        """
+        :param price: pd.DataFrame, price table of info object
+        :param col: string, column name in dataframe you want to calculate
+        :param kws: parameters of the indicator, the same as the method in :class:`indicator`
+        :returns: the indicator having consumed all values in the price table
+        """
+        obj = cls(**kws)
+        for x in price[col].values:
+            obj.update(x)
+        return obj
+
+    def update(self, x):
+        """
+        :param x: float, the new netvalue or price
+        :returns: Dict[str, float], 指标名（与 indicator 中列名相同）到最新值的映射, also kept as ``self.value``
+        """
+        self.value = self._update(float(x))
+        return self.value
+
+    def _update(self, x):
+        raise NotImplementedError
+
+
+class StreamingMA(StreamingIndicator):
+    def __init__(self, window=5):
+        super().__init__()
+        self.window = window
+        self._rolling = _StreamingRolling(window)
+
+    def _update(self, x):
+        self._rolling.update(x)
+        return {"MA" + str(self.window): self._rolling.getmean()}
+
+
+class StreamingMD(StreamingIndicator):
+    def __init__(self, window=5):
+        super().__init__()
+        self.window = window
+        self._rolling = _StreamingRolling(window)
+
+    def _update(self, x):
+        self._rolling.update(x)
+        return {"MD" + str(self.window): self._rolling.getstd()}
+
+
+class StreamingEMA(StreamingIndicator):
+    def __init__(self, window=5):
+        super().__init__()
+        self.window = window
+        self._ewm = _StreamingEWM(window)
+
+    def _update(self, x):
+        return {"EMA" + str(self.window): self._ewm.update(x)}
+
+
+class StreamingMACD(StreamingIndicator):
+    def __init__(self, fast_window=12, slow_window=26, signal_window=9):
+        super().__init__()
+        self.suffix = str(fast_window) + "_" + str(slow_window)
+        self._fast = _StreamingEWM(fast_window)
+        self._slow = _StreamingEWM(slow_window)
+        self._signal = _StreamingEWM(signal_window)
+
+    def _update(self, x):
+        diff = self._fast.update(x) - self._slow.update(x)
+        dem = self._signal.update(diff)
+        return {
+            "MACD_DIFF_" + self.suffix: diff,
+            "MACD_DEM_" + self.suffix: dem,
+            "MACD_OSC_" + self.suffix: diff - dem,
+        }
+
+
+class StreamingBOLL(StreamingIndicator):
+    def __init__(self, window=10, deviation=2):
+        super().__init__()
+        self.window = window
+        self.deviation = deviation
+        self._rolling = _StreamingRolling(window)
+
+    def _update(self, x):
+        self._rolling.update(x)
+        ma = self._rolling.getmean()
+        md = self._rolling.getstd()
+        return {
+            "MA" + str(self.window): ma,
+            "MD" + str(self.window): md,
+            "BOLL_UPPER": ma + self.deviation * md,
+            "BOLL_LOWER": ma - self.deviation * md,
+        }
+
+
+class StreamingRSI(StreamingIndicator):
+    def __init__(self, window=14):
+        super().__init__()
+        self.window = window
+        self._last = np.nan
+        self._listed = False
+        self._up = _StreamingEWM(window)
+        self._down = _StreamingEWM(window)
+
+    def _update(self, x):
+        if x == x and not self._listed:
+            self._listed = True
+            move = 0.0  # 首个净值
+        else:
+            move = x - self._last  # 缺失值前后的变动为 nan
+        self._last = x
+        if not self._listed:
+            move = up = np.nan
+        else:
+            up = move if move > 0 else 0
+        pos = self._up.update(up)
+        neg = self._down.update(0 if move > 0 else -move)
+        tot = pos + neg
+        return {"RSI" + str(self.window): pos / tot if tot != 0 else np.nan}
+
+
+class StreamingMTM(StreamingIndicator):
+    def __init__(self, window=10):
+        super().__init__()
+        self.window = window
+        self._values = deque(maxlen=window + 1)
+
+    def _update(self, x):
+        self._values.append(x)
+        if len(self._values) <= self.window:
+            return {"MTM" + str(self.window): np.nan}
+        return {"MTM" + str(self.window): x - self._values[0]}
+
+
+class StreamingROC(StreamingMTM):
+    def _update(self, x):
+        self._values.append(x)
+        if len(self._values) <= self.window:
+            return {"ROC" + str(self.window): np.nan}
+        old = self._values[0]
+        return {"ROC" + str(self.window): (x - old) / old}
+
+
+_streaming = {
+    "ma": StreamingMA,
+    "md": StreamingMD,
+    "ema": StreamingEMA,
+    "macd": StreamingMACD,
+    "boll": StreamingBOLL,
+    "rsi": StreamingRSI,
+    "mtm": StreamingMTM,
+    "roc": StreamingROC,
+}
 
 
 class indicator:
@@ -67,11 +603,7 @@ class indicator:
         generate price table for mulfix class, the cinfo class has this attr by default
         """
         if getattr(self, "price", None) is None:  # 基金组合类，而非基金信息类
-            times = pd.date_range(self.totcftable.iloc[0].date, yesterdayobj())
-            netvalue = []
-            for date in times:
-                netvalue.append(self.unitvalue(date))  # may take a long time
-            self.price = pd.DataFrame(data={"date": times, "netvalue": netvalue})
+            self.price = self.unitvalue_series(yesterdayobj()).copy()
             self.price = self.price[self.price["date"].isin(opendate)]
             self.name = name
 
@@ -218,18 +750,119 @@ class indicator:
         :returns: three elements tuple, the first two are the date obj of
             start and end of the time window, the third one is the drawdown amplitude in unit 1.
         """
-        li = [
-            (row["date"], row["netvalue"])
-            for i, row in self.price[self.price["date"] <= date].iterrows()
-        ]
-        res = []
-        for i, _ in enumerate(li):
-            for j in range(i + 1, len(li)):
-                res.append((li[i][0], li[j][0], (li[j][1] - li[i][1]) / li[i][1]))
-        return min(res, key=lambda x: x[2])
+        partp = self.price[self.price["date"] <= date]
+        dates = partp["date"].values
+        v = partp["netvalue"].values.astype(float)
+        if len(v) < 2:
+            raise ValueError("at least two netvalues are needed for max drawdown")
+        # 对每个 j，回撤最大的起点是 j 之前净值最高（相同时最早）的 i
+        n = len(v)
+        newhigh = np.empty(n, dtype=bool)
+        newhigh[0] = True
+        newhigh[1:] = v[1:] > np.maximum.accumulate(v)[:-1]
+        peak = np.maximum.accumulate(np.where(newhigh, np.arange(n), 0))[:-1]
+        dd = (v[1:] - v[peak]) / v[peak]
+        # 回撤相同时与逐对比较的结果一致，取 i 最小，其次 j 最小
+        j = np.lexsort((np.arange(1, n), peak, dd))[0]
+        return (pd.Timestamp(dates[peak[j]]), pd.Timestamp(dates[j + 1]), dd[j])
+
+    def drawdown_series(self, date=yesterdayobj(), top=5):
+        """
+        回撤序列，在一次线性扫描中给出水下曲线、回撤持续时间和最大的若干次回撤
+
+        :param date: date obj or string
+        :param top: int, 给出的回撤次数
+        :returns: Tuple[pd.DataFrame, pd.DataFrame]. 第一个为水下曲线，列为 date, netvalue, peak（此前最高净值）,
+            drawdown（相对最高净值的回撤，单位 1）和 duration（距最高净值日的天数）；
+            第二个为回撤幅度最大的 top 次回撤，列为 start（回撤前最高净值日），valley（最低点），
+            end（恢复到前高的日期，尚未恢复为 NaT），drawdown 和 duration（从 start 到 end 或 date 的天数）
+        """
+        partp = self.price[self.price["date"] <= date]
+        dates = pd.DatetimeIndex(partp["date"])
+        v = partp["netvalue"].values.astype(float)
+        peak = np.maximum.accumulate(v)
+        atpeak = v >= peak
+        drawdown = (v - peak) / peak
+        peakdate = pd.Series(dates.where(atpeak)).ffill()
+        underwater = pd.DataFrame(
+            {
+                "date": dates,
+                "netvalue": v,
+                "peak": peak,
+                "drawdown": drawdown,
+                "duration": (dates - pd.DatetimeIndex(peakdate)).days,
+            }
+        )
+        columns = ["start", "valley", "end", "drawdown", "duration"]
+        if len(v) == 0:
+            return underwater, pd.DataFrame([], columns=columns)
+        # 每次创新高开始一段新的回撤，episode 为所在回撤段的编号
+        episode = np.cumsum(atpeak) - 1
+        starts = np.flatnonzero(atpeak)
+        valley = pd.Series(drawdown).groupby(episode).idxmin().values  # 各段最低点的位置
+        mdd = drawdown[valley]
+        order = np.argsort(mdd, kind="mergesort")[:top]
+        order = order[mdd[order] < 0]
+        recover = np.append(starts[1:], -1)[order]
+        end = [dates[r] if r >= 0 else pd.NaT for r in recover]
+        return (
+            underwater,
+            pd.DataFrame(
+                {
+                    "start": dates[starts[order]],
+                    "valley": dates[valley[order]],
+                    "end": end,
+                    "drawdown": mdd[order],
+                    "duration": [
+                        ((e if r >= 0 else dates[-1]) - dates[s]).days
+                        for e, r, s in zip(end, recover, starts[order])
+                    ],
+                },
+                columns=columns,
+            ),
+        )
 
     ## 以上基本为聚宽提供的整体量化指标，以下是其他短线技术面指标
 
+    def indicators(self, *specs, col="netvalue"):
+        """
+        compute a set of technical indicators in one pass by :class:`IndicatorEngine`,
+        shared moving averages and ema lines are only computed once and the price table is left untouched
+
+        :param specs: name of the indicator method such as "ma", "macd" and "rsi", or tuple of the name and
+            a dict of its parameters, eg. ("ma", {"window": 10})
+        :param col: string, column name in dataframe you want to calculate
+        :returns: pd.DataFrame, date column and columns of all indicators, named the same as the ones added by
+            the indicator methods
+        """
+        engine = IndicatorEngine(self.price[col].values)
+        d = {"date": self.price["date"].values}
+        for spec in specs:
+            if isinstance(spec, str):
+                spec = (spec, {})
+            d.update(getattr(engine, spec[0])(**spec[1]))
+        return pd.DataFrame(d, index=self.price.index)
+
+    def streaming(self, name, col="netvalue", **kws):
+        """
+        stateful indicator initialized from the price table, call its ``update`` with each new realtime
+        netvalue to get the latest values in O(1) instead of recomputing over the whole history
+
+        :param name: str, one of "ma", "md", "ema", "macd", "boll", "rsi", "mtm" and "roc"
+        :param col: string, column name in dataframe you want to calculate
+        :param kws: parameters of the indicator, the same as the method of the same name
+        :returns: :class:`StreamingIndicator`
+        """
+        if name not in _streaming:
+            raise ValueError("Unsupported streaming indicator %s" % name)
+        return _streaming[name].from_price(self.price, col=col, **kws)
+
+    def _indicate(self, col, name, **kws):
+        for k, v in getattr(IndicatorEngine(self.price[col].values), name)(
+            **kws
+        ).items():
+            self.price[k] = v
+
     def ma(self, window=5, col="netvalue"):
         """
         移动平均线指标
@@ -238,7 +871,7 @@ class indicator:
         :param window: the date window of the MA calculation
         :param col: string, column name in dataframe you want to calculate
         """
-        self.price["MA" + str(window)] = self.price[col].rolling(window=window).mean()
+        self._indicate(col, "ma", window=window)
 
     def md(self, window=5, col="netvalue"):
         """
@@ -248,7 +881,7 @@ class indicator:
         :param window: the date window of the MD calculation
         :param col: string, column name in dataframe you want to calculate
         """
-        self.price["MD" + str(window)] = self.price[col].rolling(window=window).std()
+        self._indicate(col, "md", window=window)
 
     def ema(self, window=5, col="netvalue"):
         """
@@ -258,7 +891,7 @@ class indicator:
         :param window: the span of date, where the decay factor alpha=2/(1+window)
         :param col: string, column name in dataframe you want to calculate
         """
-        self.price["EMA" + str(window)] = self.price[col].ewm(span=window).mean()
+        self._indicate(col, "ema", window=window)
 
     def macd(self, fast_window=12, slow_window=26, signal_window=9, col="netvalue"):
         """
@@ -270,17 +903,13 @@ class indicator:
         :param signal_window: int, the ema window of the signal line
         :param col: string, column name in dataframe you want to calculate
         """
-        EMAfast = pd.Series(self.price[col].ewm(span=fast_window).mean())
-        EMAslow = pd.Series(self.price[col].ewm(span=slow_window).mean())
-        # 短期ema和长期ema的差
-        MACDDiff = pd.Series(EMAfast - EMAslow)
-        # 该差的再次 ema 平均
-        MACDDem = pd.Series(MACDDiff.ewm(span=signal_window).mean())
-        # ema平均过的差和原来差的差
-        MACDOsc = pd.Series(MACDDiff - MACDDem)
-        self.price["MACD_DIFF_" + str(fast_window) + "_" + str(slow_window)] = MACDDiff
-        self.price["MACD_DEM_" + str(fast_window) + "_" + str(slow_window)] = MACDDem
-        self.price["MACD_OSC_" + str(fast_window) + "_" + str(slow_window)] = MACDOsc
+        self._indicate(
+            col,
+            "macd",
+            fast_window=fast_window,
+            slow_window=slow_window,
+            signal_window=signal_window,
+        )
 
     def mtm(self, window=10, col="netvalue"):
         """
@@ -290,7 +919,7 @@ class indicator:
         :param window: int, the difference between price now and window days ago
         :param col: string, column name in dataframe you want to calculate
         """
-        self.price["MTM" + str(window)] = self.price[col].diff(window)
+        self._indicate(col, "mtm", window=window)
 
     def roc(self, window=10, col="netvalue"):
         """
@@ -300,10 +929,7 @@ class indicator:
         :param window: int, the change rate between price now and window days ago
         :param col: string, column name in dataframe you want to calculate
         """
-        abdiff = self.price[col].diff(window)
-        deno = self.price[col].shift(window)
-        reladiff = pd.Series(abdiff / deno)
-        self.price["ROC" + str(window)] = reladiff
+        self._indicate(col, "roc", window=window)
 
     def boll(self, window=10, deviation=2, col="netvalue"):
         """
@@ -314,14 +940,7 @@ class indicator:
         :param deviation: int or float, how many times deviation of sigma
         :param col: string, column name in dataframe you want to calculate
         """
-        self.ma(window=window, col=col)
-        self.md(window=window, col=col)
-        self.price["BOLL_UPPER"] = (
-            self.price["MA" + str(window)] + deviation * self.price["MD" + str(window)]
-        )
-        self.price["BOLL_LOWER"] = (
-            self.price["MA" + str(window)] - deviation * self.price["MD" + str(window)]
-        )
+        self._indicate(col, "boll", window=window, deviation=deviation)
 
     def bias(self, window=10, col="netvalue"):
         """
@@ -331,10 +950,7 @@ class indicator:
         :param window: int, MA_window
         :param col: string, column name in dataframe you want to calculate
         """
-        self.ma(window=window, col=col)
-        self.price["BIAS" + str(window)] = (
-            self.price[col] - self.price["MA" + str(window)]
-        ) / self.price["MA" + str(window)]
+        self._indicate(col, "bias", window=window)
 
     def rsi(self, window=14, col="netvalue"):
         """
@@ -344,26 +960,7 @@ class indicator:
         :param window: int, MA_window
         :param col: string, column name in dataframe you want to calculate
         """
-        i = 0
-        UpI = [0]
-        DoI = [0]
-        while i + 1 <= len(self.price) - 1:
-            Move = self.price.loc[i + 1, col] - self.price.loc[i, col]
-            if Move > 0:
-                UpD = Move
-                DoD = 0
-            else:
-                UpD = 0
-                DoD = -Move
-            UpI.append(UpD)
-            DoI.append(DoD)
-            i = i + 1
-
-        UpI = pd.Series(UpI)
-        DoI = pd.Series(DoI)
-        PosDI = pd.Series(UpI.ewm(span=window).mean())
-        NegDI = pd.Series(DoI.ewm(span=window).mean())
-        self.price["RSI" + str(window)] = pd.Series(PosDI / (PosDI + NegDI))
+        self._indicate(col, "rsi", window=window)
 
     def kdj(self, rsv_window=9, k_window=3, d_window=3, col="netvalue"):
         """
@@ -376,14 +973,9 @@ class indicator:
         :param d_window: int
         :param col: string, column name in dataframe you want to calculate
         """
-        roll = self.price[col].rolling(window=rsv_window)
-        rsv = (self.price[col] - roll.min()) / (roll.max() - roll.min())
-        k = rsv.rolling(window=k_window).mean()
-        d = k.rolling(window=d_window).mean()
-        j = 3 * k - 2 * d
-        self.price["KDJ_K"] = k
-        self.price["KDJ_D"] = d
-        self.price["KDJ_J"] = j
+        self._indicate(
+            col, "kdj", rsv_window=rsv_window, k_window=k_window, d_window=d_window
+        )
 
     def wnr(self, window=14, col="netvalue"):
         """
@@ -393,9 +985,7 @@ class indicator:
         :param window: int
         :param col: string, column name in dataframe you want to calculate
         """
-        roll = self.price[col].rolling(window=window)
-        wnr = (self.price[col] - roll.min()) / (roll.max() - roll.min())
-        self.price["WNR" + str(window)] = wnr
+        self._indicate(col, "wnr", window=window)
 
     def dma(self, fast_window=10, slow_window=50, ama_window=10, col="netvalue"):
         """
@@ -407,13 +997,13 @@ class indicator:
         :param ama_window:  int
         :param col: string, column name in dataframe you want to calculate
         """
-        dma = (
-            self.price[col].rolling(window=fast_window).mean()
-            - self.price[col].rolling(window=slow_window).mean()
+        self._indicate(
+            col,
+            "dma",
+            fast_window=fast_window,
+            slow_window=slow_window,
+            ama_window=ama_window,
         )
-        ama = dma.rolling(window=ama_window).mean()
-        self.price["DMA"] = dma
-        self.price["AMA"] = ama
 
     def bbi(self, col="netvalue"):
         """
@@ -422,12 +1012,7 @@ class indicator:
 
         :param col: string, column name in dataframe you want to calculate
         """
-        bbi = self.price[col].rolling(3).mean()
-        bbi = bbi + self.price[col].rolling(6).mean()
-        bbi = bbi + self.price[col].rolling(12).mean()
-        bbi = bbi + self.price[col].rolling(24).mean()
-        bbi = bbi / 4
-        self.price["BBI"] = bbi
+        self._indicate(col, "bbi")
 
     def trix(self, window=10, ma_window=10, col="netvalue"):
         """
@@ -437,13 +1022,7 @@ class indicator:
         :param window: int
         :param col: string, column name in dataframe you want to calculate
         """
-        tr = self.price[col].ewm(span=window).mean()
-        tr = tr.ewm(span=window).mean()
-        tr = tr.ewm(span=window).mean()
-        trix = tr.diff(1) / tr.shift(1)
-        trma = trix.rolling(ma_window).mean()
-        self.price["TRIX" + str(window)] = trix
-        self.price["TRMA" + str(window)] = trma
+        self._indicate(col, "trix", window=window, ma_window=ma_window)
 
     def psy(self, count_window=12, ma_window=6, col="netvalue"):
         """
@@ -454,10 +1033,7 @@ class indicator:
         :param ma_window: int
         :param col: string, column name in dataframe you want to calculate
         """
-        psy = self.price[col].rolling(count_window + 1).aggregate(_upcount)
-        psyma = psy.rolling(ma_window).mean()
-        self.price["PSY" + str(count_window)] = psy
-        self.price["PSYMA" + str(count_window)] = psyma
+        self._indicate(col, "psy", count_window=count_window, ma_window=ma_window)
 
     ## 以下是可视化部分
 
@@ -4,13 +4,16 @@ modules of info class, including cashinfo, indexinfo and fundinfo class
 """
 
 import os
+import copy
 import csv
 import datetime as dt
 import json
 import re
 import logging
+import threading
 from functools import lru_cache
 
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 from sqlalchemy import exc
@@ -24,8 +27,8 @@ from xalpha.cons import (
     yesterday,
     yesterdaydash,
     yesterdayobj,
-    today_obj,
     rget,
+    concurrent_map,
     _float,
 )
 from xalpha.exceptions import FundTypeError, TradeBehaviorError, ParserFailure
@@ -33,6 +36,20 @@ from xalpha.indicator import indicator
 
 _warnmess = "Something weird on redem fee, please adjust self.segment by hand"
 logger = logging.getLogger(__name__)
+_js_var = re.compile(r"var\s+(\w+)\s*=\s*([^;]*);")
+_opendate_index = pd.to_datetime(opendate)
+_tz_bj_ms = 8 * 3600 * 1000  # 时间戳转为北京时间的毫秒偏移
+_f10_url = (
+    "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code=%s&page=%s&per=%s"
+)
+_f10_per = 20  # F10DataApi 单页最多返回 20 条
+_td = re.compile(r"<td[^>]*>(.*?)</td>", re.S)
+_tag = re.compile(r"<[^>]+>")
+
+_fee_cache = {}  # code: (timestamp, feeinfo, segment)
+fee_ttl = 180  # 赎回费信息缓存的有效天数，可通过 ``xa.set_backend(fee_ttl=...)`` 覆盖
+_holdings_lock = threading.Lock()
+_cash_cache = {}  # (interest, start): price table of cashinfo
 
 
 def _shengoucal(sg, sgf, value, label):
@@ -81,6 +98,122 @@ def _nfloat(string):
     return result
 
 
+def _js_vars(text):
+    """
+    tokenize all top-level ``var name = value;`` statements of the pingzhongdata js page in one pass
+
+    :param text: str, content of http://fund.eastmoney.com/pingzhongdata/<code>.js
+    :returns: Dict[str, str], raw js literal of each variable
+    """
+    return {m.group(1): m.group(2) for m in _js_var.finditer(text)}
+
+
+def _js_loads(literal):
+    """
+    parse js literal into python object, json first and fallback to eval for non-standard literal
+
+    :param literal: str, raw js literal
+    :returns: python object
+    """
+    try:
+        return json.loads(literal)
+    except ValueError:
+        return eval(literal.replace("null", "None"))
+
+
+def _js_dates(timestamps):
+    """
+    transform millisecond timestamps in the page into naive datetime of Beijing time
+
+    :param timestamps: list of int, timestamp in ms
+    :returns: pd.DatetimeIndex
+    """
+    ts = np.array(timestamps, dtype="int64") + _tz_bj_ms
+    return pd.to_datetime(ts, unit="ms")
+
+
+def _f10_table(code, lastdate, ncols, max_workers=8):
+    """
+    fetch the rows of F10DataApi net value table later than lastdate, all pages are requested concurrently
+
+    :param code: str, six digits code of the fund
+    :param lastdate: pd.Timestamp, the last date of the saved price table
+    :param ncols: int, number of columns in the table, 7 for fund and 6 for monetary fund
+    :param max_workers: int, number of concurrent requests
+    :returns: Tuple[np.ndarray, pd.DatetimeIndex], str cells of shape (n, ncols) and the dates,
+        in descending order of date
+    """
+    diffdays = (yesterdayobj() - lastdate).days + 1  # 今日数据可能已经更新
+    npages = (diffdays - 1) // _f10_per + 1
+
+    def _page(pg):
+        r = rget(_f10_url % (code, pg, _f10_per))
+        cells = [_tag.sub("", c).strip() for c in _td.findall(r.text)]
+        if len(cells) % ncols != 0:  # 暂无数据
+            return []
+        return cells
+
+    cells = []
+    for page in concurrent_map(_page, range(1, npages + 1), max_workers=max_workers):
+        cells.extend(page)
+    table = np.array(cells, dtype=object).reshape(-1, ncols)
+    dates = pd.to_datetime(table[:, 0])
+    # 翻页期间若有新数据插入，相邻页会出现重复行
+    fresh = (
+        np.logical_and.accumulate(np.asarray(dates > lastdate)) & ~dates.duplicated()
+    )
+    return table[fresh], dates[fresh]
+
+
+def _fee_load(code):
+    """
+    load redemption fee info of the fund from memory or the configured backend,
+    records older than the ttl are regarded as missing
+
+    :param code: str, six digits code of the fund
+    :returns: Tuple[list, list], feeinfo and segment, or None if no valid record
+    """
+    import xalpha.universal as xu
+
+    ttl = pd.Timedelta(days=xu.ioconf.get("fee_ttl", fee_ttl))
+    record = _fee_cache.get(code)
+    if record is None and xu.ioconf.get("backend") in ["csv", "sql"]:
+        df = xu.fetch_backend("FEE-" + code)
+        if df is not None and len(df) > 0:
+            record = (
+                pd.Timestamp(df.iloc[0]["date"]),
+                json.loads(df.iloc[0]["feeinfo"]),
+                json.loads(df.iloc[0]["segment"]),
+            )
+            _fee_cache[code] = record
+    if record is None or dt.datetime.now() - record[0] > ttl:
+        return None
+    return copy.deepcopy(record[1]), copy.deepcopy(record[2])
+
+
+def _fee_dump(code, feeinfo, segment):
+    """
+    save redemption fee info of the fund into memory and the configured backend
+
+    :param code: str, six digits code of the fund
+    :param feeinfo: list of str
+    :param segment: list of list of int
+    """
+    import xalpha.universal as xu
+
+    now = pd.Timestamp(dt.datetime.now().replace(microsecond=0))
+    _fee_cache[code] = (now, feeinfo, segment)
+    if xu.ioconf.get("backend") in ["csv", "sql"]:
+        df = pd.DataFrame(
+            {
+                "date": [now.strftime("%Y-%m-%d %H:%M:%S")],
+                "feeinfo": [json.dumps(feeinfo)],
+                "segment": [json.dumps(segment)],
+            }
+        )
+        xu.save_backend("FEE-" + code, df, mode="w")
+
+
 class FundReport:
     """
     提供查看各种基金报告的接口
@@ -191,10 +324,10 @@ class FundReport:
         return d
 
 
-@lru_cache()
 def get_fund_holdings(code, year="", season="", month="", category="jjcc"):
     """
-    获取基金详细的底层持仓信息
+    获取基金详细的底层持仓信息。指定年份和季度（月份）的持仓公布后不再变化，
+    会持久化在 ``xa.set_backend`` 设定的 csv 或 sql 后端中，新进程中不再重复抓取。
 
     :param code: str. 6 位基金代码
     :param year:  int. eg. 2019
@@ -213,6 +346,103 @@ def get_fund_holdings(code, year="", season="", month="", category="jjcc"):
         raise ParserFailure("unrecognized category %s" % category)
     if code.startswith("F"):
         code = code[1:]
+    if year:
+        year = int(year)
+    if month:
+        month = int(month)
+    # 参数归一后再缓存，不同的调用形式共享同一缓存
+    return _fund_holdings(code, year, month, category)
+
+
+@lru_cache()
+def _fund_holdings(code, year, month, category):
+    if not (year and month):  # 最新持仓随时间变化，不做持久化
+        return _get_fund_holdings(code, year, month, category)
+    df = _holdings_load(code, year, month, category)
+    if df is None:
+        df = _get_fund_holdings(code, year, month, category)
+        if df is not None:
+            _holdings_dump(code, year, month, category, df)
+    return df
+
+
+def get_fund_holdings_many(
+    codes, year="", season="", month="", category="jjcc", max_workers=8
+):
+    """
+    并发获取多个基金或多个季度的底层持仓信息，已缓存的持仓不再重复抓取
+
+    :param codes: list of str, or list of tuple (code, year, season)，后者可同时获取不同季度持仓
+    :param year: int. eg. 2019, codes 中元素为 str 时使用
+    :param season: int, 1,2,3,4
+    :param month: Optional[int]. 指定 season 即可，一般不需理会
+    :param category: str. stock 股票持仓， bond 债券持仓
+    :param max_workers: int, 并发请求数
+    :return: List[Optional[pd.DataFrame]]，与 codes 顺序对应
+    """
+    specs = []
+    for c in codes:
+        if isinstance(c, str):
+            specs.append((c, year, season, month, category))
+        else:
+            specs.append((c[0], c[1], c[2], month, category))
+    todo = list(dict.fromkeys(specs))
+    results = concurrent_map(
+        lambda spec: get_fund_holdings(*spec), todo, max_workers=max_workers
+    )
+    results = dict(zip(todo, results))
+    return [results[spec] for spec in specs]
+
+
+def _holdings_load(code, year, month, category):
+    """
+    load fund holdings of given quarter from the configured backend
+
+    :returns: pd.DataFrame or None if not saved
+    """
+    import xalpha.universal as xu
+
+    if xu.ioconf.get("backend") not in ["csv", "sql"]:
+        return None
+    with _holdings_lock:
+        df = xu.fetch_backend("HOLDINGS-" + code)
+    if df is None:
+        return None
+    df = df[
+        (df["year"].astype(int) == int(year))
+        & (df["month"].astype(int) == int(month))
+        & (df["category"] == category)
+    ]
+    if len(df) == 0:
+        return None
+    return pd.DataFrame(json.loads(df.iloc[-1]["content"]))
+
+
+def _holdings_dump(code, year, month, category, df):
+    """
+    append fund holdings of given quarter into the configured backend
+    """
+    import xalpha.universal as xu
+
+    if xu.ioconf.get("backend") not in ["csv", "sql"]:
+        return
+    # 持仓表以 json 存储，避免股票代码等字段被后端转换类型
+    row = pd.DataFrame(
+        {
+            "year": [int(year)],
+            "month": [int(month)],
+            "category": [category],
+            "content": [json.dumps(df.to_dict(orient="list"), ensure_ascii=False)],
+        }
+    )
+    with _holdings_lock:
+        if xu.fetch_backend("HOLDINGS-" + code) is None:
+            xu.save_backend("HOLDINGS-" + code, row, mode="w")
+        else:
+            xu.save_backend("HOLDINGS-" + code, row, mode="a")
+
+
+def _get_fund_holdings(code, year, month, category):
     r = rget(
         "http://fundf10.eastmoney.com/FundArchivesDatas.aspx?type={category}&code={code}&topline=10&\
 year={year}&month={month}".format(
@@ -361,6 +591,53 @@ class basicinfo(indicator):
         # self.price = pd.DataFrame(data={'date':[],'netvalue':[],'comment':[]})
         raise NotImplementedError
 
+    def _price_arrays(self):
+        """
+        numpy arrays of date and netvalue columns of price table, cached until ``self.price`` is replaced
+
+        :returns: Tuple[np.ndarray, np.ndarray], datetime64 dates and float netvalues
+        """
+        price = self.price
+        if getattr(self, "_price_ref", None) is not price or len(
+            self._price_cache[0]
+        ) != len(price):
+            self._price_cache = (
+                price["date"].values.astype("datetime64[ns]"),
+                price["netvalue"].values,
+            )
+            self._price_ref = price
+        return self._price_cache
+
+    def _row_after(self, date, fallback=True):
+        """
+        binary search the first row of price table on or after date
+
+        :param date: string or object of date
+        :param fallback: bool, if True, the last row is used when there is no row on or after date
+        :returns: Tuple[pd.Timestamp, float], date and netvalue of the row
+        :raises IndexError: no such row
+        """
+        dates, netvalues = self._price_arrays()
+        i = np.searchsorted(dates, pd.Timestamp(date).to_datetime64(), side="left")
+        if i == len(dates):
+            if not fallback or i == 0:
+                raise IndexError("no price record on or after %s" % date)
+            i -= 1
+        return pd.Timestamp(dates[i]), netvalues[i]
+
+    def _row_before(self, date):
+        """
+        binary search the last row of price table on or before date
+
+        :param date: string or object of date
+        :returns: Tuple[pd.Timestamp, float], date and netvalue of the row, or None if no such row
+        """
+        dates, netvalues = self._price_arrays()
+        i = np.searchsorted(dates, pd.Timestamp(date).to_datetime64(), side="right")
+        if i == 0:
+            return None
+        return pd.Timestamp(dates[i - 1]), netvalues[i - 1]
+
     def shengou(self, value, date, fee=None):
         """
         give the realdate deltacash deltashare tuple based on purchase date and purchase amount
@@ -376,9 +653,9 @@ class basicinfo(indicator):
         """
         if fee is None:
             fee = self.rate
-        row = self.price[self.price["date"] >= date].iloc[0]
-        share = _shengoucal(value, fee, row.netvalue, label=self.round_label + 1)[1]
-        return (row.date, -myround(value), share)
+        rdate, netvalue = self._row_after(date, fallback=False)
+        share = _shengoucal(value, fee, netvalue, label=self.round_label + 1)[1]
+        return (rdate, -myround(value), share)
 
     def shuhui(self, share, date, rem, value_label=None, fee=None):
         """
@@ -400,31 +677,26 @@ class basicinfo(indicator):
         if self.value_label == 0 or value_label == 0:
             return self._shuhui_by_share(share, date, rem)
         elif self.value_label == 1:  # 按金额赎回，仅支持无赎回费的货币基金
-            partprice = self.price[self.price["date"] >= date]
-            if len(partprice) == 0:
-                row = self.price[self.price["date"] < date].iloc[-1]
-            else:
-                row = partprice.iloc[0]
-            share = share / row.netvalue
+            _, netvalue = self._row_after(date)
+            share = share / netvalue
             return self._shuhui_by_share(share, date, rem, fee=fee)
 
     def _shuhui_by_share(self, share, date, rem, fee=None):
         date = convert_date(date)
-        tots = sum([remitem[1] for remitem in rem if remitem[0] <= date])
+        if isinstance(rem, rm.Lots):
+            tots = rem.shares_before(date)
+        else:
+            tots = sum([remitem[1] for remitem in rem if remitem[0] <= date])
         if share > tots:
             sh = tots
         else:
             sh = share
-        partprice = self.price[self.price["date"] >= date]
-        if len(partprice) == 0:
-            row = self.price[self.price["date"] < date].iloc[-1]
-        else:
-            row = partprice.iloc[0]
-        value = myround(sh * row.netvalue)
+        rdate, netvalue = self._row_after(date)
+        value = myround(sh * netvalue)
         if fee is not None:
             value = (1 - fee) * value
         return (
-            row.date,
+            rdate,
             value,
             -myround(sh),
         )  # TODO: 这里 myround 是否也和 round_label 有关，有待考证
@@ -512,6 +784,9 @@ class fundinfo(basicinfo):
     :param save: boolean, when open the save option, automatically save the class to files
     :param path: string, the file path prefix of IO
     :param form: string, the format of IO, options including: 'csv'
+    :param priceonly: bool, if True, only the price table is fetched and the redemption fee info is omitted
+    :param refresh_fee: bool, 赎回费信息默认缓存于内存与 ``xa.set_backend`` 设定的后端，有效期 180 天，可通过 fee_ttl 配置，
+        设为 True 则强制重新抓取赎回费页面
     """
 
     def __init__(
@@ -524,6 +799,7 @@ class fundinfo(basicinfo):
         path="",
         form="csv",
         priceonly=False,
+        refresh_fee=False,
     ):
         if round_label == 1 or (code in droplist):
             label = 1  # the scheme of round down on share purchase
@@ -543,6 +819,8 @@ class fundinfo(basicinfo):
             "http://fund.eastmoney.com/f10/jjfl_" + code + ".html"
         )  # html url for trade fees info of certain fund
         self.priceonly = priceonly
+        self.refresh_fee = refresh_fee
+        self._fee_refreshed = False
 
         super().__init__(
             code,
@@ -553,6 +831,9 @@ class fundinfo(basicinfo):
             round_label=label,
             dividend_label=dividend_label,
         )
+        if refresh_fee and not priceonly and not self._fee_refreshed:
+            # 本地缓存副本中的赎回费信息也一并刷新
+            self._fee_init()
 
         self.special = self.price[self.price["comment"] != 0]
         self.specialdate = list(self.special["date"])
@@ -570,62 +851,56 @@ class fundinfo(basicinfo):
         if self._page.text[:800].find("Data_millionCopiesIncome") >= 0:
             raise FundTypeError("This code seems to be a mfund, use mfundinfo instead")
 
-        l = re.match(
-            r"[\s\S]*Data_netWorthTrend = ([^;]*);[\s\S]*", self._page.text
-        ).groups()[0]
-        l = l.replace("null", "None")  # 暂未发现基金净值有 null 的基金，若有，其他地方也很可能出问题！
-        l = eval(l)
-        ltot = re.match(
-            r"[\s\S]*Data_ACWorthTrend = ([^;]*);[\s\S]*", self._page.text
-        ).groups()[
-            0
-        ]  # .* doesn't match \n
-        ltot = ltot.replace("null", "None")  ## 096001 总值数据中有 null！
-        ltot = eval(ltot)
+        jsvars = _js_vars(self._page.text)
+        if "Data_netWorthTrend" not in jsvars:
+            raise ParserFailure("no price table found for this fund %s" % self.code)
+        # 暂未发现基金净值有 null 的基金，若有，其他地方也很可能出问题！
+        l = _js_loads(jsvars["Data_netWorthTrend"])
+        ## 096001 总值数据中有 null！
+        ltot = _js_loads(jsvars.get("Data_ACWorthTrend", "[]"))
         ## timestamp transform tzinfo must be taken into consideration
-        tz_bj = dt.timezone(dt.timedelta(hours=8))
         infodict = {
-            "date": [
-                dt.datetime.fromtimestamp(int(d["x"]) / 1e3, tz=tz_bj).replace(
-                    tzinfo=None
-                )
-                for d in l
-            ],
-            "netvalue": [float(d["y"]) for d in l],
-            "comment": [_nfloat(d["unitMoney"]) for d in l],
+            "date": _js_dates([int(d["x"]) for d in l]),
+            "netvalue": np.array([d["y"] for d in l], dtype="float64"),
+            "comment": [_nfloat(d["unitMoney"]) if d["unitMoney"] else 0 for d in l],
         }
 
         if len(l) == len(ltot):  # 防止总值和净值数据量不匹配，已知有该问题的基金：502010
-            infodict["totvalue"] = [d[1] for d in ltot]
+            infodict["totvalue"] = np.array([d[1] for d in ltot], dtype="float64")
 
         try:
-            rate = float(
-                eval(
-                    re.match(
-                        r"[\s\S]*fund_Rate=([^;]*);[\s\S]*", self._page.text
-                    ).groups()[0]
-                )
-            )
+            rate = float(_js_loads(jsvars.get("fund_Rate", '""')))
         except ValueError:
             rate = 0
             logger.info("warning: this fund has no data for rate")  # know cases: ETF
 
-        name = eval(
-            re.match(r"[\s\S]*fS_name = ([^;]*);[\s\S]*", self._page.text).groups()[0]
-        )
+        name = _js_loads(jsvars["fS_name"])
 
         self.rate = rate
         # shengou rate in tiantianjijin, daeshengou rate discount is not considered
         self.name = name  # the name of the fund
         df = pd.DataFrame(data=infodict)
-        df = df[df["date"].isin(opendate)]
+        df = df[df["date"].isin(_opendate_index)]
         df = df.reset_index(drop=True)
         if len(df) == 0:
             raise ParserFailure("no price table found for this fund %s" % self.code)
         self.price = df[df["date"] <= yesterdaydash()]
         # deal with the redemption fee attrs finally
         if not self.priceonly:
+            self._fee_init()
+
+    def _fee_init(self):
+        """
+        set self.feeinfo and self.segment from the fee cache, the redemption fee page is only fetched and parsed
+        when there is no valid cached record or ``refresh_fee`` is set
+        """
+        record = None if self.refresh_fee else _fee_load(self.code)
+        if record is not None:
+            self.feeinfo, self.segment = record
+        else:
             self._feepreprocess()
+            _fee_dump(self.code, self.feeinfo, self.segment)
+        self._fee_refreshed = True
 
     def _feepreprocess(self):
         """
@@ -754,23 +1029,19 @@ class fundinfo(basicinfo):
         """
         # 		 value = myround(share*self.price[self.price['date']==date].iloc[0].netvalue)
         date = convert_date(date)
-        partprice = self.price[self.price["date"] >= date]
-        if len(partprice) == 0:
-            row = self.price[self.price["date"] < date].iloc[-1]
-        else:
-            row = partprice.iloc[0]
-        soldrem, _ = rm.sell(rem, share, row.date)
+        rdate, netvalue = self._row_after(date)
+        soldrem, _ = rm.sell(rem, share, rdate)
         value = 0
         sh = myround(sum([item[1] for item in soldrem]))
         for d, s in soldrem:
             if fee is None:
-                tmpfee = self.feedecision((row.date - d).days) * 1e-2
+                tmpfee = self.feedecision((rdate - d).days) * 1e-2
             else:
                 tmpfee = fee
             value += myround(
-                s * row.netvalue * (1 - tmpfee)
+                s * netvalue * (1 - tmpfee)
             )  # TODO: round_label whether play a role here?
-        return (row.date, value, -sh)
+        return (rdate, value, -sh)
 
     def info(self):
         super().info()
@@ -881,65 +1152,17 @@ class fundinfo(basicinfo):
             diffdays == 0
         ):  ## for some QDII, this value is 1, anyways, trying update is compatible (d+2 update)
             return None
-        self._updateurl = (
-            "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-            + self.code
-            + "&page=1&per=1"
-        )
-        con = rget(self._updateurl)
-        soup = BeautifulSoup(con.text, "lxml")
-        items = soup.findAll("td")
-        if dt.datetime.strptime(str(items[0].string), "%Y-%m-%d") == today_obj():
-            diffdays += 1
-        if diffdays <= 10:
-            self._updateurl = (
-                "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-                + self.code
-                + "&page=1&per="
-                + str(diffdays)
-            )
-            con = rget(self._updateurl)
-            soup = BeautifulSoup(con.text, "lxml")
-            items = soup.findAll("td")
-        elif (
-            diffdays > 10
-        ):  ## there is a 20 item per page limit in the API, so to be safe, we query each page by 10 items only
-            items = []
-            for pg in range(1, int(diffdays / 10) + 2):
-                self._updateurl = (
-                    "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-                    + self.code
-                    + "&page="
-                    + str(pg)
-                    + "&per=10"
-                )
-                con = rget(self._updateurl)
-                soup = BeautifulSoup(con.text, "lxml")
-                items.extend(soup.findAll("td"))
-        else:
+        if diffdays < 0:
             raise TradeBehaviorError(
                 "Weird incremental update: the saved copy has future records"
             )
-
-        date = []
-        netvalue = []
-        totvalue = []
-        comment = []
-        for i in range(int(len(items) / 7)):
-            ts = pd.Timestamp(str(items[7 * i].string))
-            if (ts - lastdate).days > 0:
-                date.append(ts)
-                netvalue.append(_float(items[7 * i + 1].string))
-                totvalue.append(_float(items[7 * i + 2].string))
-                comment.append(_nfloat(items[7 * i + 6].string))
-            else:
-                break
+        table, date = _f10_table(self.code, lastdate, 7)
         df = pd.DataFrame(
             {
                 "date": date,
-                "netvalue": netvalue,
-                "totvalue": totvalue,
-                "comment": comment,
+                "netvalue": [_float(v) for v in table[:, 1]],
+                "totvalue": [_float(v) for v in table[:, 2]],
+                "comment": [_nfloat(v) for v in table[:, 6]],
             }
         )
         df = df.iloc[::-1]  ## reverse the time order
@@ -1222,20 +1445,49 @@ class cashinfo(basicinfo):
     def _basic_init(self):
         self.name = "货币基金"
         self.rate = 0
-        datel = list(
-            pd.date_range(dt.datetime.strftime(self.start, "%Y-%m-%d"), yesterdaydash())
+        start = pd.Timestamp(dt.datetime.strftime(self.start, "%Y-%m-%d"))
+        end = pd.Timestamp(yesterdaydash())
+        key = (self.interest, start)
+        price = _cash_cache.get(key)
+        if price is None:
+            price = self._cash_price(start, start, end)
+        elif price.iloc[-1]["date"] < end:
+            # 交易日历向后延拓，只补算新增部分
+            lastdate = price.iloc[-1]["date"] + pd.Timedelta(days=1)
+            delta = self._cash_price(start, lastdate, end)
+            if len(delta) > 0:
+                price = pd.concat([price, delta])
+        _cash_cache[key] = price
+        # 实例间共享数据，indicator 方法新增的列互不影响
+        self.price = price.copy(deep=False)
+
+    def _cash_price(self, start, begin, end):
+        """
+        generate the price table on the trading days between begin and end, the netvalue is
+        (1 + interest) ** n, where n is the number of calendar days since start
+
+        :param start: pd.Timestamp, the virtual starting date of the cash fund
+        :param begin: pd.Timestamp
+        :param end: pd.Timestamp
+        :returns: pd.DataFrame, index is also the number of calendar days since start
+        """
+        dates = _opendate_index[
+            _opendate_index.searchsorted(begin) : _opendate_index.searchsorted(
+                end, side="right"
+            )
+        ]
+        days = (dates - start).days.values
+        # np.power 与 python 幂运算末位可能不同，为保持净值逐位一致，只在交易日上做标量幂运算
+        valuel = np.array([(1 + self.interest) ** i for i in days.tolist()])
+        return pd.DataFrame(
+            data={
+                "date": dates,
+                "netvalue": valuel,
+                "totvalue": valuel,
+                "comment": np.zeros(len(dates), dtype="int64"),
+            },
+            index=days,
         )
-        valuel = []
-        for i, date in enumerate(datel):
-            valuel.append((1 + self.interest) ** i)
-        dfdict = {
-            "date": datel,
-            "netvalue": valuel,
-            "totvalue": valuel,
-            "comment": [0 for _ in datel],
-        }
-        df = pd.DataFrame(data=dfdict)
-        self.price = df[df["date"].isin(opendate)]
 
 
 class mfundinfo(basicinfo):
@@ -1281,34 +1533,25 @@ class mfundinfo(basicinfo):
         self._page = rget(self._url)
         if self._page.text[:800].find("Data_fundSharesPositions") >= 0:
             raise FundTypeError("This code seems to be a fund, use fundinfo instead")
-        l = eval(
-            re.match(
-                r"[\s\S]*Data_millionCopiesIncome = ([^;]*);[\s\S]*", self._page.text
-            ).groups()[0]
-        )
-        self.name = re.match(
-            r"[\s\S]*fS_name = \"([^;]*)\";[\s\S]*", self._page.text
-        ).groups()[0]
-        tz_bj = dt.timezone(dt.timedelta(hours=8))
-        datel = [
-            dt.datetime.fromtimestamp(int(d[0]) / 1e3, tz=tz_bj).replace(tzinfo=None)
-            for d in l
-        ]
-        ratel = [float(d[1]) for d in l]
-        netvalue = [1]
-        for dailyrate in ratel:
-            netvalue.append(netvalue[-1] * (1 + dailyrate * 1e-4))
-        netvalue.remove(1)
+        jsvars = _js_vars(self._page.text)
+        if "Data_millionCopiesIncome" not in jsvars:
+            raise ParserFailure("no price table for %s" % self.code)
+        l = _js_loads(jsvars["Data_millionCopiesIncome"])
+        self.name = _js_loads(jsvars["fS_name"])
+        datel = _js_dates([int(d[0]) for d in l])
+        ratel = np.array([d[1] for d in l], dtype="float64")
+        # 逐日累乘万份收益，cumprod 与逐项相乘的浮点结果一致
+        netvalue = np.cumprod(1 + ratel * 1e-4)
 
         df = pd.DataFrame(
             data={
                 "date": datel,
                 "netvalue": netvalue,
                 "totvalue": netvalue,
-                "comment": [0 for _ in datel],
+                "comment": [0 for _ in range(len(datel))],
             }
         )
-        df = df[df["date"].isin(opendate)]
+        df = df[df["date"].isin(_opendate_index)]
         if len(df) == 0:
             raise ParserFailure("no price table for %s" % self.code)
         df = df.reset_index(drop=True)
@@ -1391,63 +1634,17 @@ class mfundinfo(basicinfo):
         diffdays = (yesterdayobj() - lastdate).days
         if diffdays == 0:
             return None
-        self._updateurl = (
-            "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-            + self.code
-            + "&page=1&per=1"
-        )
-        con = rget(self._updateurl)
-        soup = BeautifulSoup(con.text, "lxml")
-        items = soup.findAll("td")
-        if dt.datetime.strptime(str(items[0].string), "%Y-%m-%d") == today_obj():
-            diffdays += 1
-        if diffdays <= 10:
-            # caution: there may be today data!! then a day gap will be in table
-            self._updateurl = (
-                "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-                + self.code
-                + "&page=1&per="
-                + str(diffdays)
-            )
-            con = rget(self._updateurl)
-            soup = BeautifulSoup(con.text, "lxml")
-            items = soup.findAll("td")
-        elif (
-            diffdays > 10
-        ):  ## there is a 20 item per page limit in the API, so to be safe, we query each page by 10 items only
-            items = []
-            for pg in range(1, int(diffdays / 10) + 2):
-                self._updateurl = (
-                    "http://fund.eastmoney.com/f10/F10DataApi.aspx?type=lsjz&code="
-                    + self.code
-                    + "&page="
-                    + str(pg)
-                    + "&per=10"
-                )
-                con = rget(self._updateurl)
-                soup = BeautifulSoup(con.text, "lxml")
-                items.extend(soup.findAll("td"))
-        else:
+        if diffdays < 0:
             raise TradeBehaviorError(
                 "Weird incremental update: the saved copy has future records"
             )
-
-        date = []
-        earnrate = []
-        comment = []
-        for i in range(int(len(items) / 6)):
-            ts = pd.Timestamp(str(items[6 * i].string))
-            if (ts - lastdate).days > 0:
-                date.append(ts)
-                earnrate.append(float(items[6 * i + 1].string) * 1e-4)
-                comment.append(_nfloat(items[6 * i + 5].string))
-        date = date[::-1]
-        earnrate = earnrate[::-1]
-        comment = comment[::-1]
-        netvalue = [startvalue]
-        for earn in earnrate:
-            netvalue.append(netvalue[-1] * (1 + earn))
-        netvalue.remove(startvalue)
+        table, date = _f10_table(self.code, lastdate, 6)
+        # caution: there may be today data!! then a day gap will be in table
+        table, date = table[::-1], date[::-1]
+        earnrate = table[:, 1].astype("float64") * 1e-4
+        comment = [_nfloat(v) for v in table[:, 5]]
+        # 逐日累乘，与逐项相乘的浮点结果一致
+        netvalue = np.cumprod(np.append(startvalue, 1 + earnrate))[1:]
 
         df = pd.DataFrame(
             {
@@ -1465,6 +1662,148 @@ class mfundinfo(basicinfo):
             return df
 
 
+class FundInfoPool:
+    """
+    pooled factory of fundinfo and mfundinfo objects. The price table and fee info of each code is
+    only fetched once and objects of the same code with different labels share them. Objects of
+    a batch of codes are constructed concurrently.
+
+    :param max_workers: int, number of threads to construct info objects of different codes
+    :param priceonly: bool, if True, redemption fee info is not fetched for fundinfo
+    :param fetch: boolean, when open the fetch option, info classes will try fetching from local files first in the init
+    :param save: boolean, when open the save option, info classes automatically save the class to files
+    :param path: string, the file path prefix of IO, or object or engine from sqlalchemy to connect sql database
+    :param form: string, the format of IO, options including: 'csv','sql'
+    """
+
+    def __init__(
+        self,
+        max_workers=8,
+        priceonly=False,
+        fetch=False,
+        save=False,
+        path="",
+        form="csv",
+    ):
+        self.max_workers = max_workers
+        self.priceonly = priceonly
+        self.ioconf = {"fetch": fetch, "save": save, "path": path, "form": form}
+        self._base = {}  # code: info object as fetched
+        self._infos = (
+            {}
+        )  # (code, round_label, dividend_label, value_label): info object
+
+    def __len__(self):
+        return len(self._infos)
+
+    def __contains__(self, code):
+        return code in self._base
+
+    def _build(self, code):
+        """
+        construct the info object of code, mfundinfo is used as fallback when the code is a monetary fund
+        """
+        try:
+            return fundinfo(code, priceonly=self.priceonly, **self.ioconf)
+        except FundTypeError:
+            return mfundinfo(code, **self.ioconf)
+
+    def _copy(self, code, round_label, dividend_label, value_label):
+        base = self._base[code]
+        obj = copy.copy(base)
+        # 共享价格数据，但 indicator 方法新增的列不相互污染
+        obj.price = base.price.copy(deep=False)
+        # 标签语义与 fundinfo 和 mfundinfo 的构造参数保持一致
+        if isinstance(obj, fundinfo):
+            obj.round_label = (
+                1 if round_label == 1 or code in droplist or obj.code in droplist else 0
+            )
+            obj.dividend_label = dividend_label
+        else:
+            obj.round_label = round_label
+            obj.value_label = value_label
+        return obj
+
+    def _derive(self, code, round_label, dividend_label, value_label):
+        key = (code, round_label, dividend_label, value_label)
+        if key not in self._infos:
+            self._infos[key] = self._copy(*key)
+        return self._infos[key]
+
+    @staticmethod
+    def _spec(item):
+        if isinstance(item, str):
+            spec = (item, 0, 0, 0)
+        elif isinstance(item, dict):
+            spec = (
+                item["code"],
+                item.get("round_label", 0),
+                item.get("dividend_label", 0),
+                item.get("value_label", 0),
+            )
+        else:
+            spec = tuple(item) + (0,) * (4 - len(item))
+        code = spec[0]
+        if code[:1] in ["F", "M"] and code[1:].isdigit():
+            code = code[1:]  # F000311 与 000311 共用同一对象
+        return (code,) + spec[1:]
+
+    def fetch(self, codes):
+        """
+        build info objects of codes not in the pool concurrently
+
+        :param codes: list of fund code str
+        :returns: None
+        """
+        todo = []
+        for code in codes:
+            code = self._spec(code)[0]
+            if code not in self._base and code not in todo:
+                todo.append(code)
+        objs = concurrent_map(self._build, todo, max_workers=self.max_workers)
+        for code, obj in zip(todo, objs):
+            self._base[code] = obj
+
+    def get(self, code, round_label=0, dividend_label=0, value_label=0):
+        """
+        get info object of code with given labels, the object is built only if it is not in the pool
+
+        :param code: str, fund code, mfundinfo is returned for monetary funds
+        :param round_label: int, default 0 or 1, see ``fundinfo``
+        :param dividend_label: int, default 0 or 1, see ``fundinfo``
+        :param value_label: int, default 0 or 1, see ``mfundinfo``
+        :returns: fundinfo or mfundinfo object
+        """
+        return self.get_many([(code, round_label, dividend_label, value_label)])[0]
+
+    def get_many(self, items):
+        """
+        get info objects of many funds, codes not in the pool are built concurrently
+
+        :param items: list of fund code str, or tuple of (code, round_label, dividend_label, value_label),
+            or dict with such keys
+        :returns: list of info objects in the same order of items, objects of the same code and labels are shared
+        """
+        specs = [self._spec(item) for item in items]
+        self.fetch([spec[0] for spec in specs])
+        return [self._derive(*spec) for spec in specs]
+
+    def new(self, code, round_label=0, dividend_label=0, value_label=0):
+        """
+        get a new info object of code which is not shared with any other caller,
+        so that changing its attrs or price table does not affect others. The fetched data are still reused.
+
+        :param code: str, fund code, mfundinfo is returned for monetary funds
+        :param round_label: int, default 0 or 1, see ``fundinfo``
+        :param dividend_label: int, default 0 or 1, see ``fundinfo``
+        :param value_label: int, default 0 or 1, see ``mfundinfo``
+        :returns: fundinfo or mfundinfo object
+        """
+        spec = self._spec((code, round_label, dividend_label, value_label))
+        self.fetch([spec[0]])
+        return self._copy(*spec)
+
+
 FundInfo = fundinfo
 MFundInfo = mfundinfo
 CashInfo = cashinfo
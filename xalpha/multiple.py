@@ -3,33 +3,185 @@
 module for mul and mulfix class: fund combination management
 """
 
+import hashlib
+import json
 import logging
+import numpy as np
 import pandas as pd
 from pyecharts import options as opts
 from pyecharts.charts import Pie, ThemeRiver
 
-from xalpha.cons import convert_date, myround, yesterdaydash, yesterdayobj
+from xalpha.cons import (
+    concurrent_map,
+    convert_date,
+    myround,
+    myround_array,
+    yesterdaydash,
+    yesterdayobj,
+)
 from xalpha.evaluate import evaluate
 from xalpha.exceptions import FundTypeError, TradeBehaviorError
 from xalpha.record import record, irecord
 from xalpha.indicator import indicator
-from xalpha.info import cashinfo, fundinfo, mfundinfo, get_fund_holdings
+from xalpha.info import (
+    cashinfo,
+    fundinfo,
+    mfundinfo,
+    get_fund_holdings_many,
+    FundInfoPool,
+)
 from xalpha.trade import (
     bottleneck,
+    load_checkpoints,
+    save_checkpoints,
     trade,
     turnoverrate,
     vtradevolume,
     xirrcal,
+    xirrcal_batch,
     itrade,
     vtradecost,
 )
-from xalpha.universal import get_fund_type, ttjjcode, get_rt, get_industry_fromxq
+from xalpha.universal import get_fund_type, ttjjcode, get_stock_meta_many
 import xalpha.universal as xu
 
 
 logger = logging.getLogger(__name__)
 
 
+def _split_istatus(istatus):
+    """
+    split the exchange traded ledger by code, the whole table is only scanned once
+
+    :param istatus: 场内交易账单，或 irecord 对象
+    :returns: list of (code, status of the code) in the order of first appearance
+    """
+    if isinstance(istatus, irecord):
+        return [(code, istatus.filter(code)) for code in istatus.status.code.unique()]
+    indices = istatus.groupby("code", sort=False).indices
+    return [(code, istatus.iloc[indices[code]]) for code in istatus.code.unique()]
+
+
+_history_version = 1
+_history_cache = {}
+
+
+def _cftable_fingerprint(cftable, horizon):
+    """
+    digest of the cftable rows up to horizon
+    """
+    part = cftable[cftable["date"] <= horizon]
+    return hashlib.sha1(
+        json.dumps(
+            [
+                [d.isoformat(), float(c), float(s)]
+                for d, c, s in zip(part["date"], part["cash"], part["share"])
+            ]
+        ).encode("utf-8")
+    ).hexdigest()
+
+
+def load_history(name):
+    """
+    load the materialized daily history of a portfolio from memory or the backend configured by
+    :func:`xalpha.set_backend`
+
+    :param name: str, name of the history store
+    :returns: Dict[code, dict], each with keys code, start, horizon, fingerprint, share, value and cash,
+        the daily lists run from start to horizon, fingerprint is the digest of the cftable up to horizon
+    """
+    if name in _history_cache:
+        return dict(_history_cache[name])
+    chunks = {}
+    if xu.ioconf.get("backend") in ["csv", "sql"]:
+        df = xu.fetch_backend("HISTORY-" + name)
+        if df is not None:
+            for content in df["content"]:
+                chunk = json.loads(content)  # code 列从 csv 读回可能丢失前导 0
+                if chunk.get("version") != _history_version:
+                    continue
+                prev = chunks.get(chunk["code"])
+                if prev is not None and pd.Timestamp(chunk["start"]) == pd.Timestamp(
+                    prev["horizon"]
+                ) + pd.Timedelta(days=1):
+                    # 增量追加的部分
+                    for col in ["share", "value", "cash"]:
+                        prev[col] = prev[col] + chunk[col]
+                    prev["horizon"] = chunk["horizon"]
+                    prev["fingerprint"] = chunk["fingerprint"]
+                else:
+                    chunks[chunk["code"]] = chunk
+    _history_cache[name] = chunks
+    return dict(chunks)
+
+
+def save_history(name, chunks, append=False):
+    """
+    save the materialized daily history of a portfolio into memory and the configured backend
+
+    :param name: str, name of the history store
+    :param chunks: Dict[code, dict], see :func:`load_history`
+    :param append: bool, if True, chunks only contain the days after the stored horizon and are appended to
+        the stored history, otherwise the stored history is replaced by chunks
+    """
+    cache = _history_cache.setdefault(name, {})
+    if not append:
+        cache.clear()
+    for code, chunk in chunks.items():
+        prev = cache.get(code)
+        if append and prev is not None:
+            prev = dict(prev)
+            for col in ["share", "value", "cash"]:
+                prev[col] = prev[col] + chunk[col]
+            prev["horizon"] = chunk["horizon"]
+            prev["fingerprint"] = chunk["fingerprint"]
+            cache[code] = prev
+        else:
+            cache[code] = chunk
+    if xu.ioconf.get("backend") in ["csv", "sql"] and (chunks or not append):
+        df = pd.DataFrame(
+            {
+                "code": list(chunks.keys()),
+                "content": [
+                    json.dumps(dict(c, version=_history_version))
+                    for c in chunks.values()
+                ],
+            }
+        )
+        xu.save_backend("HISTORY-" + name, df, mode="a" if append else "w")
+
+
+def _report_quarter(date, year=None, season=None):
+    """
+    year and season of the latest fund report available on date, namely the quarter 120 days before
+
+    :returns: Tuple[int, int]
+    """
+    if year is None or season is None:
+        rd = convert_date(date) - pd.Timedelta(days=120)
+        if not year:
+            year = rd.year
+        if not season:
+            season = int((rd.month - 0.1) / 3) + 1
+    return year, season
+
+
+def _build_itrades(istatus, exclude=(), max_workers=1):
+    """
+    build itrade objects of all codes in the exchange traded ledger concurrently, in the order of codes
+
+    :param istatus: 场内交易账单，或 irecord 对象
+    :param exclude: codes to be skipped
+    :returns: list of itrade
+    """
+    items = [
+        (code, st)
+        for code, st in _split_istatus(istatus)
+        if code not in exclude and not code.startswith("#")
+    ]
+    return concurrent_map(lambda item: itrade(*item), items, max_workers=max_workers)
+
+
 class mul:
     """
     multiple fund positions manage class
@@ -46,8 +198,13 @@ class mul:
     :param save: boolean, when open the save option, info classes automatically save the class to files
     :param path: string, the file path prefix of IO, or object or engine from sqlalchemy to connect sql database
     :param form: string, the format of IO, options including: 'csv','sql'
+    :param checkpoint: Optional[str], name of the checkpoint store. 若提供，各基金交易从 :func:`xalpha.set_backend`
+            设定的后端中读取上次保存的状态，只增量处理新的账单行和新的分红折算，处理后再将状态存回
+    :param max_workers: int, 并发获取 info 对象和构建交易的线程数，默认 1 为串行，大于 1 时并发，适用于需要联网获取大量基金信息的情形。基金顺序与账单列顺序一致
     """
 
+    _init_save_checkpoint = True  # 子类加入其他交易后自行保存时设为 False
+
     def __init__(
         self,
         *fundtradeobj,
@@ -57,7 +214,9 @@ class mul:
         fetch=False,
         save=False,
         path="",
-        form="csv"
+        form="csv",
+        checkpoint=None,
+        max_workers=1
     ):
         if isinstance(status, record):
             if not property:
@@ -77,7 +236,14 @@ class mul:
             # because there might be some funds use round_down for share calculation, ie, label=2 must be given
             # unless you are sure corresponding funds are added to the droplist
         fundcodelist = [f.code for f in fundtradeobj]
+        # code: checkpoint loaded from the store
+        self._checkpoints = load_checkpoints(checkpoint) if checkpoint else {}
+        # 同一组合内的 info 对象由 pool 并发构建
+        pool = FundInfoPool(
+            max_workers=max_workers, fetch=fetch, save=save, path=path, form=form
+        )
         if status is not None:
+            specs = []
             for code in status.columns:
                 if code == "date":
                     continue
@@ -88,45 +254,42 @@ class mul:
                 round_label = p % 2
                 dividend_label = ((p - round_label) / 2) % 2
                 value_label = ((p - round_label - dividend_label) / 4) % 2
-                try:
-                    fundtradeobj.append(
-                        trade(
-                            fundinfo(
-                                code,
-                                round_label=round_label,
-                                dividend_label=dividend_label,
-                                fetch=fetch,
-                                save=save,
-                                path=path,
-                                form=form,
-                            ),
-                            status,
-                        )
-                    )
-                except FundTypeError:
-                    fundtradeobj.append(
-                        trade(
-                            mfundinfo(
-                                code,
-                                round_label=round_label,
-                                value_label=value_label,
-                                fetch=fetch,
-                                save=save,
-                                path=path,
-                                form=form,
-                            ),
-                            status,
-                        )
-                    )
+                specs.append((code, round_label, dividend_label, value_label))
+            fundtradeobj.extend(
+                concurrent_map(
+                    lambda infoobj: trade.from_checkpoint(
+                        infoobj, status, self._checkpoints.get(infoobj.code)
+                    ),
+                    pool.get_many(specs),
+                    max_workers=max_workers,
+                )
+            )
             if istatus is not None:
                 self.is_in = True
-                if isinstance(istatus, irecord):
-                    istatus = istatus.status
-                for code in istatus.code.unique():
-                    if code not in fundcodelist and not code.startswith("#"):
-                        fundtradeobj.append(itrade(code, istatus))
+                fundtradeobj.extend(
+                    _build_itrades(istatus, fundcodelist, max_workers=max_workers)
+                )
         self.fundtradeobj = tuple(fundtradeobj)
         self.totcftable = self._mergecftb()
+        self._checkpoint = checkpoint
+        if checkpoint and self._init_save_checkpoint:
+            self.save_checkpoint(checkpoint)
+
+    def save_checkpoint(self, name=None):
+        """
+        save the computed states of all fund trades into the checkpoint store on the backend,
+        so that the next ``mul(status=..., checkpoint=name)`` only processes the new ledger rows
+
+        :param name: Optional[str], name of the checkpoint store, default the one given in init
+        """
+        name = name or self._checkpoint
+        if not name:
+            raise ValueError("no name for the checkpoint store")
+        checkpoints = load_checkpoints(name)
+        for t in self.fundtradeobj:
+            if not isinstance(t, itrade):
+                checkpoints[t.code] = t.checkpoint()
+        save_checkpoints(name, checkpoints)
 
     def tot(self, prop="基金现值", date=yesterdayobj()):
         """
@@ -165,48 +328,91 @@ class mul:
             "基金收益总额",
             "投资收益率",
         ]
-        summarydf = pd.DataFrame([], columns=columns)
-        for fund in self.fundtradeobj:
-            summarydf = summarydf.append(
-                fund.dailyreport(date), ignore_index=True, sort=True
-            )
-        tname = "总计"
-        tcode = "total"
-        tunitvalue = float("NaN")
-        tunitcost = float("NaN")
-        tholdshare = float("NaN")
-        tcurrentvalue = summarydf["基金现值"].sum()
-        tpurchase = summarydf["基金总申购"].sum()
+        records = [
+            fund.dailyreport(date).iloc[0].to_dict() for fund in self.fundtradeobj
+        ]
+        summarydf = pd.DataFrame.from_records(records, columns=columns)
         tbtnk = bottleneck(self.totcftable[self.totcftable["date"] <= date])
-        tcost = summarydf["基金持有成本"].sum()
-        toutput = summarydf["基金分红与赎回"].sum()
-        tturnover = turnoverrate(self.totcftable[self.totcftable["date"] <= date], date)
-        # 计算的是总系统作为整体和外界的换手率，而非系统各成分之间的换手率
         tearn = summarydf["基金收益总额"].sum()
-        trate = round(tearn / tbtnk * 100, 4)
-        trow = pd.DataFrame(
-            [
-                [
-                    tname,
-                    tcode,
-                    tunitvalue,
-                    tunitcost,
-                    tholdshare,
-                    tcurrentvalue,
-                    tpurchase,
-                    tbtnk,
-                    tcost,
-                    toutput,
-                    tturnover,
-                    tearn,
-                    trate,
-                ]
-            ],
-            columns=columns,
-        )
-        summarydf = summarydf.append(trow, ignore_index=True, sort=True)
+        trow = {
+            "基金名称": "总计",
+            "基金代码": "total",
+            "当日净值": float("NaN"),
+            "单位成本": float("NaN"),
+            "持有份额": float("NaN"),
+            "基金现值": summarydf["基金现值"].sum(),
+            "基金总申购": summarydf["基金总申购"].sum(),
+            "历史最大占用": tbtnk,
+            "基金持有成本": summarydf["基金持有成本"].sum(),
+            "基金分红与赎回": summarydf["基金分红与赎回"].sum(),
+            # 计算的是总系统作为整体和外界的换手率，而非系统各成分之间的换手率
+            "换手率": turnoverrate(self.totcftable[self.totcftable["date"] <= date], date),
+            "基金收益总额": tearn,
+            "投资收益率": round(tearn / tbtnk * 100, 4),
+        }
+        summarydf = pd.DataFrame.from_records(records + [trow], columns=columns)
 
-        return summarydf[columns].sort_values(by="基金现值", ascending=False)
+        return summarydf.sort_values(by="基金现值", ascending=False)
+
+    def combsummary_series(self, dates):
+        """
+        :meth:`combsummary` of many dates computed in one pass
+
+        :param dates: list of string or obj of date
+        :returns: pd.DataFrame, with a date column and the columns of :meth:`combsummary`,
+            rows of each date are ordered by 基金现值 the same as :meth:`combsummary`
+        """
+        dates = pd.DatetimeIndex([convert_date(d) for d in dates])
+        d64 = dates.values.astype("datetime64[ns]")
+        reports = [fund._dailyreport_batch(dates) for fund in self.fundtradeobj]
+        columns = list(reports[0].columns) if reports else []
+
+        def _tot(col):
+            return np.nansum([r[col].values for r in reports], axis=0)
+
+        cfdates = self.totcftable["date"].values.astype("datetime64[ns]")
+        cash = self.totcftable["cash"].values.astype(float)
+        k = np.searchsorted(cfdates, d64, side="right")
+        i = np.maximum(k - 1, 0)
+        if len(cash) > 0:
+            tbtnk = np.where(
+                k > 0, myround_array(np.maximum.accumulate(-np.cumsum(cash)))[i], 0
+            )
+            tradeamount = np.cumsum(np.abs(cash))[i]
+            days = (d64 - cfdates[0]).astype("timedelta64[D]").astype(int)
+        else:
+            tbtnk = tradeamount = np.zeros(len(dates))
+            days = np.zeros(len(dates), dtype=int)
+        tearn = _tot("基金收益总额")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tturnover = np.where(
+                (k > 0) & (days > 0), tradeamount / tbtnk / 2.0 * 365 / days, 0
+            )
+            trate = tearn / tbtnk * 100
+        total = pd.DataFrame(
+            {
+                "基金名称": "总计",
+                "基金代码": "total",
+                "当日净值": float("NaN"),
+                "单位成本": float("NaN"),
+                "持有份额": float("NaN"),
+                "基金现值": _tot("基金现值"),
+                "基金总申购": _tot("基金总申购"),
+                "历史最大占用": tbtnk,
+                "基金持有成本": _tot("基金持有成本"),
+                "基金分红与赎回": _tot("基金分红与赎回"),
+                "换手率": tturnover,
+                "基金收益总额": tearn,
+                "投资收益率": np.round(trate, 4),
+            },
+            index=dates,
+        )
+        df = pd.concat(reports + [total], sort=False)
+        df.index.name = "date"
+        df = df.reset_index()
+        df["_neg"] = -df["基金现值"]
+        df = df.sort_values(by=["date", "_neg"], kind="mergesort")
+        return df.drop(columns="_neg").reset_index(drop=True)
 
     summary = combsummary
 
@@ -214,19 +420,25 @@ class mul:
         """
         merge the different cftable for different funds into one table
         """
-        dtlist = []
-        for fund in self.fundtradeobj:
-            dtlist2 = []
-            for _, row in fund.cftable.iterrows():
-                dtlist2.append((row["date"], row["cash"]))
-            dtlist.extend(dtlist2)
-
-        nndtlist = set([item[0] for item in dtlist])
-        nndtlist = sorted(list(nndtlist), key=lambda x: x)
-        reslist = []
-        for date in nndtlist:
-            reslist.append(sum([item[1] for item in dtlist if item[0] == date]))
-        df = pd.DataFrame(data={"date": nndtlist, "cash": reslist})
+        if not self.fundtradeobj:
+            return pd.DataFrame(data={"date": [], "cash": []})
+        df = pd.concat(
+            [fund.cftable[["date", "cash"]] for fund in self.fundtradeobj],
+            ignore_index=True,
+        )
+        # 同日现金按基金顺序依次相加，与逐项求和的结果逐位一致
+        # np.add.reduceat 等对较长的组会采用分组累加，故按组内序号逐列相加
+        df = df.sort_values("date", kind="mergesort")
+        dates, first, group = np.unique(
+            df["date"].values, return_index=True, return_inverse=True
+        )
+        rank = np.arange(len(df)) - first[group]
+        table = np.zeros((len(dates), rank.max(initial=-1) + 1))
+        table[group, rank] = df["cash"].values
+        cash = np.zeros(len(dates))
+        for k in range(table.shape[1]):
+            cash = cash + table[:, k]
+        df = pd.DataFrame(data={"date": dates, "cash": cash})
         df = df[df["cash"] != 0]
         df = df.reset_index(drop=True)
         return df
@@ -240,6 +452,18 @@ class mul:
         """
         return xirrcal(self.totcftable, self.fundtradeobj, date, startdate, guess)
 
+    def xirrrate_batch(self, dates, startdate=None, guess=0.01):
+        """
+        xirr rates of the whole invest combination for many virtually sell-all dates in one call
+
+        :param dates: list of string or obj of datetime
+        :param startdate: string or obj of datetime, the beginning date of calculation, default from first buy
+        :returns: pd.Series of xirr rates indexed by dates
+        """
+        return xirrcal_batch(
+            self.totcftable, self.fundtradeobj, dates, startdate, guess
+        )
+
     def evaluation(self, start=None):
         """
         give the evaluation object to analysis funds properties themselves instead of trades
@@ -254,8 +478,234 @@ class mul:
         )
         return case
 
+    def _lookthrough_positions(self, date, max_workers=8):
+        """
+        value of every position on date, classified for the look-through analysis
+
+        :param date: string or obj of date
+        :param max_workers: int, 并发请求数
+        :returns: List[Tuple[str, str, float]], (kind, code, value) of positions with positive value in the order
+            of fundtradeobj, kind is one of stock, bond, cash and fund, code of fund is of 6 digits
+        """
+        date = convert_date(date)
+        held = []
+        for f in self.fundtradeobj:
+            value = f.briefdailyreport(date).get("currentvalue", 0)
+            if value > 0:
+                held.append((f, value))
+        # 场内标的类型与基金类型的查询均需网络请求，并发进行
+        types = concurrent_map(
+            lambda item: item[0].get_type() if isinstance(item[0], itrade) else None,
+            held,
+            max_workers=max_workers,
+        )
+        positions = []
+        for (f, value), t in zip(held, types):
+            if isinstance(f, itrade):
+                if t == "股票":
+                    positions.append(("stock", f.code, value))
+                elif t in ["可转债", "债券"]:
+                    positions.append(("bond", f.code, value))
+                elif t == "货币基金":
+                    positions.append(("cash", f.code, value))
+                elif t == "场内基金":
+                    positions.append(("fund", f.code[2:], value))
+            elif f.code == "mf":
+                positions.append(("cash", f.code, value))
+            elif f.code.startswith("SH") or f.code.startswith("SZ"):
+                positions.append(("stock", f.code, value))
+            else:
+                positions.append(("fund", f.code, value))
+        funds = [i for i, p in enumerate(positions) if p[0] == "fund"]
+        fundtypes = concurrent_map(
+            lambda i: get_fund_type(positions[i][1]), funds, max_workers=max_workers
+        )
+        for i, t in zip(funds, fundtypes):
+            if t == "货币基金":
+                positions[i] = ("cash",) + positions[i][1:]
+        return positions
+
+    @staticmethod
+    def _lookthrough_pt(positions, date, max_workers=8):
+        """
+        the latest asset allocation before date of every fund in positions, fetched concurrently
+
+        :returns: Dict[str, Optional[pd.Series]], code of fund to the last row of pt-F daily table
+        """
+        codes = list(
+            dict.fromkeys(code for kind, code, _ in positions if kind == "fund")
+        )
+
+        def _pt(code):
+            df = xu.get_daily("pt-F" + code, end=date.strftime("%Y%m%d"))
+            if df is None or len(df) == 0:
+                logger.warning("empty portfolio info for %s" % code)
+                return
+            return df.iloc[-1]
+
+        return dict(zip(codes, concurrent_map(_pt, codes, max_workers=max_workers)))
+
+    @staticmethod
+    def _lookthrough_stocks(positions, year, season, threhold=100, max_workers=8):
+        """
+        底层股票持仓的汇总，见 :meth:`get_stock_holdings`
+        """
+        funds = [code for kind, code, _ in positions if kind == "fund"]
+        holdings = dict(
+            zip(
+                funds,
+                get_fund_holdings_many(funds, year, season, max_workers=max_workers),
+            )
+        )
+        frames = []
+        for kind, code, value in positions:
+            if kind == "stock":
+                frames.append(pd.DataFrame({"code": [code], "value": [value]}))
+            elif kind == "fund" and holdings[code] is not None:
+                df = holdings[code]
+                frames.append(
+                    pd.DataFrame(
+                        {
+                            "code": [ttjjcode(c) for c in df["code"]],
+                            "value": df["ratio"].values / 100 * value,
+                        }
+                    )
+                )
+        if not frames:
+            return pd.DataFrame([], columns=["name", "code", "value", "ratio"])
+        sr = pd.concat(frames, ignore_index=True).groupby("code", sort=False)["value"]
+        sr = sr.sum().sort_values(ascending=False, kind="mergesort")
+        sr = sr[sr >= threhold]
+        names = get_stock_meta_many(sr.index, fields=("name",), max_workers=max_workers)
+        fdf = pd.DataFrame(
+            {"name": names["name"].values, "code": sr.index, "value": sr.values}
+        )
+        fdf["ratio"] = fdf["value"] / fdf["value"].sum()
+        return fdf
+
+    @staticmethod
+    def _lookthrough_industry(positions, year, season, pts, max_workers=8):
+        """
+        持仓行业占比，见 :meth:`get_industry`
+        """
+        threhold = 0.5  # 持仓小于该百分数的个股行业不再统计
+        funds = [code for kind, code, _ in positions if kind == "fund"]
+        holdings = dict(
+            zip(
+                funds,
+                get_fund_holdings_many(funds, year, season, max_workers=max_workers),
+            )
+        )
+        frames = []
+        for code in dict.fromkeys(funds):
+            df = holdings[code]
+            if df is None:
+                logger.warning(
+                    "%s has no stock holdings in %s y %s s. (Possible reason: 链接基金，债券基金)"
+                    % (code, year, season)
+                )
+                continue
+            df = df[df["ratio"] >= threhold]
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "fund": code,
+                        "code": [ttjjcode(c) for c in df["code"]],
+                        "ratio": df["ratio"].values,
+                    }
+                )
+            )
+        ratios = pd.concat(frames, ignore_index=True) if frames else None
+        stocks = [code for kind, code, _ in positions if kind == "stock"]
+        if ratios is not None:
+            stocks += ratios["code"].tolist()
+        industries = get_stock_meta_many(
+            stocks, fields=("industry",), max_workers=max_workers
+        )["industry"]
+        for code in industries.index[industries.str.strip() == ""]:
+            logger.warning("%s has no industry information, cannot be classfied" % code)
+        fund_industry = {}
+        if ratios is not None:
+            ratios["industry"] = industries.loc[ratios["code"]].values
+            ratios = ratios[ratios["industry"].str.strip() != ""]
+            for code, df in ratios.groupby("fund", sort=False):
+                fund_industry[code] = df.groupby("industry", sort=False)["ratio"].sum()
+
+        d = {}
+        for kind, code, value in positions:
+            if kind == "stock":
+                industry = industries[code]
+                if industry.strip():
+                    d[industry] = d.get(industry, 0) + value
+            elif kind == "fund" and code in fund_industry:
+                ## 这里行业占比需要做个 scaling
+                industry_sr = fund_industry[code]
+                sv = industry_sr.sum()
+                if sv < 1.0:
+                    # 只有极少数持仓存在行业信息
+                    continue
+                if pts.get(code) is None:
+                    continue
+                scale = pts[code]["stock_ratio"] / sv
+                for k, v in industry_sr.items():
+                    d[k] = d.get(k, 0) + value * v / 100 * scale
+        return d
+
+    @staticmethod
+    def _lookthrough_portfolio(positions, pts):
+        """
+        底层资产大类配置，见 :meth:`get_portfolio`
+        """
+        d = {"stock": 0, "bond": 0, "cash": 0}
+        for kind, code, value in positions:
+            if kind in d:
+                d[kind] += value
+                continue
+            row = pts.get(code)
+            if row is None:
+                continue
+            if row["bond_ratio"] + row["stock_ratio"] < 10:  # 联接基金
+                d["stock"] += (
+                    (100 - row["bond_ratio"] - row["cash_ratio"]) * value / 100
+                )
+                d["bond"] += row["bond_ratio"] * value / 100
+                d["cash"] += row["cash_ratio"] * value / 100
+            else:
+                d["stock"] += row["stock_ratio"] * value / 100
+                d["bond"] += row["bond_ratio"] * value / 100
+                d["cash"] += row["cash_ratio"] * value / 100
+        return d
+
+    def get_lookthrough(
+        self, date=yesterdayobj(), year=None, season=None, threhold=100, max_workers=8
+    ):
+        """
+        组合穿透，一次性并发获取各基金的持仓和资产配置，批量获取底层股票的名称和行业，同时给出股票、行业和大类资产的暴露
+
+        :param date: 默认昨天
+        :param year: 基于的基金季报年份，默认为 date 120 天前所在的季度
+        :param season: 基于的基金季报季度
+        :param threhold: 默认100。小于100元的底层股票将不在股票持仓中展示
+        :param max_workers: int, 并发请求数
+        :return: Dict. stock 为 :meth:`get_stock_holdings` 的 pd.DataFrame，industry 为 :meth:`get_industry` 的行业字典，
+            portfolio 为 :meth:`get_portfolio` 的 stock，bond，cash 字典
+        """
+        date = convert_date(date)
+        year, season = _report_quarter(date, year, season)
+        positions = self._lookthrough_positions(date, max_workers=max_workers)
+        pts = self._lookthrough_pt(positions, date, max_workers=max_workers)
+        return {
+            "stock": self._lookthrough_stocks(
+                positions, year, season, threhold=threhold, max_workers=max_workers
+            ),
+            "industry": self._lookthrough_industry(
+                positions, year, season, pts, max_workers=max_workers
+            ),
+            "portfolio": self._lookthrough_portfolio(positions, pts),
+        }
+
     def get_stock_holdings(
-        self, year=None, season=None, date=yesterdayobj(), threhold=100
+        self, year=None, season=None, date=yesterdayobj(), threhold=100, max_workers=8
     ):
         """
         获取整个基金组合的底层股票持仓总和和细节，组合穿透
@@ -264,163 +714,47 @@ class mul:
         :param season: 基于的基金季报季度
         :param date: 默认昨天
         :param threhold: 默认100。小于100元的底层股票将不在最后的结果中展示
+        :param max_workers: int, 并发请求数
         :return: pd.DataFrame column: name, code, value, ratio
         """
-        d = {}
-        if year is None or season is None:
-            rd = convert_date(date) - pd.Timedelta(days=120)
-            if not year:
-                year = rd.year
-            if not season:
-                season = int((rd.month - 0.1) / 3) + 1
-            logger.debug("use %s, %s for fund report" % (year, season))
-        for f in self.fundtradeobj:
-            if isinstance(f, itrade):
-                if f.get_type() == "股票":
-                    code = f.code
-                elif f.get_type() == "场内基金":
-                    code = f.code[2:]
-                else:
-                    continue
-            else:
-                code = f.code
-            value = f.briefdailyreport(date).get("currentvalue", 0)
-            if value > 0:
-                if code.startswith("SH") or code.startswith("SZ"):
-                    stock = code
-                    d[stock] = d.get(stock, 0) + value
-                elif code == "mf":
-                    continue
-                else:
-                    df = get_fund_holdings(code, year, season)
-                    if df is None:
-                        continue
-
-                    for _, row in df.iterrows():
-                        stock = row["code"]
-                        stock = ttjjcode(stock)
-                        d[stock] = d.get(stock, 0) + row["ratio"] / 100 * value
-                        # print("%s has %s contribution from %s" %(stock, row["ratio"] / 100 * value, f.name))
-
-        l = []
-        for code, value in sorted(d.items(), key=lambda item: -item[1]):
-            if value >= threhold:
-                try:
-                    name = get_rt(code)["name"]
-                except:
-                    name = code
-                l.append([name, code, value])
-        fdf = pd.DataFrame(l, columns=["name", "code", "value"])
-        fdf["ratio"] = fdf["value"] / fdf["value"].sum()
-        return fdf
+        year, season = _report_quarter(date, year, season)
+        logger.debug("use %s, %s for fund report" % (year, season))
+        positions = self._lookthrough_positions(date, max_workers=max_workers)
+        return self._lookthrough_stocks(
+            positions, year, season, threhold=threhold, max_workers=max_workers
+        )
 
-    def get_portfolio(self, date=yesterdayobj()):
+    def get_portfolio(self, date=yesterdayobj(), max_workers=8):
         """
         获取基金组合底层资产大类配置的具体值
 
         :param date:
+        :param max_workers: int, 并发请求数
         :return: Dict[str, float]. stock，bond，cash 对应总值的字典
         """
-
-        d = {"stock": 0, "bond": 0, "cash": 0}
         date = convert_date(date)
-        for f in self.fundtradeobj:
-            value = f.briefdailyreport(date).get("currentvalue", 0)
-            if value > 0:
-                if isinstance(f, itrade):
-                    if f.get_type() == "股票":
-                        d["stock"] += value
-                        continue
-                    elif f.get_type() in ["可转债", "债券"]:
-                        d["bond"] += value
-                        continue
-                    elif f.get_type() == "货币基金":
-                        d["cash"] += value
-                        continue
-                    elif f.get_type() == "场内基金":
-                        code = f.code[2:]
-                    else:
-                        continue
-                else:
-                    code = f.code
-                if code == "mf":
-                    d["cash"] += value
-                    continue
-                if get_fund_type(code) == "货币基金":
-                    d["cash"] += value
-                    continue
-                df = xu.get_daily("pt-F" + code, end=date.strftime("%Y%m%d"))
-                if df is None or len(df) == 0:
-                    logger.warning("empty portfolio info for %s" % code)
-                row = df.iloc[-1]
-                if row["bond_ratio"] + row["stock_ratio"] < 10:  # 联接基金
-                    d["stock"] += (
-                        (100 - row["bond_ratio"] - row["cash_ratio"]) * value / 100
-                    )
-                    d["bond"] += row["bond_ratio"] * value / 100
-                    d["cash"] += row["cash_ratio"] * value / 100
-                else:
-                    d["stock"] += row["stock_ratio"] * value / 100
-                    d["bond"] += row["bond_ratio"] * value / 100
-                    d["cash"] += row["cash_ratio"] * value / 100
-        return d
+        positions = self._lookthrough_positions(date, max_workers=max_workers)
+        pts = self._lookthrough_pt(positions, date, max_workers=max_workers)
+        return self._lookthrough_portfolio(positions, pts)
 
     get_portfolio_holdings = get_portfolio
 
-    def get_industry(self, date=yesterdayobj()):
+    def get_industry(self, date=yesterdayobj(), max_workers=8):
         """
         获取基金组合持仓的行业占比信息，底层为非 A 股持仓的暂不支持
 
         :param date:
+        :param max_workers: int, 并发请求数
         :return: Dict
         """
         # TODO: hard coded 一个字典来合并一些二级行业
-        d = {}
         date = convert_date(date)
-        rd = date - pd.Timedelta(days=120)
-        year = rd.year
-        season = int((rd.month - 0.1) / 3) + 1
-        for f in self.fundtradeobj:
-            value = f.briefdailyreport(date).get("currentvalue", 0)
-            if value > 0:
-                if isinstance(f, itrade):
-                    if f.get_type() == "股票":
-                        industry = get_industry_fromxq(f.code).get("industryname", "")
-                        if industry.strip():
-                            d[industry] = d.get(industry, 0) + value
-                        continue
-                    elif f.get_type() in ["可转债", "债券", "货币基金"]:
-                        # 现在简化实现可转债暂时不按正股记行业
-                        continue
-                    elif f.get_type() == "场内基金":
-                        code = f.code[2:]
-                    else:
-                        continue
-                else:
-                    code = f.code
-                if code == "mf":
-                    continue
-                if get_fund_type(code) == "货币基金":
-                    continue
-                ## 以下为持有股票的基金处理
-                ## fundinfo 有点浪费，不过简化实现暂时如此
-                fobj = fundinfo(code)
-                industry_dict = fobj.get_industry_holdings(year=year, season=season)
-                if industry_dict is None:
-                    continue
-                ## 这里行业占比需要做个 scaling
-                sv = sum([v for _, v in industry_dict.items()])
-                if sv < 1.0:
-                    # 只有极少数持仓存在行业信息
-                    continue
-                stock_ratio = fobj.get_portfolio_holdings(date.strftime("%Y%m%d"))[
-                    "stock_ratio"
-                ]
-                scale = stock_ratio / sv
-                for k, v in industry_dict.items():
-                    if k.strip():
-                        d[k] = d.get(k, 0) + value * v / 100 * scale
-        return d
+        year, season = _report_quarter(date)
+        positions = self._lookthrough_positions(date, max_workers=max_workers)
+        pts = self._lookthrough_pt(positions, date, max_workers=max_workers)
+        return self._lookthrough_industry(
+            positions, year, season, pts, max_workers=max_workers
+        )
 
     get_industry_holdings = get_industry
 
@@ -501,6 +835,151 @@ class mul:
         else:
             return pie
 
+    def history(self, end=yesterdayobj(), name=None):
+        """
+        daily history of every position from its first trade to end, namely the share, value and cash flow
+        of each fund on each calendar day, share and value are the same as the ones given by ``briefdailyreport``.
+        If name is given, the history is materialized in memory and the backend set by :func:`xalpha.set_backend`,
+        later calls only compute the days after the stored horizon, and the history of a fund is recomputed
+        only when its cftable changes before the horizon. Days later than the last price are not stored.
+
+        :param end: string or obj of date, the end date of the history
+        :param name: Optional[str], name of the history store
+        :returns: pd.DataFrame with columns date, code, name, share, value and cash
+        """
+        end = convert_date(end)
+        stored = load_history(name) if name else {}
+        codes = [f.code for f in self.fundtradeobj if len(f.cftable) > 0]
+        rewrite = not stored or not set(stored).issubset(codes)
+        updates = {}  # days after the stored horizon
+        merged = {}  # the whole stored history after this call
+        frames = []
+        for fund in self.fundtradeobj:
+            if len(fund.cftable) == 0:
+                continue
+            first = fund.cftable["date"].min()
+            chunk = stored.get(fund.code)
+            if chunk is not None:
+                horizon = pd.Timestamp(chunk["horizon"])
+                if pd.Timestamp(chunk["start"]) != first or chunk[
+                    "fingerprint"
+                ] != _cftable_fingerprint(fund.cftable, horizon):
+                    # 账单在已存储的日期内有变化
+                    chunk = None
+                    rewrite = True
+            if chunk is None:
+                chunk = {
+                    "code": fund.code,
+                    "start": first.strftime("%Y-%m-%d"),
+                    "horizon": (first - pd.Timedelta(days=1)).strftime("%Y-%m-%d"),
+                    "share": [],
+                    "value": [],
+                    "cash": [],
+                }
+            horizon = pd.Timestamp(chunk["horizon"])
+            times, share, value, cash = fund._positions_daily(
+                horizon + pd.Timedelta(days=1), end
+            )
+            if fund.price is not None and len(fund.price) > 0:
+                n = int(np.searchsorted(times, fund.price["date"].iloc[-1], "right"))
+            else:
+                n = len(times)
+            if n > 0:
+                newhorizon = times[n - 1]
+                updates[fund.code] = {
+                    "code": fund.code,
+                    "start": times[0].strftime("%Y-%m-%d"),
+                    "horizon": newhorizon.strftime("%Y-%m-%d"),
+                    "fingerprint": _cftable_fingerprint(fund.cftable, newhorizon),
+                    "share": share[:n].tolist(),
+                    "value": value[:n].tolist(),
+                    "cash": cash[:n].tolist(),
+                }
+                merged[fund.code] = dict(
+                    chunk,
+                    horizon=updates[fund.code]["horizon"],
+                    fingerprint=updates[fund.code]["fingerprint"],
+                    share=chunk["share"] + updates[fund.code]["share"],
+                    value=chunk["value"] + updates[fund.code]["value"],
+                    cash=chunk["cash"] + updates[fund.code]["cash"],
+                )
+            elif chunk["share"]:
+                merged[fund.code] = chunk
+            m = len(chunk["share"])
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "date": pd.date_range(first, periods=m).append(times),
+                        "code": fund.code,
+                        "name": fund.name,
+                        "share": np.concatenate([chunk["share"], share]),
+                        "value": np.concatenate([chunk["value"], value]),
+                        "cash": np.concatenate([chunk["cash"], cash]),
+                    }
+                )
+            )
+        if name:
+            if rewrite:
+                save_history(name, merged)
+            elif updates:
+                save_history(name, updates, append=True)
+        columns = ["date", "code", "name", "share", "value", "cash"]
+        if not frames:
+            return pd.DataFrame([], columns=columns)
+        df = pd.concat(frames, ignore_index=True)
+        return df[df["date"] <= end].reset_index(drop=True)[columns]
+
+    def _categories(self, max_workers=8):
+        """
+        category of each position, 场内标的为其类型，场外基金为 :func:`xalpha.universal.get_fund_type` 给出的类型
+
+        :returns: Dict[str, str]
+        """
+
+        def _category(fund):
+            if isinstance(fund, itrade):
+                return fund.get_type()
+            if fund.code == "mf":
+                return "货币基金"
+            return get_fund_type(fund.code)
+
+        return dict(
+            zip(
+                [f.code for f in self.fundtradeobj],
+                concurrent_map(_category, self.fundtradeobj, max_workers=max_workers),
+            )
+        )
+
+    def history_report(self, end=yesterdayobj(), name=None, freq="D", category=None):
+        """
+        daily report of the portfolio based on :meth:`history`, including total value, allocation by category
+        and xirr to date
+
+        :param end: string or obj of date, the end date of the report
+        :param name: Optional[str], name of the history store, see :meth:`history`
+        :param freq: str, D for every day, or pandas frequency string such as W and M, then only the last day
+            of each period is reported
+        :param category: Optional[Dict[str, str]], category of each code, default by :meth:`_categories`
+        :returns: pd.DataFrame indexed by date, with columns total, value of each category, and xirr
+        """
+        hist = self.history(end, name)
+        if category is None:
+            category = self._categories()
+        hist["category"] = hist["code"].map(category).fillna("其他")
+        table = hist.pivot_table(
+            index="date",
+            columns="category",
+            values="value",
+            aggfunc="sum",
+            fill_value=0,
+        )
+        table.columns.name = None
+        if freq != "D":
+            table = table.groupby(pd.Grouper(freq=freq)).tail(1)
+        table.insert(0, "total", table.sum(axis=1))
+        table["xirr"] = self.xirrrate_batch(table.index).values
+        return table
+
     def v_positions_history(self, end=yesterdaydash(), rendered=True):
         """
         river chart visulization of positions ratio history
@@ -508,21 +987,27 @@ class mul:
         """
         start = self.totcftable.iloc[0].date
         times = pd.date_range(start, end)
+        hist = self.history(end)
+        table = hist.pivot_table(
+            index="date", columns="code", values="value", aggfunc="sum"
+        )
+        names = [fob.name for fob in self.fundtradeobj]
+        table = table.reindex(
+            index=times, columns=[fob.code for fob in self.fundtradeobj]
+        ).fillna(0)
         tdata = []
-        for date in times:
-            sdata = sorted(
-                [
-                    (date, fob.briefdailyreport(date).get("currentvalue", 0), fob.name,)
-                    for fob in self.fundtradeobj
-                ],
-                key=lambda x: x[1],
-                reverse=True,
+        for date, row in zip(times, table.values):
+            tdata.extend(
+                sorted(
+                    [(date, v, n) for v, n in zip(row, names)],
+                    key=lambda x: x[1],
+                    reverse=True,
+                )
             )
-            tdata.extend(sdata)
 
         tr = ThemeRiver()
         tr.add(
-            series_name=[foj.name for foj in self.fundtradeobj],
+            series_name=names,
             data=tdata,
             label_opts=opts.LabelOpts(is_show=False),
             singleaxis_opts=opts.SingleAxisOpts(type_="time", pos_bottom="10%"),
@@ -559,8 +1044,12 @@ class mulfix(mul, indicator):
     :param form: string, the format of IO, options including: 'csv','sql'
     :param totmoney: positive float, the total money as the input at the beginning
     :param cashobj: cashinfo object, which is designed to balance the cash in and out
+    :param checkpoint: Optional[str], name of the checkpoint store, see :class:`mul`
+    :param max_workers: int, see :class:`mul`
     """
 
+    _init_save_checkpoint = False  # 加入现金交易后统一保存
+
     def __init__(
         self,
         *fundtradeobj,
@@ -572,7 +1061,9 @@ class mulfix(mul, indicator):
         path="",
         form="csv",
         totmoney=100000,
-        cashobj=None
+        cashobj=None,
+        checkpoint=None,
+        max_workers=1
     ):
         super().__init__(
             *fundtradeobj,
@@ -582,13 +1073,17 @@ class mulfix(mul, indicator):
             fetch=fetch,
             save=save,
             path=path,
-            form=form
+            form=form,
+            checkpoint=checkpoint,
+            max_workers=max_workers
         )
         if cashobj is None:
             cashobj = cashinfo()
         self.totmoney = totmoney
         nst = mulfix._vcash(totmoney, self.totcftable, cashobj)
-        cashtrade = trade(cashobj, nst)
+        cashtrade = trade.from_checkpoint(
+            cashobj, nst, self._checkpoints.get(cashobj.code)
+        )
         # 		 super().__init__(*self.fundtradeobj, cashtrade)
         self.cashobj = cashobj
         self.fundtradeobj = list(self.fundtradeobj)
@@ -600,26 +1095,29 @@ class mulfix(mul, indicator):
         self.totcftable = pd.DataFrame(
             data={"date": [nst.iloc[0].date], "cash": [-totmoney]}
         )
+        if checkpoint:
+            self.save_checkpoint(checkpoint)
 
     @staticmethod
     def _vcash(totmoney, totcftable, cashobj):
         """
         return a virtue status table with a mf(cash) column based on the given tot money and cftable
         """
-        cashl = []
-        cashl.append(totmoney + totcftable.iloc[0].cash)
-        for i in range(len(totcftable) - 1):
-            date = totcftable.iloc[i + 1].date
-            delta = totcftable.iloc[i + 1].cash
-            if delta < 0:
-                cashl.append(
-                    myround(
-                        delta
-                        / cashobj.price[cashobj.price["date"] <= date].iloc[-1].netvalue
-                    )
-                )
-            else:
-                cashl.append(delta)
+        delta = totcftable["cash"].values.astype(float)
+        dates, netvalues = cashobj._price_arrays()
+        idx = (
+            np.searchsorted(
+                dates, totcftable["date"].values.astype("datetime64[ns]"), side="right"
+            )
+            - 1
+        )
+        if len(idx) > 1 and idx[1:].min() < 0:
+            raise IndexError(
+                "no price record of cash before %s" % totcftable.iloc[1].date
+            )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cashl = np.where(delta < 0, myround_array(delta / netvalues[idx]), delta)
+        cashl[0] = totmoney + delta[0]
         datadict = {"date": totcftable.loc[:, "date"], "mf": cashl}
         return pd.DataFrame(data=datadict)
 
@@ -633,6 +1131,52 @@ class mulfix(mul, indicator):
             res += fund.briefdailyreport(date).get("currentvalue", 0)
         return res / self.totmoney
 
+    def unitvalue_series(self, end=yesterdayobj()):
+        """
+        daily unitvalue of the whole investment combination from the first trade to end,
+        values on each date are the same as the ones given by :meth:`unitvalue`.
+        Days computed are kept, so that later calls with a later end only compute the new days.
+
+        :param end: string or object of date, the end date of the series
+        :returns: pd.DataFrame with columns date and netvalue, one row for each calendar day
+        """
+        end = convert_date(end)
+        nav = getattr(self, "_nav", None)
+        if nav is not None and len(nav) > 0:
+            if nav.iloc[-1].date >= end:
+                return nav[nav["date"] <= end]
+            start = nav.iloc[-1].date + pd.Timedelta(days=1)
+        else:
+            start = self.totcftable.iloc[0].date
+        times = pd.date_range(start, end)
+        new = pd.DataFrame(data={"date": times, "netvalue": self._unitvalues(times)})
+        if nav is None:
+            self._nav = new
+        else:
+            self._nav = pd.concat([nav, new], ignore_index=True)
+        return self._nav
+
+    def _unitvalues(self, times):
+        """
+        unitvalues on given dates, as the sum of share panel times the aligned price panel of all funds
+
+        :param times: pd.DatetimeIndex
+        :returns: np.ndarray
+        """
+        d64 = times.values.astype("datetime64[ns]")
+        shares = np.zeros((len(self.fundtradeobj), len(d64)))
+        prices = np.zeros((len(self.fundtradeobj), len(d64)))
+        for j, fund in enumerate(self.fundtradeobj):
+            cf = fund._cf_arrays()
+            if len(cf["date"]) == 0:
+                continue
+            k = np.searchsorted(cf["date"], d64, side="right")
+            shares[j] = np.where(
+                k > 0, myround_array(cf["share"][np.maximum(k - 1, 0)]), 0
+            )
+            prices[j] = fund._netvalues(d64)
+        return myround_array(shares * prices).sum(axis=0) / self.totmoney
+
     def v_tradecost(self, threhold=0, date=yesterdayobj(), rendered=True):
         if getattr(self, "price", None) is None:
             raise ValueError("Please generate price table by ``bcmkset()`` first")
@@ -643,25 +1187,24 @@ class mulfix(mul, indicator):
 
 
 class imul(mul):
-    def __init__(self, *fundtradeobj, status=None, istatus=None):
+    def __init__(self, *fundtradeobj, status=None, istatus=None, max_workers=1):
         """
         对场内投资组合进行分析的类
 
         :param fundtradeobj: itrade objects.
         :param status: 场内格式记账单，或 irecord 对象。
+        :param max_workers: int, 并发构建 itrade 的线程数，默认 1 为串行。
         """
 
         if not fundtradeobj:
             fundtradeobj = []
         if status is None:
             status = istatus
-        if isinstance(status, irecord):
-            status = status.status
         fundcodelist = [f.code for f in fundtradeobj]
         if status is not None:
-            for code in status.code.unique():
-                if code not in fundcodelist and not code.startswith("#"):
-                    fundtradeobj.append(itrade(code, status))
+            fundtradeobj.extend(
+                _build_itrades(status, fundcodelist, max_workers=max_workers)
+            )
         self.fundtradeobj = tuple(fundtradeobj)
         self.totcftable = self._mergecftb()
         self.is_in = True
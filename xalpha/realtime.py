@@ -16,7 +16,7 @@ from re import match
 import pandas as pd
 
 from xalpha.cons import today_obj, rget
-from xalpha.info import fundinfo
+from xalpha.info import fundinfo, FundInfoPool
 from xalpha.trade import trade
 
 
@@ -150,6 +150,7 @@ class review:
         else:
             self.namelist = namelist
         assert len(self.policylist) == len(self.namelist)
+        pool = FundInfoPool()
         for i, policy in enumerate(policylist):
             row = policy.status[policy.status["date"] == date]
             if len(row) == 1:
@@ -165,7 +166,7 @@ class review:
                 elif warn[2] < 0:
                     ratio = -warn[2] / 0.005 * 100
                     share = (
-                        trade(fundinfo(warn[1]), policy.status)
+                        trade(pool.get(warn[1]), policy.status)
                         .briefdailyreport()
                         .get("currentshare", 0)
                     )
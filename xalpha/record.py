@@ -141,16 +141,33 @@ class irecord(record):
         else:
             df = path
         df.fillna(0, inplace=True)
-        df.date = [
-            pd.to_datetime(df.iloc[i].date, format="%Y%m%d") for i in range(len(df))
-        ]
+        df.date = pd.to_datetime(df["date"], format="%Y%m%d")
         if "fee" not in df.columns:
             df = df.assign(fee=[0] * len(df))
         df = df.sort_values(by="date", ascending=True)
         self.status = df
 
+    def _code_index(self):
+        """
+        row positions of each code in status table, cached until ``self.status`` is replaced
+
+        :returns: Dict[str, np.ndarray]
+        """
+        status = self.status
+        if getattr(self, "_index_ref", None) is not status or self._index_len != len(
+            status
+        ):
+            self._index = status.groupby("code", sort=False).indices
+            self._index_ref = status
+            self._index_len = len(status)
+        return self._index
+
     def filter(self, code, start=None, end=None):
-        df = self.status[self.status["code"] == code]
+        idx = self._code_index().get(code)
+        if idx is None:
+            df = self.status.iloc[:0]
+        else:
+            df = self.status.iloc[idx]
         if start:
             df = df[df["date"] >= start]
         if end:
@@ -7,16 +7,225 @@ and it is also useful when converting the shares of funds.
 as the nested list structure is very fragile and tend to induce unpredicatble behaviors,
 we strongly recommended anytime when rem data serves as function paramters, 
 only utilize functions from this module
+
+besides the nested list, the functions also accept :class:`Lots`, an immutable lot ledger whose snapshots
+share storage with each other, and return :class:`Lots` in that case
 """
 from xalpha.cons import convert_date, myround
 
 _errmsg = "One cannot move share before the lastest operation"
 
 
+class _LotStore:
+    """
+    append only storage of lots shared by many :class:`Lots` snapshots
+    """
+
+    __slots__ = ("dates", "shares")
+
+    def __init__(self, dates=None, shares=None):
+        self.dates = dates or []
+        self.shares = shares or []
+
+
+class Lots:
+    """
+    immutable FIFO lot ledger, behaves like the nested list rem form data, eg. [[pd.Timestamp(), 50], ...]
+    when iterated, indexed or compared.
+    Lots live in an append only store shared between snapshots: buying appends to the store,
+    selling from the front only moves the start offset (as a deque does) and keeps the partially sold lot
+    as a separate head, so that each snapshot kept in ``trade.remtable`` costs O(1) memory.
+
+    :param lots: Optional, nested list of [date, share] in time order
+    """
+
+    __slots__ = ("_store", "_start", "_end", "_head", "_tail")
+
+    def __init__(self, lots=None):
+        lots = lots or []
+        self._store = _LotStore([l[0] for l in lots], [l[1] for l in lots])
+        self._start = 0
+        self._end = len(lots)
+        self._head = None
+        self._tail = None
+
+    @classmethod
+    def _view(cls, store, start, end, head=None, tail=None):
+        obj = cls.__new__(cls)
+        obj._store = store
+        obj._start = start
+        obj._end = end
+        obj._head = head
+        obj._tail = tail
+        return obj
+
+    def __len__(self):
+        return (
+            self._end
+            - self._start
+            + (self._head is not None)
+            + (self._tail is not None)
+        )
+
+    def __iter__(self):
+        if self._head is not None:
+            yield [self._head[0], self._head[1]]
+        dates, shares = self._store.dates, self._store.shares
+        for i in range(self._start, self._end):
+            yield [dates[i], shares[i]]
+        if self._tail is not None:
+            yield [self._tail[0], self._tail[1]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return list(self)[i]
+        n = len(self)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("Lots index out of range")
+        if self._head is not None:
+            if i == 0:
+                return [self._head[0], self._head[1]]
+            i -= 1
+        if i < self._end - self._start:
+            j = self._start + i
+            return [self._store.dates[j], self._store.shares[j]]
+        return [self._tail[0], self._tail[1]]
+
+    def __eq__(self, other):
+        if isinstance(other, (Lots, list)):
+            return list(self) == [list(item) for item in other]
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Lots(%s)" % list(self)
+
+    def shares_before(self, date):
+        """
+        total shares of lots bought on or before date
+
+        :param date: string in the date form or datetime object
+        :returns: float
+        """
+        date = convert_date(date)
+        tot = 0
+        for d, share in self:
+            if d > date:
+                break
+            tot += share
+        return tot
+
+    def _owned(self):
+        """
+        store, start and end which can be appended to without affecting other snapshots
+        """
+        store = self._store
+        if self._end == len(store.dates) and self._tail is None:
+            return store, self._start, self._end
+        # 从历史快照分叉或存在同日合并的末项时，复制存活部分
+        new = _LotStore(
+            store.dates[self._start : self._end], store.shares[self._start : self._end]
+        )
+        if self._tail is not None:
+            new.dates.append(self._tail[0])
+            new.shares.append(self._tail[1])
+        return new, 0, len(new.dates)
+
+    def _buy(self, share, date):
+        if len(self) > 0:
+            last = self[-1]
+            days = (date - last[0]).days
+            if days == 0:
+                if self._tail is not None:
+                    return Lots._view(
+                        self._store,
+                        self._start,
+                        self._end,
+                        self._head,
+                        (last[0], last[1] + share),
+                    )
+                elif self._end > self._start:
+                    return Lots._view(
+                        self._store,
+                        self._start,
+                        self._end - 1,
+                        self._head,
+                        (last[0], last[1] + share),
+                    )
+                else:
+                    return Lots._view(
+                        self._store, self._start, self._end, (last[0], last[1] + share)
+                    )
+            elif days < 0:
+                raise Exception(_errmsg)
+        store, start, end = self._owned()
+        store.dates.append(date)
+        store.shares.append(share)
+        return Lots._view(store, start, end + 1, self._head)
+
+    def _sell(self, share, date):
+        lots = list(self)
+        totposition = sum([pos[1] for pos in lots])  # the remaining shares
+        if totposition == 0:
+            return ([], Lots())
+        if (date - lots[-1][0]).days < 0:
+            raise Exception(_errmsg)
+        if share > totposition:
+            share = totposition  # not raise error when you sell more than you buy
+        soldrem = []
+        newrem = []
+        kept = []  # index of lots kept as they are
+        partial = None
+        prev = 0  # shares of lots before i, the same summation order as the nested list version
+        for i, pos in enumerate(lots):
+            cur = prev + pos[1]
+            rcur = myround(cur)
+            if share > rcur or share == rcur:
+                soldrem.append(pos)
+            elif share < rcur:
+                if share > prev:
+                    soldrem.append([pos[0], share - prev])
+                    partial = (i, [pos[0], cur - share])
+                    newrem.append(partial[1])
+                else:
+                    kept.append(i)
+                    newrem.append(pos)
+            prev = cur
+        n = len(lots)
+        a = n - len(kept)
+        if kept != list(range(a, n)) or (
+            partial is not None and (partial[0] != a - 1 or newrem[0] is not partial[1])
+        ):
+            return (soldrem, Lots(newrem))
+        # 剩余部分为原快照的后缀，共享存储
+        h = 1 if self._head is not None else 0
+        if partial is None and a == 0:
+            return (soldrem, self)
+        head = tuple(partial[1]) if partial is not None else None
+        if partial is None and a < h:
+            head = self._head
+        m = self._end - self._start
+        start = self._start + min(max(a - h, 0), m)
+        tail = self._tail if a <= h + m else None
+        return (soldrem, Lots._view(self._store, start, self._end, head, tail))
+
+    def _trans(self, coef, date):
+        if len(self) == 0:
+            return Lots()
+        if (date - self[-1][0]).days <= 0:
+            raise Exception(_errmsg)
+        return Lots([[item[0], myround(item[1] * coef)] for item in self])
+
+
 def copy(remc):
     """
     copy the rem form data so that the return is independent of the input
     """
+    if isinstance(remc, Lots):
+        return remc  # immutable
     rem = [remcterm.copy() for remcterm in remc]
     return rem
 
@@ -30,6 +239,8 @@ def buy(remc, share, date):
     :param date: string in the date form or datetime object
     :returns: new rem after the buying
     """
+    if isinstance(remc, Lots):
+        return remc._buy(myround(share), convert_date(date))
     rem = copy(remc)
     share = myround(share)
     date = convert_date(date)
@@ -50,6 +261,8 @@ def sell(remc, share, date):
     :returns: tuple, (sold rem, new rem)
         sold rem is the positions being sold while new rem is the positions being held
     """
+    if isinstance(remc, Lots):
+        return remc._sell(myround(share), convert_date(date))
     rem = copy(remc)
     share = myround(share)
     date = convert_date(date)
@@ -86,6 +299,8 @@ def trans(remc, coef, date):
     :param date: string in date form or datetime obj
     :returns: new rem after converting
     """
+    if isinstance(remc, Lots):
+        return remc._trans(coef, convert_date(date))
     rem = copy(remc)
     date = convert_date(date)
     if len(rem) == 0:
@@ -94,3 +309,58 @@ def trans(remc, coef, date):
         raise Exception(_errmsg)
     newrem = [[item[0], myround(item[1] * coef)] for item in rem]
     return newrem
+
+
+def pack(rems):
+    """
+    serialize a sequence of rem snapshots, eg. the rem column of ``trade.remtable``, into json compatible dict,
+    the storage shared by :class:`Lots` snapshots is only kept once
+
+    :param rems: list of rem, either nested list or :class:`Lots`
+    :returns: dict with keys stores and rems
+    """
+    stores = []
+    storeid = {}
+    views = []
+
+    def _lot(item):
+        if item is None:
+            return None
+        return [item[0].isoformat(), item[1]]
+
+    for rem in rems:
+        if not isinstance(rem, Lots):
+            rem = Lots(rem)
+        i = storeid.get(id(rem._store))
+        if i is None:
+            i = len(stores)
+            storeid[id(rem._store)] = i
+            stores.append(rem._store)
+        views.append([i, rem._start, rem._end, _lot(rem._head), _lot(rem._tail)])
+    return {
+        "stores": [[[d.isoformat() for d in s.dates], list(s.shares)] for s in stores],
+        "rems": views,
+    }
+
+
+def unpack(data):
+    """
+    inverse of :func:`pack`
+
+    :param data: dict given by :func:`pack`
+    :returns: list of :class:`Lots`
+    """
+    stores = [
+        _LotStore([convert_date(d) for d in dates], list(shares))
+        for dates, shares in data["stores"]
+    ]
+
+    def _lot(item):
+        if item is None:
+            return None
+        return (convert_date(item[0]), item[1])
+
+    return [
+        Lots._view(stores[i], start, end, _lot(head), _lot(tail))
+        for i, start, end, head, tail in data["rems"]
+    ]
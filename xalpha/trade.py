@@ -3,15 +3,27 @@
 module for trade class
 """
 import math
+import bisect
 import datetime as dt
+import hashlib
+import json
 import logging
 
+import numpy as np
 import pandas as pd
 from pyecharts.charts import Bar, Line
 from pyecharts import options as opts
 
 import xalpha.remain as rm
-from xalpha.cons import convert_date, line_opts, myround, xirr, yesterdayobj
+from xalpha.cons import (
+    convert_date,
+    line_opts,
+    myround,
+    myround_array,
+    xirr,
+    xirr_batch,
+    yesterdayobj,
+)
 from xalpha.exceptions import ParserFailure, TradeBehaviorError
 from xalpha.record import irecord
 import xalpha.universal as xu
@@ -20,25 +32,18 @@ from xalpha.universal import get_rt
 logger = logging.getLogger(__name__)
 
 
-def xirrcal(cftable, trades, date, startdate=None, guess=0.01):
+def _xirr_cashflow(cftable, trades, date, startdate=None):
     """
-    calculate the xirr rate
+    cashflow list for xirr, with all holding positions virtually sold on date
 
-    :param cftable: cftable (pd.Dateframe) with date and cash column
-    :param trades: list [trade1, ...], every item is an trade object,
-        whose shares would be sold out virtually
-    :param date: string of date or datetime object,
-        the date when virtually all holding positions being sold
-    :param guess: floating number, a guess at the xirr rate solution to be used
-        as a starting point for the numerical solution
-    :returns: the IRR as a single floating number
+    :returns: list of (date, cash) tuples, or None if there is no cashflow before date
     """
     date = convert_date(date)
     partcftb = cftable[cftable["date"] <= date]
     if len(partcftb) == 0:
-        return 0
+        return None
     if not startdate:
-        cashflow = [(row["date"], row["cash"]) for i, row in partcftb.iterrows()]
+        cashflow = list(zip(partcftb["date"], partcftb["cash"]))
     else:
         if not isinstance(startdate, dt.datetime):
             startdate = dt.datetime.strptime(
@@ -49,7 +54,7 @@ def xirrcal(cftable, trades, date, startdate=None, guess=0.01):
             start_cash += fund.briefdailyreport(startdate).get("currentvalue", 0)
         cashflow = [(startdate, -start_cash)]
         partcftb = partcftb[partcftb["date"] > startdate]
-        cashflow.extend([(row["date"], row["cash"]) for i, row in partcftb.iterrows()])
+        cashflow.extend(zip(partcftb["date"], partcftb["cash"]))
     rede = 0
     for fund in trades:
         if not isinstance(fund, itrade):
@@ -64,9 +69,129 @@ def xirrcal(cftable, trades, date, startdate=None, guess=0.01):
         else:  # 场内交易
             rede += fund.briefdailyreport(date).get("currentvalue", 0)
     cashflow.append((date, rede))
+    return cashflow
+
+
+def xirrcal(cftable, trades, date, startdate=None, guess=0.01):
+    """
+    calculate the xirr rate
+
+    :param cftable: cftable (pd.Dateframe) with date and cash column
+    :param trades: list [trade1, ...], every item is an trade object,
+        whose shares would be sold out virtually
+    :param date: string of date or datetime object,
+        the date when virtually all holding positions being sold
+    :param guess: floating number, a guess at the xirr rate solution to be used
+        as a starting point for the numerical solution
+    :returns: the IRR as a single floating number
+    """
+    cashflow = _xirr_cashflow(cftable, trades, date, startdate)
+    if cashflow is None:
+        return 0
     return xirr(cashflow, guess)
 
 
+def xirrcal_batch(cftable, trades, dates, startdate=None, guess=0.01):
+    """
+    calculate the xirr rates for many end dates in one call, see :func:`xirrcal`
+
+    :param dates: list of string of date or datetime object,
+        the dates when virtually all holding positions being sold
+    :returns: pd.Series of xirr rates indexed by dates, nan for the date without solution
+    """
+    dates = [convert_date(d) for d in dates]
+    cashflows = [_xirr_cashflow(cftable, trades, d, startdate) for d in dates]
+    valid = [i for i, cf in enumerate(cashflows) if cf is not None]
+    rates = np.zeros(len(dates))
+    rates[valid] = xirr_batch([cashflows[i] for i in valid], guess)
+    return pd.Series(rates, index=pd.DatetimeIndex(dates))
+
+
+_checkpoint_version = 1
+
+
+def _info_fingerprint(infoobj, lastdate):
+    """
+    digest of the info object attrs which the trade computation up to lastdate depends on
+    """
+    h = hashlib.sha1()
+    attrs = [type(infoobj).__name__, infoobj.code]
+    for attr in [
+        "rate",
+        "feeinfo",
+        "segment",
+        "round_label",
+        "dividend_label",
+        "value_label",
+    ]:
+        attrs.append(getattr(infoobj, attr, None))
+    h.update(json.dumps(attrs, default=str).encode("utf-8"))
+    if lastdate is not None:
+        price = infoobj.price[infoobj.price["date"] <= lastdate]
+        h.update(
+            pd.util.hash_pandas_object(
+                price[["date", "netvalue", "comment"]], index=False
+            ).values.tobytes()
+        )
+    return h.hexdigest()
+
+
+def _status_fingerprint(status, code, lastdate):
+    """
+    digest of the ledger rows of code up to lastdate
+    """
+    h = hashlib.sha1()
+    if lastdate is not None:
+        part = status[status["date"] <= lastdate]
+        h.update(
+            json.dumps(
+                [[d.isoformat(), float(v)] for d, v in zip(part["date"], part[code])]
+            ).encode("utf-8")
+        )
+    return h.hexdigest()
+
+
+_checkpoint_cache = {}
+
+
+def load_checkpoints(name):
+    """
+    load trade checkpoints of a portfolio from memory or the backend configured by :func:`xalpha.set_backend`
+
+    :param name: str, name of the checkpoint store
+    :returns: Dict[code, checkpoint]
+    """
+    if name in _checkpoint_cache:
+        return dict(_checkpoint_cache[name])
+    checkpoints = {}
+    if xu.ioconf.get("backend") in ["csv", "sql"]:
+        df = xu.fetch_backend("CHECKPOINT-" + name)
+        if df is not None:
+            for content in df["content"]:
+                checkpoint = json.loads(content)  # code 列从 csv 读回可能丢失前导 0
+                checkpoints[checkpoint["code"]] = checkpoint
+    _checkpoint_cache[name] = checkpoints
+    return dict(checkpoints)
+
+
+def save_checkpoints(name, checkpoints):
+    """
+    save trade checkpoints of a portfolio into memory and the configured backend
+
+    :param name: str, name of the checkpoint store
+    :param checkpoints: Dict[code, checkpoint]
+    """
+    _checkpoint_cache[name] = dict(checkpoints)
+    if xu.ioconf.get("backend") in ["csv", "sql"]:
+        df = pd.DataFrame(
+            {
+                "code": list(checkpoints.keys()),
+                "content": [json.dumps(c) for c in checkpoints.values()],
+            }
+        )
+        xu.save_backend("CHECKPOINT-" + name, df, mode="w")
+
+
 def bottleneck(cftable):
     """
     find the max total input in the history given cftable with cash column
@@ -75,9 +200,26 @@ def bottleneck(cftable):
     """
     if len(cftable) == 0:
         return 0
-    # cftable = cftable.reset_index(drop=True) # unnecessary as iloc use natural rows instead of default index
-    inputl = [-sum(cftable.iloc[:i].cash) for i in range(1, len(cftable) + 1)]
-    return myround(max(inputl))
+    inputl = -np.cumsum(cftable["cash"].values.astype(float))
+    return myround(inputl.max())
+
+
+def bottleneck_series(cftable):
+    """
+    max total input as of every date in cftable, namely :func:`bottleneck` of the cftable rows up to the date
+
+    :param cftable: pd.DataFrame of cftable
+    :returns: pd.Series indexed by date
+    """
+    if len(cftable) == 0:
+        return pd.Series([], dtype=float)
+    cftable = cftable.sort_values(by="date", kind="mergesort")
+    inputl = -np.cumsum(cftable["cash"].values.astype(float))
+    s = pd.Series(
+        myround_array(np.maximum.accumulate(inputl)),
+        index=pd.DatetimeIndex(cftable["date"]),
+    )
+    return s[~s.index.duplicated(keep="last")]
 
 
 def turnoverrate(cftable, end=yesterdayobj()):
@@ -209,14 +351,14 @@ def vtradecost(
     if start is not None:
         pprice = pprice[pprice["date"] >= start]
         pcftable = pcftable[pcftable["date"] >= start]
+    if unitcost:
+        series = self.dailyreport_series(end=end)
+        costs = dict(zip(series["date"], series["unitcost"]))
     for _, row in pprice.iterrows():
         date = row["date"]
         funddata.append(row["netvalue"])
         if unitcost:
-            cost = 0
-            if (date - self.cftable.iloc[0].date).days >= 0:
-                cost = self.unitcost(date)
-            costdata.append(cost)
+            costdata.append(costs.get(date, 0))
 
     coords = []
     # pcftable = pcftable[abs(pcftable["cash"]) > threhold]
@@ -292,14 +434,29 @@ class trade:
         现金的进出和份额的变化情况，所有的份额数据为交易当时的不复权数据。基金份额折算通过流量表中一次性的份额增减体现。
 
         2. remtable：pd.Dataframe, 持仓情况表，每行为不同变更日期，两列分别为 date 和 rem， rem 数据结构是一个嵌套的列表，
-        包含了不同时间买入仓位的剩余情况，详情参见 remain 模块。这一表格如非必需，避免任何直接调用。
+        包含了不同时间买入仓位的剩余情况，详情参见 remain 模块。event 引擎下 rem 为 remain.Lots，各行之间共享存储，
+        用法与嵌套列表相同。这一表格如非必需，避免任何直接调用。
 
     :param infoobj: info object as the trading aim
     :param status: status table, obtained from record class
+    :param cftable: Optional[pd.DataFrame], 已有的现金流量表，需与 remtable 同时提供，用于增量计算
+    :param remtable: Optional[pd.DataFrame], 已有的持仓情况表
+    :param engine: str, "event" 默认，将账单日期和分红折算日期合并为一个有序事件流单次处理；
+        "legacy" 为逐日扫描逐行添加的原始实现，两者结果一致
+    :param lastdate: Optional, 增量计算时已处理到的日期，默认为 cftable 最后一行的日期，一般由 :meth:`from_checkpoint` 提供
     """
 
-    def __init__(self, infoobj, status, cftable=None, remtable=None):
+    def __init__(
+        self,
+        infoobj,
+        status,
+        cftable=None,
+        remtable=None,
+        engine="event",
+        lastdate=None,
+    ):
         self.aim = infoobj
+        self.engine = engine
         code = self.aim.code
         self.code = code
         self.name = self.aim.name
@@ -319,12 +476,95 @@ class trade:
             self.remtable = pd.DataFrame([], columns=["date", "rem"])
         else:
             self.remtable = remtable
+        if lastdate is not None:
+            self.lastdate = convert_date(lastdate)
         self.status = status.loc[:, ["date", code]]
         self.status = self.status[self.status[code] != 0]
         self._arrange()
 
+    def checkpoint(self):
+        """
+        serialize the computed state of the trade, which can be used to resume by :meth:`from_checkpoint`
+
+        :returns: dict, json compatible, with keys version, code, lastdate, fingerprint, status, cftable and remtable
+        """
+        lastdate = getattr(self, "lastdate", None)
+        if lastdate is None or len(self.cftable) == 0:
+            lastdate = None
+        return {
+            "version": _checkpoint_version,
+            "code": self.code,
+            "lastdate": lastdate.isoformat() if lastdate is not None else None,
+            "fingerprint": _info_fingerprint(self.aim, lastdate),
+            "status": _status_fingerprint(self.status, self.code, lastdate),
+            "cftable": {
+                "date": [d.isoformat() for d in self.cftable["date"]],
+                "cash": [float(c) for c in self.cftable["cash"]],
+                "share": [float(c) for c in self.cftable["share"]],
+            },
+            "remtable": {
+                "date": [d.isoformat() for d in self.remtable["date"]],
+                "rem": rm.pack(self.remtable["rem"]),
+            },
+        }
+
+    @classmethod
+    def from_checkpoint(cls, infoobj, status, checkpoint, engine="event"):
+        """
+        resume the trade from checkpoint given by :meth:`checkpoint`, only the ledger rows and
+        the dividend or split events after the last processed date are computed.
+        If the info or the ledger before the last processed date has changed, the trade is rebuilt from scratch.
+
+        :param infoobj: info object as the trading aim
+        :param status: status table, obtained from record class
+        :param checkpoint: dict or json string, or None which is the same as building from scratch
+        :param engine: str, see :class:`trade`
+        :returns: trade object
+        """
+        if isinstance(checkpoint, str):
+            checkpoint = json.loads(checkpoint)
+        if (
+            not checkpoint
+            or checkpoint.get("version") != _checkpoint_version
+            or checkpoint.get("code") != infoobj.code
+            or checkpoint.get("lastdate") is None
+        ):
+            return cls(infoobj, status, engine=engine)
+        lastdate = pd.Timestamp(checkpoint["lastdate"])
+        code = infoobj.code
+        st = status.loc[:, ["date", code]]
+        st = st[st[code] != 0]
+        if checkpoint["fingerprint"] != _info_fingerprint(
+            infoobj, lastdate
+        ) or checkpoint["status"] != _status_fingerprint(st, code, lastdate):
+            logger.info("checkpoint of %s is outdated, rebuild the trade" % code)
+            return cls(infoobj, status, engine=engine)
+        cf = checkpoint["cftable"]
+        cftable = pd.DataFrame(
+            {
+                "date": pd.to_datetime(cf["date"]),
+                "cash": np.array(cf["cash"], dtype=float),
+                "share": np.array(cf["share"], dtype=float),
+            }
+        )
+        rt = checkpoint["remtable"]
+        rems = np.empty(len(rt["date"]), dtype=object)
+        for i, rem in enumerate(rm.unpack(rt["rem"])):
+            rems[i] = rem
+        remtable = pd.DataFrame({"date": pd.to_datetime(rt["date"]), "rem": rems})
+        return cls(
+            infoobj,
+            status,
+            cftable=cftable,
+            remtable=remtable,
+            engine=engine,
+            lastdate=lastdate,
+        )
+
     def _arrange(self):
         self.recorddate_set = set(self.status.date)
+        if self.engine == "event" and self._event_ready():
+            return self._arrange_event()
         while 1:
             try:
                 self._addrow()
@@ -334,6 +574,203 @@ class trade:
                 else:
                     raise e
 
+    def _event_ready(self):
+        """
+        whether the event engine can exactly reproduce the legacy one on the input,
+        otherwise the legacy engine is used as fallback
+        """
+        if not self.status["date"].is_monotonic_increasing:
+            return False
+        special = self.price[self.price["date"].isin(self.aim.specialdate)]
+        return all(isinstance(c, float) for c in special["comment"])
+
+    def _arrange_event(self):
+        """
+        event driven engine, the ledger dates and the special dates (fenhong and zhesuan) of the fund are merged
+        into one sorted stream and processed in a single pass, the cftable and remtable are the same as the ones
+        from the legacy ``_addrow`` loop
+        """
+        code = self.aim.code
+        recordvalue = dict(zip(self.status["date"], self.status[code]))  # 同日多条取最后一条
+        specialdate = set(self.aim.specialdate)
+        zhesuandate = set(self.aim.zhesuandate)
+        special = {}  # date: (comment, netvalue)
+        for d, c, v in self.price[self.price["date"].isin(specialdate)][
+            ["date", "comment", "netvalue"]
+        ].itertuples(index=False):
+            special.setdefault(d, (c, v))
+        events = sorted(set(recordvalue) | specialdate)
+        yesterday = yesterdayobj()
+
+        n = len(events) + 1
+        rdates = np.empty(n, dtype="datetime64[ns]")
+        cashes = np.zeros(n)
+        shares = np.zeros(n)
+        rems = np.empty(n, dtype=object)  # 逐个赋值，避免 pandas 将 Lots 展开
+        k = 0
+        oldcf, oldrem = None, None
+        if len(self.cftable) > 0:  # 增量计算
+            oldcf, oldrem = self.cftable, self.remtable
+            lastdate = getattr(self, "lastdate", None) or self.cftable.iloc[-1].date
+            rem = self.remtable.iloc[-1].rem
+            if not isinstance(rem, rm.Lots):
+                rem = rm.Lots(rem)
+            oldrows = list(zip(self.cftable["date"], self.cftable["share"]))
+            total = sum([sh for _, sh in oldrows])
+            maxdate = max(self.cftable["date"])
+        else:
+            if len(self.status) == 0:
+                return
+            value = self.status.iloc[0].loc[code]
+            lastdate = self.status.iloc[0].date
+            date = self.aim._row_after(lastdate)[0]
+            if value > 0:
+                rdate, cash, share, rem = self._trade_buy(value, date, rm.Lots())
+            else:
+                raise TradeBehaviorError("You cannot sell first when you never buy")
+            rdates[0], cashes[0], shares[0], rems[0] = rdate, cash, share, rem
+            k = 1
+            oldrows = []
+            total = 0 + shares[0]
+            maxdate = rdate
+
+        def remainshare(date):
+            # 按比例卖出时，date 及之前的持有份额
+            if maxdate <= date:
+                return total
+            return sum(
+                [sh for d, sh in oldrows if d <= date]
+                + [shares[i] for i in range(k) if rdates[i] <= date.to_datetime64()]
+            )
+
+        pos = bisect.bisect_right(events, lastdate)
+        while pos < len(events):
+            if (events[pos] - yesterday).days >= 1:
+                break
+            lastdate = events[pos]
+            # 无净值日优先后移，无法后移则前移
+            date = self.aim._row_after(lastdate)[0]
+            if date != lastdate and date in recordvalue:
+                # 日期平移到了其他记录日，很可能出现问题!
+                logger.warning(
+                    "账单日期 %s 非 %s 的净值记录日期，日期智能平移后 %s 与账单其他日期重合！交易处理极可能出现问题！！ "
+                    "靠后日期的记录被覆盖" % (lastdate, self.code, date)
+                )
+            value = None
+            if (lastdate in recordvalue) and (date not in zhesuandate):
+                value = recordvalue[lastdate]
+
+            rdate, cash, share, rem = self._trade_event(
+                date, rem, total, value, special.get(date), remainshare
+            )
+            rdates[k], cashes[k], shares[k], rems[k] = rdate, cash, share, rem
+            total = total + shares[k]
+            maxdate = max(maxdate, rdate)
+            k += 1
+            if date > lastdate:
+                lastdate = date
+            pos = bisect.bisect_right(events, lastdate, pos)
+        self.lastdate = lastdate
+
+        cftable = pd.DataFrame(
+            {"date": rdates[:k], "cash": cashes[:k], "share": shares[:k]}
+        )
+        remtable = pd.DataFrame({"date": rdates[:k], "rem": rems[:k]})
+        if oldcf is not None:
+            cftable = pd.concat([oldcf, cftable], ignore_index=True)
+            remtable = pd.concat([oldrem, remtable], ignore_index=True)
+        self.cftable = cftable
+        self.remtable = remtable
+
+    def _trade_buy(self, value, date, rem):
+        """
+        buy the fund by the ledger value, the fee is labeled by the 0.005 mark
+
+        :returns: tuple, (rdate, cash, share, rem)
+        """
+        feelabel = 100 * value - int(100 * value)
+        if int(10 * feelabel) == 5:
+            feelabel = feelabel - 0.5
+        else:
+            feelabel = None
+        value = int(value * 100) / 100
+        rdate, cash, share = self.aim.shengou(value, date, fee=feelabel)
+        return rdate, cash, share, rm.buy(rem, share, rdate)
+
+    def _trade_event(self, date, rem, total, value, special, remainshare):
+        """
+        compute one row of cftable and remtable on date, shared by the event engine and the legacy ``_addrow``
+
+        :param date: the trading date, i.e. the ledger date shifted onto the price table
+        :param rem: rem of the last row
+        :param total: float, total shares of the last row
+        :param value: Optional[float], the ledger value to be processed, None if there is no ledger record
+        :param special: Optional[tuple], (comment, netvalue) of date if it is a fenhong or zhesuan date
+        :param remainshare: callable, date -> shares held on the date, only called when selling by ratio
+        :returns: tuple, (rdate, cash, share, rem)
+        """
+        label = self.aim.dividend_label  # 现金分红 0, 红利再投 1
+        cash = 0
+        share = 0
+        prevrem = rem
+        rdate = date
+        if value is not None:
+            # deal with buy and sell and label the fenhongzaitouru, namely one label a 0.05 in the original table to label fenhongzaitouru
+            if date in self.aim.fenhongdate:  # 0.05 的分红行为标记，只有分红日才有效
+                fenhongmark = round(10 * value - int(10 * value), 1)
+                if fenhongmark == 0.5 and label == 0:
+                    label = 1  # fenhong reinvest
+                    value = value - math.copysign(0.05, value)
+                elif fenhongmark == 0.5 and label == 1:
+                    label = 0
+                    value = value - math.copysign(0.05, value)
+
+            if value > 0:  # value stands for purchase money
+                rdate, dcash, dshare, rem = self._trade_buy(value, date, rem)
+            elif value < -0.005:  # value stands for redemp share
+                feelabel = int(100 * value) - 100 * value
+                if int(10 * feelabel) == 5:
+                    feelabel = feelabel - 0.5
+                else:
+                    feelabel = None
+                value = int(value * 100) / 100
+                rdate, dcash, dshare = self.aim.shuhui(
+                    -value, date, prevrem, fee=feelabel
+                )
+                _, rem = rm.sell(rem, -dshare, rdate)
+            elif value >= -0.005 and value < 0:
+                # value now stands for the ratio to be sold in terms of remain positions, -0.005 stand for sell 100%
+                ratio = -value / 0.005
+                rdate, dcash, dshare = self.aim.shuhui(
+                    remainshare(date) * ratio, date, prevrem, 0
+                )
+                _, rem = rm.sell(rem, -dshare, rdate)
+            else:  # in case value=0, when specialday is in record day
+                rdate, dcash, dshare = date, 0, 0
+
+            cash += dcash
+            share += dshare
+        if special is not None:  # deal with fenhong and xiazhe
+            comment, netvalue = special
+            if not isinstance(comment, float):
+                raise ParserFailure("comments not recognized")
+            if comment < 0:
+                dcash2, dshare2 = (
+                    0,
+                    sum([myround(sh * (-comment - 1)) for _, sh in rem]),
+                )  # xiazhe are seperately carried out based on different purchase date
+                rem = rm.trans(rem, -comment, date)
+                # myround(sum(cftable.loc[:,'share'])*(-comment-1))
+            elif comment > 0 and label == 0:
+                dcash2, dshare2 = myround(total * comment), 0
+                rem = rm.copy(rem)
+            elif comment > 0 and label == 1:
+                dcash2, dshare2 = 0, myround(total * (comment / netvalue))
+                rem = rm.buy(rem, dshare2, date)
+            cash += dcash2
+            share += dshare2
+        return rdate, cash, share, rem
+
     def _addrow(self):
         """
         Return cashflow table with one more line or raise an exception if there is no more line to add
@@ -356,24 +793,14 @@ class trade:
             value = self.status.iloc[i].loc[code]
             date = self.status.iloc[i].date
             self.lastdate = date
-            if len(self.price[self.price["date"] >= date]) > 0:
-                date = self.price[self.price["date"] >= date].iloc[0]["date"]
-            else:
-                date = self.price[self.price["date"] <= date].iloc[-1]["date"]
+            date = self.aim._row_after(date)[0]
 
             # 这里没有像下边部分一样仔细处理单独的 lastdate，hopefully 不会出现其他奇怪的问题，有 case 再说
             # https://github.com/refraction-ray/xalpha/issues/47
             # 凭直觉这个地方的处理很可能还有其他 issue
 
             if value > 0:
-                feelabel = 100 * value - int(100 * value)
-                if int(10 * feelabel) == 5:
-                    feelabel = feelabel - 0.5
-                else:
-                    feelabel = None
-                value = int(value * 100) / 100
-                rdate, cash, share = self.aim.shengou(value, date, fee=feelabel)
-                rem = rm.buy([], share, rdate)
+                rdate, cash, share, rem = self._trade_buy(value, date, [])
             else:
                 raise TradeBehaviorError("You cannot sell first when you never buy")
         elif len(self.cftable) > 0:
@@ -400,10 +827,7 @@ class trade:
             date = lastdate
             # 无净值日优先后移，无法后移则前移
             # 还是建议日期记录准确，不然可能有无法完美兼容的错误出现
-            if len(self.price[self.price["date"] >= date]) > 0:
-                date = self.price[self.price["date"] >= date].iloc[0]["date"]
-            else:
-                date = self.price[self.price["date"] <= date].iloc[-1]["date"]
+            date = self.aim._row_after(date)[0]
             if date != lastdate and date in list(self.status.date):
                 # 日期平移到了其他记录日，很可能出现问题!
                 logger.warning(
@@ -414,95 +838,23 @@ class trade:
             if date > lastdate:
                 self.lastdate = date
             # see https://github.com/refraction-ray/xalpha/issues/27, begin new date from last one in df is not reliable
-            label = self.aim.dividend_label  # 现金分红 0, 红利再投 1
-            cash = 0
-            share = 0
-            rem = self.remtable.iloc[-1].rem
-            rdate = date
+            value = None
             if (lastdate in self.recorddate_set) and (date not in self.aim.zhesuandate):
-                # deal with buy and sell and label the fenhongzaitouru, namely one label a 0.05 in the original table to label fenhongzaitouru
                 value = self.status[self.status["date"] <= lastdate].iloc[-1].loc[code]
-                if date in self.aim.fenhongdate:  # 0.05 的分红行为标记，只有分红日才有效
-                    fenhongmark = round(10 * value - int(10 * value), 1)
-                    if fenhongmark == 0.5 and label == 0:
-                        label = 1  # fenhong reinvest
-                        value = value - math.copysign(0.05, value)
-                    elif fenhongmark == 0.5 and label == 1:
-                        label = 0
-                        value = value - math.copysign(0.05, value)
-
-                if value > 0:  # value stands for purchase money
-                    feelabel = 100 * value - int(100 * value)
-                    if int(10 * feelabel) == 5:
-                        feelabel = feelabel - 0.5
-                    else:
-                        feelabel = None
-                    value = int(value * 100) / 100
-                    rdate, dcash, dshare = self.aim.shengou(value, date, fee=feelabel)
-                    rem = rm.buy(rem, dshare, rdate)
-
-                elif value < -0.005:  # value stands for redemp share
-                    feelabel = int(100 * value) - 100 * value
-                    if int(10 * feelabel) == 5:
-                        feelabel = feelabel - 0.5
-                    else:
-                        feelabel = None
-                    value = int(value * 100) / 100
-                    rdate, dcash, dshare = self.aim.shuhui(
-                        -value, date, self.remtable.iloc[-1].rem, fee=feelabel
-                    )
-                    _, rem = rm.sell(rem, -dshare, rdate)
-                elif value >= -0.005 and value < 0:
-                    # value now stands for the ratio to be sold in terms of remain positions, -0.005 stand for sell 100%
-                    remainshare = sum(
-                        self.cftable[self.cftable["date"] <= date].loc[:, "share"]
-                    )
-                    ratio = -value / 0.005
-                    rdate, dcash, dshare = self.aim.shuhui(
-                        remainshare * ratio, date, self.remtable.iloc[-1].rem, 0
-                    )
-                    _, rem = rm.sell(rem, -dshare, rdate)
-                else:  # in case value=0, when specialday is in record day
-                    rdate, dcash, dshare = date, 0, 0
-
-                cash += dcash
-                share += dshare
-            if date in self.aim.specialdate:  # deal with fenhong and xiazhe
-                comment = self.price[self.price["date"] == date].iloc[0].loc["comment"]
-                if isinstance(comment, float):
-                    if comment < 0:
-                        dcash2, dshare2 = (
-                            0,
-                            sum([myround(sh * (-comment - 1)) for _, sh in rem]),
-                        )  # xiazhe are seperately carried out based on different purchase date
-                        rem = rm.trans(rem, -comment, date)
-                        # myround(sum(cftable.loc[:,'share'])*(-comment-1))
-                    elif comment > 0 and label == 0:
-                        dcash2, dshare2 = (
-                            myround(sum(self.cftable.loc[:, "share"]) * comment),
-                            0,
-                        )
-                        rem = rm.copy(rem)
-
-                    elif comment > 0 and label == 1:
-                        dcash2, dshare2 = (
-                            0,
-                            myround(
-                                sum(self.cftable.loc[:, "share"])
-                                * (
-                                    comment
-                                    / self.price[self.price["date"] == date]
-                                    .iloc[0]
-                                    .netvalue
-                                )
-                            ),
-                        )
-                        rem = rm.buy(rem, dshare2, date)
-
-                    cash += dcash2
-                    share += dshare2
-                else:
-                    raise ParserFailure("comments not recognized")
+            special = None
+            if date in self.aim.specialdate:
+                row = self.price[self.price["date"] == date].iloc[0]
+                special = (row.loc["comment"], row.netvalue)
+            rdate, cash, share, rem = self._trade_event(
+                date,
+                self.remtable.iloc[-1].rem,
+                sum(self.cftable.loc[:, "share"]),
+                value,
+                special,
+                lambda date: sum(
+                    self.cftable[self.cftable["date"] <= date].loc[:, "share"]
+                ),
+            )
 
         self.cftable = self.cftable.append(
             pd.DataFrame([[rdate, cash, share]], columns=["date", "cash", "share"]),
@@ -521,12 +873,119 @@ class trade:
         """
         return xirrcal(self.cftable, [self], date, startdate, guess)
 
+    def xirrrate_batch(self, dates, startdate=None, guess=0.01):
+        """
+        xirr rates for many virtually sell-all dates in one call, eg. for rolling xirr charts
+
+        :param dates: list of string or obj of datetime
+        :param startdate: string or obj of datetime, the beginning date of calculation, default from first buy
+        :returns: pd.Series of xirr rates indexed by dates
+        """
+        return xirrcal_batch(self.cftable, [self], dates, startdate, guess)
+
+    def _cf_arrays(self):
+        """
+        cumulative arrays of cftable in the order of date, cached until ``self.cftable`` is replaced
+
+        :returns: Dict[str, np.ndarray], with keys date, share, cash, input, output, tradeamount and peak
+        """
+        cftable = self.cftable
+        if getattr(self, "_cf_ref", None) is not cftable or len(
+            self._cf_cache["date"]
+        ) != len(cftable):
+            dates = cftable["date"].values.astype("datetime64[ns]")
+            order = np.argsort(dates, kind="mergesort")
+            cash = cftable["cash"].values.astype(float)[order]
+            share = cftable["share"].values.astype(float)[order]
+            cumcash = np.cumsum(cash)
+            self._cf_cache = {
+                "date": dates[order],
+                "share": np.cumsum(share),
+                "cash": cumcash,
+                "input": -np.cumsum(np.where(cash < 0, cash, 0)),
+                "output": np.cumsum(np.where(cash > 0, cash, 0)),
+                "tradeamount": np.cumsum(np.abs(cash)),
+                "peak": np.maximum.accumulate(-cumcash),
+            }
+            self._cf_ref = cftable
+        return self._cf_cache
+
+    def _cf_count(self, date):
+        """
+        number of cftable rows on or before date
+        """
+        return int(
+            np.searchsorted(
+                self._cf_arrays()["date"],
+                pd.Timestamp(date).to_datetime64(),
+                side="right",
+            )
+        )
+
+    def dailyreport_series(self, end=yesterdayobj()):
+        """
+        daily series of the positions from the first trade to end, computed in one pass over cftable and price,
+        values on each date are the same as the ones given by :meth:`briefdailyreport` and :meth:`unitcost`
+
+        :param end: string or object of date, the end date of the series
+        :returns: pd.DataFrame with columns date, netvalue, share, value, input, output, unitcost and peak,
+            input and output are the accumulated cash in and out, peak is the max capital occupied so far
+        """
+        end = convert_date(end)
+        cf = self._cf_arrays()
+        columns = [
+            "date",
+            "netvalue",
+            "share",
+            "value",
+            "input",
+            "output",
+            "unitcost",
+            "peak",
+        ]
+        if len(cf["date"]) == 0:
+            return pd.DataFrame([], columns=columns)
+        if self.price is None:
+            dates = cf["date"][cf["date"] <= end.to_datetime64()]
+            dates = np.unique(dates)
+            netvalue = np.zeros(len(dates))
+        else:
+            partp = self.price[
+                (self.price["date"] >= pd.Timestamp(cf["date"][0]))
+                & (self.price["date"] <= end)
+            ]
+            dates = partp["date"].values.astype("datetime64[ns]")
+            netvalue = partp["netvalue"].values
+        idx = np.searchsorted(cf["date"], dates, side="right") - 1
+
+        def _series(name):
+            return myround_array(cf[name][idx])
+
+        share = _series("share")
+        totnetinput = myround_array(-cf["cash"][idx])
+        value = myround_array(share * netvalue)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            unitcost = np.where(share > 0, totnetinput / share, 0)
+        return pd.DataFrame(
+            {
+                "date": dates,
+                "netvalue": netvalue,
+                "share": share,
+                "value": value,
+                "input": _series("input"),
+                "output": _series("output"),
+                "unitcost": unitcost,
+                "peak": _series("peak"),
+            },
+            columns=columns,
+        )
+
     def dailyreport(self, date=yesterdayobj()):
         date = convert_date(date)
-        partcftb = self.cftable[self.cftable["date"] <= date]
+        k = self._cf_count(date)
         value = self.get_netvalue(date)
 
-        if len(partcftb) == 0:
+        if k == 0:
             reportdict = {
                 "基金名称": [self.name],
                 "基金代码": [self.code],
@@ -540,18 +999,18 @@ class trade:
             }
             df = pd.DataFrame(reportdict, columns=reportdict.keys())
             return df
-        # totinput = myround(-sum(partcftb.loc[:,'cash']))
-        totinput = myround(
-            -sum([row["cash"] for _, row in partcftb.iterrows() if row["cash"] < 0])
-        )
-        totoutput = myround(
-            sum([row["cash"] for _, row in partcftb.iterrows() if row["cash"] > 0])
-        )
+        cf = self._cf_arrays()
+        totinput = myround(cf["input"][k - 1])
+        totoutput = myround(cf["output"][k - 1])
 
-        currentshare = myround(sum(partcftb.loc[:, "share"]))
+        currentshare = myround(cf["share"][k - 1])
         currentcash = myround(currentshare * value)
-        btnk = bottleneck(partcftb)
-        turnover = turnoverrate(partcftb, date)
+        btnk = myround(cf["peak"][k - 1])
+        days = (date - pd.Timestamp(cf["date"][0])).days
+        if days <= 0:
+            turnover = 0
+        else:
+            turnover = cf["tradeamount"][k - 1] / btnk / 2.0 * 365 / days
         ereturn = myround(currentcash + totoutput - totinput)
         if currentshare == 0:
             unitcost = 0
@@ -580,11 +1039,111 @@ class trade:
         df = pd.DataFrame(reportdict, columns=reportdict.keys())
         return df
 
+    def _dailyreport_batch(self, dates):
+        """
+        :meth:`dailyreport` for many dates at once, vectorized over the cached cftable arrays
+
+        :param dates: list of string or obj of date
+        :returns: pd.DataFrame, one row for each date with the columns of :meth:`dailyreport`
+        """
+        dates = pd.DatetimeIndex([convert_date(d) for d in dates])
+        d64 = dates.values.astype("datetime64[ns]")
+        cf = self._cf_arrays()
+        k = np.searchsorted(cf["date"], d64, side="right")
+        value = self._netvalues(d64)
+        held = k > 0
+        i = np.maximum(k - 1, 0)
+        n = len(dates)
+        if len(cf["date"]) == 0:
+            zeros = np.zeros(n)
+            totinput = totoutput = currentshare = btnk = tradeamount = zeros
+            days = np.zeros(n, dtype=int)
+        else:
+            totinput = np.where(held, myround_array(cf["input"][i]), 0)
+            totoutput = np.where(held, myround_array(cf["output"][i]), 0)
+            currentshare = np.where(held, myround_array(cf["share"][i]), 0)
+            btnk = np.where(held, myround_array(cf["peak"][i]), 0)
+            tradeamount = cf["tradeamount"][i]
+            days = (d64 - cf["date"][0]).astype("timedelta64[D]").astype(int)
+        currentcash = np.where(held, myround_array(currentshare * value), 0)
+        ereturn = np.where(held, myround_array(currentcash + totoutput - totinput), 0)
+        nan = float("nan")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            turnover = np.where(days > 0, tradeamount / btnk / 2.0 * 365 / days, 0)
+        # 与 dailyreport 一致，使用 Python float 的 round
+        unitcost = [
+            (round((a - b) / c, 4) if c != 0 else 0) if h else nan
+            for h, a, b, c in zip(
+                held, totinput.tolist(), totoutput.tolist(), currentshare.tolist()
+            )
+        ]
+        returnrate = [
+            (round(e / b * 100, 4) if b != 0 else 0) if h else nan
+            for h, e, b in zip(held, ereturn.tolist(), btnk.tolist())
+        ]
+        return pd.DataFrame(
+            {
+                "基金名称": [self.name] * n,
+                "基金代码": [self.code] * n,
+                "当日净值": value,
+                "单位成本": unitcost,
+                "持有份额": currentshare,
+                "基金现值": currentcash,
+                "基金总申购": totinput,
+                "历史最大占用": btnk,
+                "基金持有成本": np.where(held, totinput - totoutput, nan),
+                "基金分红与赎回": totoutput,
+                "换手率": np.where(held, turnover, nan),
+                "基金收益总额": ereturn,
+                "投资收益率": returnrate,
+            },
+            index=dates,
+        )
+
+    def _positions_daily(self, start, end):
+        """
+        share, value and cash flow of the position on every calendar day from start to end,
+        share and value are the same as the ones given by :meth:`briefdailyreport`
+
+        :param start: string or obj of date
+        :param end: string or obj of date
+        :returns: Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray, np.ndarray], dates, share, value and cash
+        """
+        times = pd.date_range(start, end)
+        d64 = times.values.astype("datetime64[ns]")
+        cf = self._cf_arrays()
+        if len(cf["date"]) == 0:
+            share = np.zeros(len(times))
+        else:
+            k = np.searchsorted(cf["date"], d64, side="right")
+            share = np.where(k > 0, myround_array(cf["share"][np.maximum(k - 1, 0)]), 0)
+        value = myround_array(share * self._netvalues(d64))
+        cash = (
+            self.cftable.groupby("date")["cash"]
+            .sum()
+            .reindex(times, fill_value=0)
+            .values.astype(float)
+        )
+        return times, share, value, cash
+
+    def _netvalues(self, dates):
+        """
+        vectorized :meth:`get_netvalue`
+
+        :param dates: np.ndarray of datetime64[ns]
+        :returns: np.ndarray of netvalue on or before each date, 0 if there is none
+        """
+        pdates, netvalues = self.aim._price_arrays()
+        if len(pdates) == 0:
+            return np.zeros(len(dates))
+        i = np.searchsorted(pdates, dates, side="right") - 1
+        return np.where(i >= 0, netvalues[np.maximum(i, 0)], 0)
+
     def get_netvalue(self, date=yesterdayobj()):
-        df = self.price[self.price["date"] <= date]
-        if df is None or len(df) == 0:
+        row = self.aim._row_before(date)
+        if row is None:
             return 0
-        return df.iloc[-1].netvalue
+        return row[1]
 
     def briefdailyreport(self, date=yesterdayobj()):
         """
@@ -594,12 +1153,12 @@ class trade:
         :returns: dict with several attrs: date, unitvalue, currentshare, currentvalue
         """
         date = convert_date(date)
-        partcftb = self.cftable[self.cftable["date"] <= date]
-        if len(partcftb) == 0:
+        k = self._cf_count(date)
+        if k == 0:
             return {}
 
         unitvalue = self.get_netvalue(date)
-        currentshare = myround(sum(partcftb.loc[:, "share"]))
+        currentshare = myround(self._cf_arrays()["share"][k - 1])
         currentvalue = myround(currentshare * unitvalue)
 
         return {
@@ -616,10 +1175,10 @@ class trade:
         :param date: string or object of datetime
         :returns: float number of unitcost
         """
-        partcftb = self.cftable[self.cftable["date"] <= date]
-        if len(partcftb) == 0:
+        k = self._cf_count(date)
+        if k == 0:
             return 0
-        totnetinput = myround(-sum(partcftb.loc[:, "cash"]))
+        totnetinput = myround(-self._cf_arrays()["cash"][k - 1])
         currentshare = self.briefdailyreport(date).get("currentshare", 0)
         # totnetinput
         if currentshare > 0:
@@ -651,14 +1210,10 @@ class trade:
         """
         visualization on the total values daily change of the aim
         """
-        partp = self.price[self.price["date"] >= self.cftable.iloc[0].date]
         # 多基金账单时起点可能非该基金持有起点
-        partp = partp[partp["date"] <= end]
-
-        date = [d.date() for d in partp.date]
-        valuedata = [
-            self.briefdailyreport(d).get("currentvalue", 0) for d in partp.date
-        ]
+        series = self.dailyreport_series(end=end)
+        date = [d.date() for d in series.date]
+        valuedata = list(series["value"])
 
         line = Line()
         if vopts is None:
@@ -761,20 +1316,27 @@ class itrade(trade):
         return self.type_
 
     def _arrange(self):
-        d = {"date": [], "cash": [], "share": []}
-        for _, r in self.status.iterrows():
-            d["date"].append(r.date)
-            if r.share == 0:
-                d["cash"].append(-r.value)
-                d["share"].append(0)
-            elif r.value == 0:
-                d["cash"].append(0)
-                d["share"].append(r.share)  # 直接记录总的应增加+或减少的份额数
-            else:
-                d["cash"].append(-r.value * r.share - abs(r.fee))  # 手续费总是正的，和买入同号
-                d["share"].append(r.share)
+        value = self.status["value"].values
+        share = self.status["share"].values
+        fee = self.status["fee"].values
+        # share 为 0 记录现金变动；value 为 0 直接记录总的应增加+或减少的份额数；手续费总是正的，和买入同号
+        cash = np.where(
+            share == 0, -value, np.where(value == 0, 0, -value * share - abs(fee))
+        )
+        d = {
+            "date": self.status["date"].values,
+            "cash": cash,
+            "share": np.where(share == 0, 0, share),
+        }
         self.cftable = pd.DataFrame(d)
 
+    def _netvalues(self, dates):
+        if self.price is None or len(self.price) == 0:
+            return np.zeros(len(dates))
+        pdates = self.price["date"].values.astype("datetime64[ns]")
+        i = np.searchsorted(pdates, dates, side="right") - 1
+        return np.where(i >= 0, self.price["close"].values[np.maximum(i, 0)], 0)
+
     def get_netvalue(self, date=yesterdayobj()):
         if self.price is None:
             return 0
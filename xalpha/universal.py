@@ -12,6 +12,7 @@ import numpy as np
 import pandas as pd
 import logging
 import inspect
+import threading
 from bs4 import BeautifulSoup
 from functools import wraps, lru_cache
 from uuid import uuid4
@@ -50,6 +51,8 @@ from xalpha.cons import (
     region_trans,
     today_obj,
     _float,
+    fetch_stats,
+    concurrent_map,
 )
 from xalpha.provider import data_source
 from xalpha.exceptions import DataPossiblyWrong, ParserFailure
@@ -186,6 +189,84 @@ def get_industry_fromxq(code):
     return r
 
 
+_stock_meta_cache = {"name": {}, "industry": {}}  # field: {code: value}
+_stock_meta_loaded = set()  # (field, path, prefix) already loaded from the backend
+_stock_meta_lock = threading.Lock()
+
+
+def _stock_name(code):
+    try:
+        return get_rt(code)["name"]
+    except Exception as e:
+        logger.warning("%s when fetching name of %s" % (e, code))
+
+
+def _stock_industry(code):
+    try:
+        return get_industry_fromxq(code).get("industryname", "")
+    except Exception as e:
+        logger.warning("%s when fetching industry of %s" % (e, code))
+
+
+def _stock_meta_load(field):
+    """
+    load saved stock names or industries from the configured backend into memory, only once for each field
+    """
+    if ioconf.get("backend") not in ["csv", "sql"]:
+        return
+    key = (field, str(ioconf.get("path")), ioconf.get("prefix", ""))
+    if key in _stock_meta_loaded:
+        return
+    _stock_meta_loaded.add(key)
+    df = fetch_backend("STOCKMETA-" + field)
+    if df is not None:
+        df = df.fillna("")
+        for code, value in zip(df["code"].astype(str), df["value"].astype(str)):
+            _stock_meta_cache[field].setdefault(code, value)
+
+
+def _stock_meta_dump(field):
+    """
+    save all known stock names or industries into the configured backend
+    """
+    if ioconf.get("backend") not in ["csv", "sql"]:
+        return
+    d = _stock_meta_cache[field]
+    df = pd.DataFrame({"code": list(d.keys()), "value": list(d.values())})
+    save_backend("STOCKMETA-" + field, df, mode="w")
+
+
+def get_stock_meta_many(codes, fields=("name", "industry"), max_workers=8):
+    """
+    批量获取股票名称与雪球行业信息，并发抓取缺失的部分。结果缓存于内存和 ``xa.set_backend`` 设定的 csv 或 sql 后端，
+    新进程中不再重复抓取，抓取失败的不做缓存。
+
+    :param codes: list of str, 雪球格式代码，如 SH600000
+    :param fields: 可选 name 和 industry
+    :param max_workers: int, 并发请求数
+    :return: pd.DataFrame, index 为去重后的 codes，列为 fields。抓取失败时 name 为代码本身，industry 为空字符串
+    """
+    fetchers = {"name": _stock_name, "industry": _stock_industry}
+    codes = list(dict.fromkeys(codes))
+    d = {}
+    for field in fields:
+        with _stock_meta_lock:
+            _stock_meta_load(field)
+            cache = _stock_meta_cache[field]
+            todo = [c for c in codes if c not in cache]
+        if todo:
+            results = concurrent_map(fetchers[field], todo, max_workers=max_workers)
+            fetch_stats.incr("stock_meta.fetch", len(todo))
+            with _stock_meta_lock:
+                for c, v in zip(todo, results):
+                    if v is not None:
+                        cache[c] = v
+                _stock_meta_dump(field)
+        default = (lambda c: c) if field == "name" else (lambda c: "")
+        d[field] = [cache.get(c, default(c)) for c in codes]
+    return pd.DataFrame(d, index=codes, columns=list(fields))
+
+
 def get_historical_fromcninvesting(curr_id, st_date, end_date, app=False):
     data = {
         "curr_id": curr_id,
@@ -986,8 +1067,10 @@ def _get_daily(
         if getattr(thismodule, "get_daily_handler", None):
             args = inspect.getargvalues(inspect.currentframe())
             f = getattr(thismodule, "get_daily_handler")
+            t0 = time.perf_counter()
             fr = f(**args.locals)
             if fr is not None:
+                fetch_stats.observe("get_daily.handler", time.perf_counter() - t0)
                 return fr
 
     if not end:
@@ -1048,121 +1131,125 @@ def _get_daily(
     count = (today_obj() - start_obj).days + 1
     start_str = start_obj.strftime("%Y/%m/%d")
     end_str = end_obj.strftime("%Y/%m/%d")
-    if _from in ["cninvesting", "investing", "default", "IN"]:
-        df = get_historical_fromcninvesting(code, start_str, end_str)
-        df = prettify(df)
-    elif _from in ["xueqiu", "xq", "snowball", "XQ"]:
-        code, type_ = decouple_code(code)
-
-        df = get_historical_fromxq(code, count, type_=type_)
-        df = prettify(df)
-    elif _from in ["zhongjianjia", "zjj", "chinamoney", "ZJJ"]:
-        df = get_rmb(start, end, prev, currency=code)
-    elif _from in ["ttjj", "tiantianjijin", "xalpha", "eastmoney"]:
-        df = get_fund(code)
-
-    elif _from == "peb":
-        if (
-            code.startswith("SH000")
-            or code.startswith("SZ399")
-            or code.startswith("399")
-            or code.startswith("000")
-        ):
-            df = _get_peb_range(code=code, start=start_str, end=end_str)
-        elif code.startswith("F"):
-            df = get_fund_peb_range(code=code, start=start, end=end)
-        else:
-            df = get_stock_peb_range(code=code, start=start, end=end, wrapper=True)
-
-    elif _from == "iw":
-        df = _get_index_weight_range(code=code, start=start_str, end=end_str)
+    t0 = time.perf_counter()
+    # 失败的抓取同样计时
+    try:
+        if _from in ["cninvesting", "investing", "default", "IN"]:
+            df = get_historical_fromcninvesting(code, start_str, end_str)
+            df = prettify(df)
+        elif _from in ["xueqiu", "xq", "snowball", "XQ"]:
+            code, type_ = decouple_code(code)
+
+            df = get_historical_fromxq(code, count, type_=type_)
+            df = prettify(df)
+        elif _from in ["zhongjianjia", "zjj", "chinamoney", "ZJJ"]:
+            df = get_rmb(start, end, prev, currency=code)
+        elif _from in ["ttjj", "tiantianjijin", "xalpha", "eastmoney"]:
+            df = get_fund(code)
+
+        elif _from == "peb":
+            if (
+                code.startswith("SH000")
+                or code.startswith("SZ399")
+                or code.startswith("399")
+                or code.startswith("000")
+            ):
+                df = _get_peb_range(code=code, start=start_str, end=end_str)
+            elif code.startswith("F"):
+                df = get_fund_peb_range(code=code, start=start, end=end)
+            else:
+                df = get_stock_peb_range(code=code, start=start, end=end, wrapper=True)
 
-    elif _from == "fs":
-        df = get_fundshare_byjq(code, start=start, end=end)
+        elif _from == "iw":
+            df = _get_index_weight_range(code=code, start=start_str, end=end_str)
 
-    elif _from == "SP":
-        df = get_historical_fromsp(code, start=start, end=end)
+        elif _from == "fs":
+            df = get_fundshare_byjq(code, start=start, end=end)
 
-    elif _from == "SPC":
-        df = get_historical_fromsp(code[3:], start=start, end=end, region="chinese")
+        elif _from == "SP":
+            df = get_historical_fromsp(code, start=start, end=end)
 
-    elif _from == "BB":
-        df = get_historical_frombb(code, start=start, end=end)
+        elif _from == "SPC":
+            df = get_historical_fromsp(code[3:], start=start, end=end, region="chinese")
 
-    elif _from == "ZZ":
-        df = get_historical_fromzzindex(code, start=start, end=end)
+        elif _from == "BB":
+            df = get_historical_frombb(code, start=start, end=end)
 
-    elif _from == "GZ":
-        df = get_historical_fromgzindex(code, start=start, end=end)
+        elif _from == "ZZ":
+            df = get_historical_fromzzindex(code, start=start, end=end)
 
-    elif _from == "HZ":
-        df = get_historical_fromhzindex(code, start=start, end=end)
+        elif _from == "GZ":
+            df = get_historical_fromgzindex(code, start=start, end=end)
 
-    elif _from == "ES":
-        df = get_historical_fromesunny(code, start=start, end=end)
+        elif _from == "HZ":
+            df = get_historical_fromhzindex(code, start=start, end=end)
 
-    elif _from == "B":
-        df = get_bond_rates_range(code, start=start, end=end)
+        elif _from == "ES":
+            df = get_historical_fromesunny(code, start=start, end=end)
 
-    elif _from == "ycharts":
-        df = get_historical_fromycharts(
-            code,
-            start=start_obj.strftime("%m/%d/%Y"),
-            end=end_obj.strftime("%m/%d/%Y"),
-            category=category,
-            metric=metric,
-        )
+        elif _from == "B":
+            df = get_bond_rates_range(code, start=start, end=end)
 
-    elif _from == "sw":
-        df = get_sw_from_jq(code, start=start, end=end)
+        elif _from == "ycharts":
+            df = get_historical_fromycharts(
+                code,
+                start=start_obj.strftime("%m/%d/%Y"),
+                end=end_obj.strftime("%m/%d/%Y"),
+                category=category,
+                metric=metric,
+            )
 
-    elif _from == "teb":
-        df = get_teb_range(code, start=start, end=end)
+        elif _from == "sw":
+            df = get_sw_from_jq(code, start=start, end=end)
 
-    elif _from in ["pt", "portfolio"]:
-        df = get_portfolio_fromttjj(code, start=start, end=end)
+        elif _from == "teb":
+            df = get_teb_range(code, start=start, end=end)
 
-    elif _from == "YH":
-        df = get_historical_fromyh(code, start=start, end=end)
+        elif _from in ["pt", "portfolio"]:
+            df = get_portfolio_fromttjj(code, start=start, end=end)
 
-    elif _from in ["FT", "FTI"]:
-        df = get_historical_fromft(code, start=start, end=end)
+        elif _from == "YH":
+            df = get_historical_fromyh(code, start=start, end=end)
 
-    elif _from == "FTE":
-        df = get_historical_fromft(code, start=start, end=end, _type="equities")
+        elif _from in ["FT", "FTI"]:
+            df = get_historical_fromft(code, start=start, end=end)
 
-    elif _from == "FTB":
-        df = get_historical_fromft(code, start=start, end=end, _type="bonds")
+        elif _from == "FTE":
+            df = get_historical_fromft(code, start=start, end=end, _type="equities")
 
-    elif _from == "FTF":
-        df = get_historical_fromft(code, start=start, end=end, _type="funds")
+        elif _from == "FTB":
+            df = get_historical_fromft(code, start=start, end=end, _type="bonds")
 
-    elif _from == "FTX":
-        df = get_historical_fromft(code, start=start, end=end, _type="currencies")
+        elif _from == "FTF":
+            df = get_historical_fromft(code, start=start, end=end, _type="funds")
 
-    elif _from == "FTC":
-        df = get_historical_fromft(code, start=start, end=end, _type="commodities")
+        elif _from == "FTX":
+            df = get_historical_fromft(code, start=start, end=end, _type="currencies")
 
-    elif _from == "INA":  # investing app
-        code = get_investing_id(code, app=True)
-        df = get_historical_fromcninvesting(code, start_str, end_str, app=True)
-        df = prettify(df)
+        elif _from == "FTC":
+            df = get_historical_fromft(code, start=start, end=end, _type="commodities")
 
-    elif _from == "mcy":
-        df = get_macro(code, start=start[:4], end=end[:4], datecol="stat_year")
+        elif _from == "INA":  # investing app
+            code = get_investing_id(code, app=True)
+            df = get_historical_fromcninvesting(code, start_str, end_str, app=True)
+            df = prettify(df)
 
-    elif _from == "mcq":
-        df = get_macro(code, start=start, end=end, datecol="stat_quarter")
+        elif _from == "mcy":
+            df = get_macro(code, start=start[:4], end=end[:4], datecol="stat_year")
 
-    elif _from == "mcm":
-        df = get_macro(code, start=start, end=end, datecol="stat_month")
+        elif _from == "mcq":
+            df = get_macro(code, start=start, end=end, datecol="stat_quarter")
 
-    elif _from == "mcd":
-        df = get_macro(code, start=start, end=end, datecol="day")
+        elif _from == "mcm":
+            df = get_macro(code, start=start, end=end, datecol="stat_month")
 
-    else:
-        raise ParserFailure("no such data source: %s" % _from)
+        elif _from == "mcd":
+            df = get_macro(code, start=start, end=end, datecol="day")
 
+        else:
+            raise ParserFailure("no such data source: %s" % _from)
+    finally:
+        fetch_stats.observe("get_daily." + _from, time.perf_counter() - t0)
     if wrapper or len(df) == 0:
         return df
     else:
@@ -1729,7 +1816,7 @@ def cachedio(**ioconf):
 
     :param **ioconf: 可选关键字参数 backend: csv or sql or memory,
         path: csv 文件夹或 sql engine， refresh True 会刷新结果，重新爬取, default False，
-        prefix 是 key 前统一部分, 缓存 hash 标志
+        prefix 是 key 前统一部分, 缓存 hash 标志。缓存命中，延拓和重新爬取的次数均计入 ``xa.fetch_stats``
     :return:
     """
 
@@ -1799,6 +1886,7 @@ def cachedio(**ioconf):
             kws["start"] = start_str
             kws["end"] = end_str
             if not backend:
+                fetch_stats.incr("cachedio.full_fetch")
                 df = f(*args, **kws)
                 df = df[df["date"] <= kws["end"]]
                 df = df[df["date"] >= kws["start"]]
@@ -1810,6 +1898,7 @@ def cachedio(**ioconf):
                     setattr(thismodule, "cached_dict", {})
                 if refresh:
                     is_changed = True
+                    fetch_stats.incr("cachedio.full_fetch")
                     df0 = f(*args, **kws)
 
                 else:  # non refresh
@@ -1818,15 +1907,20 @@ def cachedio(**ioconf):
                             if key in getattr(thismodule, "cached_dict"):
                                 # 即使硬盘级别的缓存，也有内存层，加快读写速度
                                 df0 = getattr(thismodule, "cached_dict")[key]
+                                fetch_stats.incr("cachedio.memory_hit")
                             else:
                                 df0 = pd.read_csv(os.path.join(path, key))
+                                fetch_stats.incr("cachedio.disk_hit")
                         elif backend == "sql":
                             if key in getattr(thismodule, "cached_dict"):
                                 df0 = getattr(thismodule, "cached_dict")[key]
+                                fetch_stats.incr("cachedio.memory_hit")
                             else:
                                 df0 = pd.read_sql(key, path)
+                                fetch_stats.incr("cachedio.disk_hit")
                         elif backend == "memory":
                             df0 = getattr(thismodule, "cached_dict")[key]
+                            fetch_stats.incr("cachedio.memory_hit")
                         else:
                             raise ValueError("no %s option for backend" % backend)
                         df0[date] = pd.to_datetime(df0[date])
@@ -1839,6 +1933,7 @@ def cachedio(**ioconf):
                             ).strftime("%Y%m%d")
                             if has_weekday(kws["start"], kws["end"]):
                                 # 考虑到海外市场的不同情况，不用 opendate 判断，采取保守型判别
+                                fetch_stats.incr("cachedio.forward_extend")
                                 df1 = f(*args, **kws)
                                 if df1 is not None and len(df1) > 0:
                                     df1 = df1[df1["date"] <= kws["end"]]
@@ -1856,6 +1951,7 @@ def cachedio(**ioconf):
                                 kws["start"] = nextday_str
                             kws["end"] = end_str
                             if has_weekday(nextday_str, kws["end"]):  # 新更新的日期里有工作日
+                                fetch_stats.incr("cachedio.backward_extend")
                                 df2 = f(*args, **kws)
                                 if df2 is not None and len(df2) > 0:
                                     df2 = df2[df2["date"] >= kws["start"]]
@@ -1884,6 +1980,7 @@ def cachedio(**ioconf):
                                     today_obj() - dt.timedelta(days=1)
                                 ).strftime("%Y%m%d")
                         is_changed = True
+                        fetch_stats.incr("cachedio.full_fetch")
                         df0 = f(*args, **kws)
 
                 if df0 is not None and len(df0) > 0 and is_changed: